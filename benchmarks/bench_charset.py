@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+页面编码识别基准测试
+
+生成一批 UTF-8、GBK、Big5、Shift_JIS、Latin-1 编码的页面(有的在响应头或 <meta> 中声明编码，有的没有声明)，
+对比改造前的 decode_content(未声明时对整个页面运行 chardet)与分层的 CharsetDetector 的耗时，
+输出各层命中次数，并核对两者解码出的文本是否一致。同一主机的页面依次解码，第二个页面起可以命中主机缓存。
+
+    python benchmarks/bench_charset.py --pages 200
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from collections import Counter
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT_DIR)
+
+from lib.utils.charset import CharsetDetector
+
+TEXTS = {
+    'utf-8': '欢迎使用管理系统，请输入用户名和密码。Ünïcödé ✓ ',
+    'gbk': '欢迎使用管理系统，请输入用户名和密码。数据中心监控平台 ',
+    'big5': '歡迎使用管理系統，請輸入使用者名稱和密碼。資料中心監控平台 ',
+    'shift_jis': 'ようこそ管理システムへ。ユーザー名とパスワードを入力してください。 ',
+    'latin-1': 'Bienvenue sur la plateforme de gestion, connectez-vous à votre compte. Déjà inscrit ? ',
+}
+FILLER = ['<div class="row"><span>item</span></div>', '<li><a href="/news/1">Latest news</a></li>',
+          '<script>var config = {"debug": false, "items": [1, 2, 3]};</script>', '<td>42</td>']
+
+
+def legacy_decode(content: bytes, content_type: str) -> str:
+    """改造前 CMSScanner.decode_content 的逻辑(apparent_encoding 即对整个页面运行 chardet)"""
+    import chardet
+    content_type = content_type.lower()
+    if 'charset=' in content_type:
+        try:
+            charset = content_type.split('charset=')[-1].split(';')[0].strip()
+            return content.decode(charset, errors='replace')
+        except Exception:
+            pass
+    try:
+        return content.decode(chardet.detect(content)['encoding'], errors='replace')
+    except Exception:
+        pass
+    return content.decode('utf-8', errors='replace')
+
+
+def make_page(rng: random.Random, charset: str, declare: str):
+    size = rng.choice((20, 60, 200, 600)) * 1024
+    parts, length = [], 0
+    while length < size:
+        part = rng.choice(FILLER) if rng.random() < 0.7 else f"<p>{TEXTS[charset] * rng.randint(1, 4)}</p>"
+        parts.append(part)
+        length += len(part)
+    meta = f'<meta charset="{charset}">' if declare == 'meta' else ''
+    html = f"<html><head>{meta}<title>Portal</title></head><body>{''.join(parts)}</body></html>"
+    content_type = f"text/html; charset={charset}" if declare == 'header' else 'text/html'
+    return html.encode(charset, errors='replace'), content_type
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Charset detection benchmark')
+    parser.add_argument('--pages', type=int, default=120, help='Number of generated pages')
+    parser.add_argument('--per-host', type=int, default=3, help='Pages served by the same host')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    pages = []
+    for i in range(args.pages):
+        if i % args.per_host == 0:
+            charset = rng.choice(list(TEXTS))
+            declare = rng.choice(('header', 'meta', 'none', 'none'))
+        content, content_type = make_page(rng, charset, declare)
+        pages.append((f"10.0.{i // args.per_host // 256}.{i // args.per_host % 256}", content, content_type))
+    print(f"pages: {len(pages)} ({sum(len(c) for _, c, _ in pages) / len(pages) / 1024:.0f} KB avg)")
+
+    start = time.perf_counter()
+    legacy = [legacy_decode(content, content_type) for _, content, content_type in pages]
+    legacy_time = time.perf_counter() - start
+
+    detector = CharsetDetector()
+    sources = Counter()
+    start = time.perf_counter()
+    layered = []
+    for host, content, content_type in pages:
+        layered.append(detector.decode(content, content_type, host))
+    layered_time = time.perf_counter() - start
+    # 单独统计各层命中次数(不计入耗时)
+    counter = CharsetDetector()
+    for host, content, content_type in pages:
+        sources[counter.detect(content, content_type, host)[1]] += 1
+
+    print(f"legacy:  {legacy_time / len(pages) * 1000:8.2f} ms/page")
+    print(f"layered: {layered_time / len(pages) * 1000:8.2f} ms/page  speedup: {legacy_time / layered_time:.0f}x")
+    print(f"layers:  {dict(sources)}")
+    same = sum(1 for old, new in zip(legacy, layered) if old == new)
+    print(f"identical text: {same}/{len(pages)} pages")
+
+
+if __name__ == '__main__':
+    main()
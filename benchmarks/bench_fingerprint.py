@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+TideFinger 指纹匹配基准测试
+
+随机生成数千条 title=/body=/header= 规则(单条件、||、&&、括号组合)和一批 HTML 响应，
+对比旧的逐条匹配(每个响应对每条规则拆分字符串并用 re.findall 取出字面量，含括号的规则被丢弃)
+与编译后的 TideMatcher(每个字段一次多模式扫描)的耗时，并在旧实现支持的规则子集上核对识别结果一致。
+
+    python benchmarks/bench_fingerprint.py --rules 5000 --pages 300
+"""
+import argparse
+import os
+import random
+import re
+import string
+import sys
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT_DIR)
+
+from lib.utils.fingerprint import TideMatcher
+
+
+def legacy_check_rule(key: str, header: str, body: str, title: str) -> bool:
+    """改造前 CMSScanner.check_rule 的逻辑"""
+    try:
+        if 'title="' in key:
+            if re.findall(r'title="(.*)"', key)[0].lower() in title.lower():
+                return True
+        elif 'body="' in key:
+            if re.findall(r'body="(.*)"', key)[0] in body:
+                return True
+        elif 'header="' in key:
+            if re.findall(r'header="(.*)"', key)[0] in header:
+                return True
+        return False
+    except Exception:
+        return False
+
+
+def legacy_handle_tide_rule(key: str, header: str, body: str, title: str) -> bool:
+    """改造前 CMSScanner.handle_tide_rule 的逻辑"""
+    if '||' in key and '&&' not in key and '(' not in key:
+        return any(legacy_check_rule(rule, header, body, title) for rule in key.split('||'))
+    elif '&&' in key and '||' not in key and '(' not in key:
+        return all(legacy_check_rule(rule, header, body, title) for rule in key.split('&&'))
+    elif '||' not in key and '&&' not in key and '(' not in key:
+        return legacy_check_rule(key, header, body, title)
+    return False
+
+
+def legacy_match(rules, title: str, body: str, header: str):
+    for name, rule in rules.items():
+        if legacy_handle_tide_rule(rule, header, body, title):
+            return name
+    return None
+
+
+def make_word(rng: random.Random) -> str:
+    return ''.join(rng.choice(string.ascii_lowercase + '-_/.') for _ in range(rng.randint(4, 14)))
+
+
+def make_rules(count: int, vocabulary, rng: random.Random, nested: bool):
+    def term():
+        field = rng.choice(('title', 'body', 'body', 'body', 'header'))
+        return f'{field}="{rng.choice(vocabulary)}"'
+
+    rules = {}
+    for i in range(count):
+        shape = rng.random()
+        if shape < 0.4:
+            rule = term()
+        elif shape < 0.7:
+            rule = '||'.join(term() for _ in range(rng.randint(2, 4)))
+        elif shape < 0.9 or not nested:
+            rule = '&&'.join(term() for _ in range(rng.randint(2, 3)))
+        else:
+            rule = f"({term()} || {term()}) && {term()}"
+        rules[f"Product{i}"] = rule
+    return rules
+
+
+def make_pages(count: int, vocabulary, rng: random.Random):
+    filler = [make_word(rng) for _ in range(500)]
+    pages = []
+    for _ in range(count):
+        words = [rng.choice(filler) for _ in range(rng.randint(500, 6000))]
+        for _ in range(rng.randint(0, 8)):
+            words.insert(rng.randrange(len(words)), rng.choice(vocabulary))
+        body = f"<html><head><title>{rng.choice(vocabulary).upper()} portal</title></head><body>{' '.join(words)}</body></html>"
+        header = str({'Server': rng.choice(vocabulary), 'Content-Type': 'text/html'})
+        title = body[body.index('<title>') + 7:body.index('</title>')]
+        pages.append((title, body, header))
+    return pages
+
+
+def main():
+    parser = argparse.ArgumentParser(description='TideFinger matching benchmark')
+    parser.add_argument('--rules', type=int, default=3000, help='Number of generated rules')
+    parser.add_argument('--pages', type=int, default=200, help='Number of generated responses')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    vocabulary = [make_word(rng) for _ in range(args.rules * 2)]
+    rules = make_rules(args.rules, vocabulary, rng, nested=True)
+    pages = make_pages(args.pages, vocabulary, rng)
+    size = sum(len(body) for _, body, _ in pages)
+    print(f"rules: {len(rules)}  pages: {len(pages)} ({size / len(pages) / 1024:.1f} KB avg)")
+
+    start = time.perf_counter()
+    matcher = TideMatcher(rules)
+    compile_time = time.perf_counter() - start
+    print(f"compile: {compile_time * 1000:.0f}ms  ({len(matcher)} rules, {len(matcher.skipped)} skipped)")
+
+    start = time.perf_counter()
+    legacy = [legacy_match(rules, *page) for page in pages]
+    legacy_time = time.perf_counter() - start
+    start = time.perf_counter()
+    compiled = [matcher.match(*page) for page in pages]
+    compiled_time = time.perf_counter() - start
+    print(f"legacy:   {legacy_time / len(pages) * 1000:8.2f} ms/response  "
+          f"(identified {sum(1 for r in legacy if r)}; parenthesized rules ignored)")
+    print(f"compiled: {compiled_time / len(pages) * 1000:8.2f} ms/response  "
+          f"(identified {sum(1 for r in compiled if r)})  speedup: {legacy_time / compiled_time:.0f}x")
+
+    # 旧实现支持的规则(无括号、不混用 && 与 ||)上两者结果应完全一致
+    flat = make_rules(args.rules, vocabulary, random.Random(args.seed + 1), nested=False)
+    flat_matcher = TideMatcher(flat)
+    mismatched = sum(1 for page in pages if legacy_match(flat, *page) != flat_matcher.match(*page))
+    print(f"parity on flat rules: {len(pages) - mismatched}/{len(pages)} responses identical")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+流水线与顺序执行的回环基准测试
+
+在 0.0.0.0 上启动若干个带固定延迟的 HTTP 服务，对 127.0.0.0/N 回环网段(-Pn)
+执行 端口扫描 + Web识别，分别使用 --no-pipeline(各阶段顺序执行)和默认的流水线模式，
+输出首个 Web 识别结果出现的时间与总耗时。
+
+    python benchmarks/bench_pipeline.py --hosts 256 --ports 200 --delay 0.05
+"""
+import argparse
+import contextlib
+import io
+import ipaddress
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT_DIR)
+
+from mscan import parse_args
+from core.runner import ScanRunner
+
+
+def start_servers(count: int, delay: float):
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            time.sleep(delay)
+            body = b'<html><head><title>bench</title></head><body>ok</body></html>'
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/html')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    class Server(ThreadingHTTPServer):
+        daemon_threads = True
+        request_queue_size = 1024
+
+    servers = []
+    for _ in range(count):
+        server = Server(('0.0.0.0', 0), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+    return servers
+
+
+def run(argv, pipeline: bool):
+    args = parse_args(argv + ([] if pipeline else ['--no-pipeline']))
+    runner = ScanRunner(args)
+    first = []
+    finished = threading.Event()
+
+    def _watch():
+        while not finished.wait(0.01):
+            if runner.results['web']:
+                first.append(time.perf_counter())
+                return
+
+    start = time.perf_counter()
+    watcher = threading.Thread(target=_watch, daemon=True)
+    watcher.start()
+    with contextlib.redirect_stdout(io.StringIO()):
+        runner.run()
+    elapsed = time.perf_counter() - start
+    finished.set()
+    watcher.join()
+    # 顺序执行时 Web 结果在阶段结束后一次性写入
+    first_result = (first[0] - start) if first else elapsed
+    return first_result, elapsed, len(runner.results['web'])
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Loopback streaming pipeline benchmark')
+    parser.add_argument('--hosts', type=int, default=256, help='Number of loopback hosts (power of two)')
+    parser.add_argument('--ports', type=int, default=200, help='Ports per host')
+    parser.add_argument('--servers', type=int, default=2, help='HTTP servers listening on 0.0.0.0')
+    parser.add_argument('--delay', type=float, default=0.05, help='HTTP response delay (seconds)')
+    parser.add_argument('--threads', type=int, default=200)
+    args = parser.parse_args()
+
+    servers = start_servers(args.servers, args.delay)
+    open_ports = [server.server_address[1] for server in servers]
+    ports = list(range(1, args.ports - len(open_ports) + 1)) + open_ports
+    prefix = 32 - (max(args.hosts, 4) - 1).bit_length()
+    network = ipaddress.ip_network(f'127.0.0.0/{prefix}')
+    argv = [
+        '-i', str(network), '-Pn', '-p', ','.join(map(str, ports)),
+        '-t', str(args.threads), '--seed', '1',
+        '--no-ssh', '--no-ftp', '--no-report', '--no-checkpoint',
+    ]
+
+    try:
+        for name, pipeline in (('sequential', False), ('pipeline', True)):
+            first, elapsed, found = run(argv, pipeline)
+            print(f"{name:<11} first web result: {first:.2f}s total: {elapsed:.2f}s web results: {found}")
+    finally:
+        for server in servers:
+            server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
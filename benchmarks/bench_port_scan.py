@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+端口扫描引擎回环基准测试
+
+在 127.0.0.1 上监听若干端口，分别用线程池引擎(IPScanner)和
+asyncio 引擎(AsyncIPScanner)扫描同一端口范围，输出每秒探测数。
+--filtered 会额外打开一批积压队列已满的监听端口，新的 SYN 被内核丢弃，
+用来模拟被过滤(需要等待超时)的端口。
+
+    python benchmarks/bench_port_scan.py --ports 20000 --open 50 --filtered 2000
+"""
+import argparse
+import contextlib
+import io
+import os
+import socket
+import sys
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT_DIR)
+
+from lib.scanners.port_scanner import IPScanner
+from lib.scanners.async_scanner import AsyncIPScanner
+
+
+def open_listeners(count: int):
+    """在回环地址上打开 count 个监听端口"""
+    listeners = []
+    for _ in range(count):
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.bind(('127.0.0.1', 0))
+        sock.listen(1024)
+        listeners.append(sock)
+    return listeners
+
+
+def open_filtered(count: int):
+    """打开 count 个积压队列已满的监听端口，后续连接会一直等到超时"""
+    listeners, fillers = [], []
+    for _ in range(count):
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.bind(('127.0.0.1', 0))
+        sock.listen(0)
+        listeners.append(sock)
+        for _ in range(2):
+            filler = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            filler.setblocking(False)
+            filler.connect_ex(sock.getsockname())
+            fillers.append(filler)
+    time.sleep(0.2)
+    return listeners, fillers
+
+
+def run(scanner, ports):
+    scanner.results.clear()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        scanner.port_scan({'127.0.0.1'}, ports)
+    elapsed = time.perf_counter() - start
+    return elapsed, scanner.results.total_ports()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Loopback port scan benchmark')
+    parser.add_argument('--ports', type=int, default=20000, help='Number of ports to probe')
+    parser.add_argument('--open', type=int, default=50, help='Number of listening ports')
+    parser.add_argument('--filtered', type=int, default=0, help='Number of filtered (timing out) ports')
+    parser.add_argument('--threads', type=int, default=500, help='Threads for the thread engine')
+    parser.add_argument('--max-inflight', type=int, default=20000, help='In-flight limit for the async engine')
+    args = parser.parse_args()
+
+    listeners = open_listeners(args.open)
+    filtered, fillers = open_filtered(args.filtered)
+    special = {sock.getsockname()[1] for sock in listeners + filtered}
+    ports = sorted(special | set(range(1, args.ports + 1 - len(special))))
+
+    try:
+        engines = [
+            ('thread', IPScanner(threads=args.threads)),
+            ('async', AsyncIPScanner(max_inflight=args.max_inflight)),
+        ]
+        for name, scanner in engines:
+            elapsed, found = run(scanner, ports)
+            print(f"{name:<8} {len(ports)} probes in {elapsed:.2f}s "
+                  f"({len(ports) / elapsed:,.0f} probes/s), open: {found}")
+    finally:
+        for sock in listeners + filtered + fillers:
+            sock.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+开放端口结果存储基准测试
+
+模拟若干对所有端口都有响应的蜜罐主机与大量只开放少数端口的普通主机，
+比较 defaultdict(set) 与 PortResultStore 的内存占用、写入与聚合查询耗时。
+
+    python benchmarks/bench_result_store.py --dense 20 --sparse 50000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+import tracemalloc
+from collections import Counter, defaultdict
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT_DIR)
+
+from lib.utils.result_store import PortResultStore
+
+COMMON = [21, 22, 80, 443, 445, 3306, 3389, 6379, 8080, 8443]
+
+
+def workload(dense: int, sparse: int, seed: int = 1):
+    rng = random.Random(seed)
+    for i in range(dense):
+        ip = f"10.0.{i // 256}.{i % 256}"
+        for port in range(1, 65536):
+            yield ip, port
+    for i in range(sparse):
+        ip = f"10.1.{i // 256 % 256}.{i % 256}"
+        for port in rng.sample(COMMON, 3):
+            yield ip, port
+
+
+def fill(factory, add, items):
+    store = factory()
+    for ip, port in items:
+        add(store, ip, port)
+    return store
+
+
+def measure(name, factory, add, top, items):
+    start = time.perf_counter()
+    store = fill(factory, add, items)
+    insert = time.perf_counter() - start
+    start = time.perf_counter()
+    ranking = top(store)
+    query = time.perf_counter() - start
+    # tracemalloc 会拖慢写入，内存单独测量
+    del store
+    tracemalloc.start()
+    store = fill(factory, add, items)
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    print(f"{name:<18} hosts {len(store)}  memory {memory / 1024 / 1024:8.1f} MiB  insert {insert:6.2f}s  "
+          f"top ports {query * 1000:8.1f} ms  {ranking[:3]}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Open-port result store benchmark')
+    parser.add_argument('--dense', type=int, default=20, help='Hosts answering on every port')
+    parser.add_argument('--sparse', type=int, default=50000, help='Hosts with three open ports')
+    args = parser.parse_args()
+    items = list(workload(args.dense, args.sparse))
+    print(f"{len(items)} open ports on {args.dense + args.sparse} hosts")
+
+    def set_add(store, ip, port):
+        store[ip].add(port)
+
+    def set_top(store):
+        counts = Counter()
+        for ports in store.values():
+            counts.update(ports)
+        return counts.most_common(5)
+
+    measure('defaultdict(set)', lambda: defaultdict(set), set_add, set_top, items)
+    measure('PortResultStore', PortResultStore, PortResultStore.add, lambda s: s.top_ports(5), items)
+
+
+if __name__ == '__main__':
+    main()
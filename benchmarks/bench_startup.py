@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+命令行冷启动基准测试
+
+在新的解释器中多次执行 `python -X importtime -c "import mscan"`，统计导入 mscan 的累计耗时
+(不含解释器自身与 site 的初始化)，以及 `python mscan.py --help` 的总耗时，
+并列出自身耗时最多的模块和意外载入的重量级依赖。
+--history 把结果追加为一行 JSON，便于跟踪启动耗时随提交的变化。
+
+    python benchmarks/bench_startup.py --runs 10 --history reports/startup.jsonl
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 只应在对应阶段运行时载入的依赖
+HEAVY_MODULES = ['requests', 'urllib3', 'bs4', 'paramiko', 'sqlite3', 'asyncio', 'multiprocessing', 'socketserver']
+
+_LINE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$')
+
+
+def import_profile():
+    """一次冷启动导入，返回 (mscan 累计耗时 us, mscan 下各模块的自身耗时 {模块: us})"""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'import mscan'],
+        cwd=ROOT_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, universal_newlines=True, check=True
+    )
+    # 子模块先于父模块输出，mscan 之前、上一个顶层模块之后的行都属于 mscan
+    block = {}
+    for line in result.stderr.splitlines():
+        match = _LINE.match(line)
+        if not match:
+            continue
+        own, cumulative, indent, name = int(match.group(1)), int(match.group(2)), match.group(3), match.group(4)
+        if len(indent) > 1:
+            block[name] = own
+        elif name == 'mscan':
+            block[name] = own
+            return cumulative, block
+        else:
+            block = {}
+    raise RuntimeError('mscan not found in -X importtime output')
+
+
+def help_time() -> float:
+    start = time.perf_counter()
+    subprocess.run([sys.executable, 'mscan.py', '--help'], cwd=ROOT_DIR,
+                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
+    return time.perf_counter() - start
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT_DIR, stdout=subprocess.PIPE,
+                              stderr=subprocess.DEVNULL, universal_newlines=True).stdout.strip()
+    except OSError:
+        return ''
+
+
+def main():
+    parser = argparse.ArgumentParser(description='CLI cold-start benchmark')
+    parser.add_argument('--runs', type=int, default=10, help='Number of fresh interpreter runs')
+    parser.add_argument('--top', type=int, default=10, help='Number of slowest modules to list')
+    parser.add_argument('--history', help='Append the result as one JSON line to this file')
+    args = parser.parse_args()
+
+    profiles = [import_profile() for _ in range(args.runs)]
+    imports = [total for total, _ in profiles]
+    helps = [help_time() for _ in range(args.runs)]
+    # 取最快一次的模块明细，受系统抖动影响最小
+    _, modules = min(profiles, key=lambda profile: profile[0])
+
+    import_ms = statistics.median(imports) / 1000
+    help_ms = statistics.median(helps) * 1000
+    print(f"import mscan: median {import_ms:.1f} ms  min {min(imports) / 1000:.1f} ms  ({args.runs} runs)")
+    print(f"mscan --help: median {help_ms:.1f} ms  min {min(helps) * 1000:.1f} ms")
+    print("\nslowest modules (self time):")
+    for name, own in sorted(modules.items(), key=lambda item: item[1], reverse=True)[:args.top]:
+        print(f"  {own / 1000:7.2f} ms  {name}")
+    heavy = [name for name in HEAVY_MODULES if name in modules]
+    print(f"\nheavy modules loaded at startup: {', '.join(heavy) if heavy else 'none'}")
+
+    if args.history:
+        record = {
+            'time': datetime.now().isoformat(timespec='seconds'),
+            'commit': git_commit(),
+            'python': sys.version.split()[0],
+            'import_ms': round(import_ms, 2),
+            'help_ms': round(help_ms, 2),
+            'heavy': heavy,
+        }
+        with open(args.history, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record) + '\n')
+        print(f"appended to {args.history}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Web 技术识别基准测试
+
+生成一批带不同响应头、Cookie、meta generator、script 引用与正文的 HTML 响应，
+对比改造前的 identify_technologies(逐项子串判断)与规则表驱动的 TechnologyDB 的耗时，
+并核对旧实现识别出的技术是否都被新实现识别(新规则表还识别 Cookie、meta 与版本)，
+以及顶层含 | 的规则在只出现后面分支时也能命中、相互重叠的正文字面量都能被一次扫描找到。
+
+    python benchmarks/bench_technologies.py --pages 500
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT_DIR)
+
+from requests.structures import CaseInsensitiveDict
+from lib.utils.technologies import TechnologyDB
+
+HEADER_CHOICES = [
+    {'Server': 'nginx/1.18.0'}, {'Server': 'Apache/2.4.41 (Ubuntu)', 'X-Powered-By': 'PHP/7.4.3'},
+    {'Server': 'Microsoft-IIS/10.0', 'X-Powered-By': 'ASP.NET', 'X-AspNet-Version': '4.0.30319'},
+    {'Server': 'Apache-Coyote/1.1', 'Set-Cookie': 'JSESSIONID=ABC123; Path=/; HttpOnly'},
+    {'Server': 'Jetty(9.4.z-SNAPSHOT)'}, {'X-Powered-By': 'Express'},
+    {'Set-Cookie': 'laravel_session=xyz; expires=Wed, 21 Oct 2026 07:28:00 GMT; path=/, XSRF-TOKEN=abc'},
+    {}, {'Server': 'openresty'},
+]
+SNIPPETS = [
+    '<script src="/static/js/jquery-3.6.0.min.js"></script>',
+    '<script src="https://cdn.example.com/vue@2.6.14/dist/vue.min.js"></script>',
+    '<meta name="generator" content="WordPress 6.1.1">',
+    '<link rel="stylesheet" href="/wp-content/themes/x/style.css">',
+    '<meta name="generator" content="Drupal 9 (https://www.drupal.org)">',
+    '<div ng-version="15.2.0"></div>', '<a href="/index.php?id=1">', '<form action="login.aspx">',
+    '<script src="/js/bootstrap.bundle.min.js"></script>', 'Powered by phpMyAdmin',
+    '<p>Oracle WebLogic Server</p>',
+]
+FILLER = ['<div class="row">', '<span>', '</span>', '<p>lorem ipsum dolor sit amet</p>', '<li><a href="/news/1">',
+          '</a></li>', '<img src="/img/logo.png" alt="logo">', '<td>42</td>', '</div>']
+
+
+def legacy_identify(headers, content: str):
+    """改造前 CMSScanner.identify_technologies 的逻辑"""
+    technologies = set()
+    if 'Server' in headers:
+        server = headers['Server'].lower()
+        for word, name in (('nginx', 'Nginx'), ('apache', 'Apache'), ('iis', 'IIS'), ('tomcat', 'Tomcat'),
+                           ('jetty', 'Jetty')):
+            if word in server:
+                technologies.add(name)
+    if 'X-Powered-By' in headers:
+        powered_by = headers['X-Powered-By'].lower()
+        for word, name in (('php', 'PHP'), ('asp.net', 'ASP.NET'), ('jsp', 'JSP'), ('servlet', 'Java Servlet')):
+            if word in powered_by:
+                technologies.add(name)
+    content_lower = content.lower()
+    for words, name in ((('php', '.php'), 'PHP'), (('asp.net', '.aspx'), 'ASP.NET'), (('jsp', '.jsp'), 'JSP'),
+                        (('laravel',), 'Laravel'), (('django',), 'Django'), (('spring',), 'Spring'),
+                        (('struts',), 'Struts'), (('vue',), 'Vue.js'), (('react',), 'React'),
+                        (('angular',), 'Angular'), (('jquery',), 'jQuery'), (('bootstrap',), 'Bootstrap'),
+                        (('mysql',), 'MySQL'), (('postgresql',), 'PostgreSQL'), (('oracle',), 'Oracle'),
+                        (('mongodb',), 'MongoDB'), (('phpmyadmin',), 'phpMyAdmin'), (('weblogic',), 'WebLogic'),
+                        (('websphere',), 'WebSphere'), (('jboss',), 'JBoss')):
+        if any(word in content_lower for word in words):
+            technologies.add(name)
+    return technologies
+
+
+def make_pages(count: int, rng: random.Random):
+    pages = []
+    for _ in range(count):
+        parts = [rng.choice(FILLER) for _ in range(rng.randint(200, 3000))]
+        for _ in range(rng.randint(0, 4)):
+            parts.insert(rng.randrange(len(parts)), rng.choice(SNIPPETS))
+        body = f"<html><head><title>page</title></head><body>{''.join(parts)}</body></html>"
+        pages.append((CaseInsensitiveDict(rng.choice(HEADER_CHOICES)), body))
+    return pages
+
+
+def check_alternation() -> bool:
+    """规则顶层含 | 时，只出现后面分支的响应也应被识别"""
+    db = TechnologyDB({'technologies': {
+        'Proxy': {'headers': {'Server': 'nginx|openresty/?([\\d.]+)?'}},
+        'Panel': {'body': ['cpanel|plesk'], 'script': ['/vendor/(?:old)?panel\\.js|panel-([\\d.]+)\\.js']},
+    }})
+    found = db.identify(CaseInsensitiveDict({'Server': 'openresty/1.21.4'}),
+                        '<html><p>Powered by Plesk</p><script src="/js/panel-2.1.js"></script></html>')
+    return (set(found) == {'Proxy', 'Panel'} and found['Proxy']['version'] == '1.21.4'
+            and found['Panel']['version'] == '2.1')
+
+
+def check_overlap(db: TechnologyDB) -> bool:
+    """正文字面量相互重叠(jspring 中的 jsp 与 spring，phpmyadmin 中的 php)时都应被识别"""
+    found = db.identify(CaseInsensitiveDict(), '<p>jspringmysql</p><a href="/phpmyadmin/">'
+                                               '<script src="/js/jquery-3.6.0.min.js"></script>')
+    return {'JSP', 'Spring', 'MySQL', 'PHP', 'phpMyAdmin', 'jQuery'} <= set(found) and found['jQuery']['version'] == '3.6.0'
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Web technology detection benchmark')
+    parser.add_argument('--pages', type=int, default=300, help='Number of generated responses')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    pages = make_pages(args.pages, random.Random(args.seed))
+    size = sum(len(body) for _, body in pages)
+    db = TechnologyDB.load()
+    print(f"pages: {len(pages)} ({size / len(pages) / 1024:.1f} KB avg)")
+
+    start = time.perf_counter()
+    legacy = [legacy_identify(headers, body) for headers, body in pages]
+    legacy_time = time.perf_counter() - start
+    start = time.perf_counter()
+    found = [db.identify(headers, body) for headers, body in pages]
+    table_time = time.perf_counter() - start
+
+    versions = sum(1 for result in found for entry in result.values() if entry['version'])
+    print(f"legacy:     {legacy_time / len(pages) * 1000:6.3f} ms/response  "
+          f"({sum(len(r) for r in legacy)} detections)")
+    print(f"rule table: {table_time / len(pages) * 1000:6.3f} ms/response  "
+          f"({sum(len(r) for r in found)} detections, {versions} with version)")
+    missing = sum(1 for old, new in zip(legacy, found) if not old <= set(new))
+    print(f"legacy detections covered: {len(pages) - missing}/{len(pages)} responses")
+    print(f"alternation rules (a|b) match later branches: {check_alternation()}")
+    print(f"overlapping body literals all found: {check_overlap(db)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+页面标题提取基准测试
+
+生成一批接近真实站点大小的页面(几十 KB 到数 MB：头部的 meta、内联脚本与样式、注释，正文的表格与列表)，
+包括普通标题、带实体与分隔符的标题、空标题、没有标题只有 h1、标题写在正文中、标题内含子标签等情况，
+对比改造前的 extract_title(每个页面完整构建 BeautifulSoup 树)与逐标签扫描页面开头的新实现的耗时，
+并核对两者提取的标题一致。
+
+    python benchmarks/bench_title.py --pages 200 --max-kb 4096
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT_DIR)
+
+from bs4 import BeautifulSoup
+from config.settings import WEB_TITLE_SCAN_CHARS
+from lib.scanners.web_scanner import CMSScanner
+from lib.utils.html_title import head_title
+
+TITLES = ['Dashboard - Acme Corp', 'Login | Admin Console', 'Tom &amp; Jerry&#39;s Shop', '  GitLab  ',
+          '管理后台 :: 登录', 'Apache Tomcat/9.0.41', 'Welcome to nginx!', 'None', 'Grafana » Home']
+HEAD = ['<meta charset="utf-8">', '<meta name="viewport" content="width=device-width, initial-scale=1">',
+        '<link rel="stylesheet" href="/static/css/app.css">', '<!-- <title>commented out</title> -->',
+        '<script>window.__CONFIG__ = {"title": "<title>not this</title>", "items": [1, 2, 3]};</script>',
+        '<style>body { font-family: sans-serif } .title { color: red }</style>']
+FILLER = ['<div class="row"><span>item</span></div>', '<li><a href="/news/1">Latest news</a></li>',
+          '<tr><td>42</td><td>value</td></tr>', '<p>lorem ipsum dolor sit amet, consectetur adipiscing</p>',
+          '<img src="/img/logo.png" alt="logo">']
+
+
+def legacy_extract_title(content: str) -> str:
+    """改造前 CMSScanner.extract_title 的逻辑"""
+    try:
+        soup = BeautifulSoup(content, 'html.parser')
+        if soup.title and soup.title.string:
+            title = soup.title.string.strip()
+            if title and title.lower() != 'none':
+                for separator in [' - ', ' | ', ' :: ', ' » ', ' > ', ' / ']:
+                    if separator in title:
+                        title = title.split(separator)[0].strip()
+                return title
+        h1_tags = soup.find_all('h1', limit=1)
+        if h1_tags:
+            h1_text = h1_tags[0].get_text().strip()
+            if h1_text and h1_text.lower() != 'none':
+                return h1_text
+        main_content = soup.find(['main', 'article', 'div'], class_=lambda x: x and any(word in x.lower() for word in ['main', 'content', 'article']))
+        if main_content:
+            main_title = main_content.find(['h1', 'h2', 'h3'])
+            if main_title and main_title.string:
+                return main_title.string.strip()
+        return 'Web Page'
+    except Exception:
+        return 'Web Page'
+
+
+def make_page(rng: random.Random, max_kb: int) -> str:
+    size = int(min(max_kb, rng.choice((30, 80, 200, 600, 1500, 4000))) * 1024 * rng.uniform(0.5, 1.0))
+    head = [rng.choice(HEAD) for _ in range(rng.randint(3, 12))]
+    kind = rng.random()
+    title = f"<title>{rng.choice(TITLES)}</title>"
+    body_title = ''
+    if kind < 0.85:
+        head.insert(rng.randrange(len(head) + 1), title)
+    elif kind < 0.88:
+        head.append('<title></title>')
+    elif kind < 0.91:
+        head.append('<title>Portal <b>Beta</b></title>')
+    elif kind < 0.94:
+        body_title = title
+    # 其余页面没有标题，只能从页面靠前的 h1 或主要内容区域取
+    parts, length = [], 0
+    while length < size:
+        part = rng.choice(FILLER)
+        parts.append(part)
+        length += len(part)
+    parts.insert(rng.randrange(50), f'<div class="main-content"><h2>Section {rng.randint(1, 99)}</h2></div>')
+    if rng.random() < 0.5:
+        parts.insert(rng.randrange(50), f"<h1>Heading {rng.randint(1, 99)}</h1>")
+    return f"<!DOCTYPE html><html><head>{''.join(head)}</head><body>{body_title}{''.join(parts)}</body></html>"
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Page title extraction benchmark')
+    parser.add_argument('--pages', type=int, default=50, help='Number of generated pages')
+    parser.add_argument('--max-kb', type=int, default=1024, help='Largest page size (KB)')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    pages = [make_page(rng, args.max_kb) for _ in range(args.pages)]
+    print(f"pages: {len(pages)} ({sum(map(len, pages)) / len(pages) / 1024:.0f} KB avg, "
+          f"largest {max(map(len, pages)) / 1024:.0f} KB)")
+    # 只调用 extract_title，不需要载入指纹库
+    scanner = CMSScanner.__new__(CMSScanner)
+
+    start = time.perf_counter()
+    legacy = [legacy_extract_title(content) for content in pages]
+    legacy_time = time.perf_counter() - start
+    start = time.perf_counter()
+    bounded = [scanner.extract_title(content) for content in pages]
+    bounded_time = time.perf_counter() - start
+
+    fast = sum(1 for content in pages if head_title(content, WEB_TITLE_SCAN_CHARS))
+    print(f"title found in the scanned prefix: {fast}/{len(pages)} pages")
+    print(f"legacy:  {legacy_time / len(pages) * 1000:8.2f} ms/page")
+    print(f"bounded: {bounded_time / len(pages) * 1000:8.2f} ms/page  speedup: {legacy_time / bounded_time:.0f}x")
+    mismatched = [(old, new) for old, new in zip(legacy, bounded) if old != new]
+    print(f"identical titles: {len(pages) - len(mismatched)}/{len(pages)}")
+    for old, new in mismatched[:5]:
+        print(f"  legacy={old!r}  bounded={new!r}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+UDP 扫描引擎的回环基准测试
+
+在 127.0.0.1 ~ 127.0.0.N 上启动 DNS/NTP/SNMP/memcached 的 UDP 替身服务
+(按比例随机丢弃收到的数据报以触发重传)，用 UDPScanner 扫描这些主机的服务端口和若干关闭端口，
+输出耗时、每秒探测/主机数、重传次数，并核对发现的端口与实际开放的端口是否一致。
+
+    python benchmarks/bench_udp_scan.py --hosts 200 --loss 0.2
+"""
+import argparse
+import contextlib
+import io
+import ipaddress
+import os
+import random
+import selectors
+import socket
+import sys
+import threading
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT_DIR)
+
+from lib.scanners.udp_scanner import UDPScanner
+from lib.utils.ports import PortSpec
+
+# 各服务的替身响应，只需像对应协议的回复即可
+RESPONSES = {
+    53: lambda data: data[:2] + b'\x81\x80' + data[4:],
+    123: lambda data: b'\x24\x02\x00\xe7' + b'\x00' * 44,
+    161: lambda data: data,
+    11211: lambda data: data[:8] + b'STAT pid 1\r\nEND\r\n',
+}
+
+
+class StandIns:
+    """在多个回环地址上监听 UDP 端口的替身服务，单线程处理所有 socket"""
+
+    def __init__(self, hosts, ports, loss: float, seed: int = 1):
+        self.loss = loss
+        self.random = random.Random(seed)
+        self.selector = selectors.DefaultSelector()
+        self.sockets = []
+        self.open = {}
+        for ip in hosts:
+            for port in ports:
+                sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+                sock.bind((ip, port))
+                sock.setblocking(False)
+                self.selector.register(sock, selectors.EVENT_READ, port)
+                self.sockets.append(sock)
+                self.open.setdefault(ip, set()).add(port)
+        self.received = 0
+        self.dropped = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._serve, daemon=True)
+
+    def _serve(self):
+        while not self._stop.is_set():
+            for key, _ in self.selector.select(0.1):
+                sock, port = key.fileobj, key.data
+                while True:
+                    try:
+                        data, address = sock.recvfrom(2048)
+                    except (BlockingIOError, InterruptedError):
+                        break
+                    self.received += 1
+                    if self.random.random() < self.loss:
+                        self.dropped += 1
+                        continue
+                    sock.sendto(RESPONSES.get(port, lambda d: d)(data), address)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        for sock in self.sockets:
+            sock.close()
+        self.selector.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Loopback UDP scan benchmark')
+    parser.add_argument('--hosts', type=int, default=200, help='Number of loopback hosts scanned')
+    parser.add_argument('--open-hosts', type=float, default=0.5, help='Fraction of hosts running the stand-ins')
+    parser.add_argument('--closed-ports', type=int, default=20, help='Extra closed ports per host')
+    parser.add_argument('--loss', type=float, default=0.1, help='Fraction of datagrams dropped by the stand-ins')
+    parser.add_argument('--max-inflight', type=int, help='Maximum in-flight probes')
+    args = parser.parse_args()
+
+    hosts = [str(ipaddress.IPv4Address(0x7f000001 + i)) for i in range(args.hosts)]
+    picker = random.Random(2)
+    serving = sorted(picker.sample(hosts, max(1, int(len(hosts) * args.open_hosts))))
+    ports = PortSpec.parse(f"U:{','.join(map(str, RESPONSES))},40000-{40000 + args.closed_ports - 1}").udp
+
+    with StandIns(serving, list(RESPONSES), args.loss) as stand_ins:
+        scanner = UDPScanner(max_inflight=args.max_inflight, seed=1, min_rtt_timeout=0.05, max_rtt_timeout=0.5)
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            found = scanner.scan([hosts], ports, len(hosts))
+        elapsed = time.perf_counter() - start
+
+    expected = stand_ins.open
+    missing = sum(len(expected[ip] - found.get(ip, set())) for ip in expected)
+    extra = sum(len(found[ip] - expected.get(ip, set())) for ip in found)
+    probes = len(hosts) * len(ports)
+    print(f"hosts: {len(hosts)} ({len(serving)} serving)  ports/host: {len(ports)}  loss: {args.loss:.0%}")
+    print(f"elapsed: {elapsed:.2f}s  probes/s: {probes / elapsed:.0f}  hosts/s: {len(hosts) / elapsed:.0f}")
+    print(f"datagrams sent: {scanner.sent} ({scanner.retransmits} retransmits)  max tries: {scanner.max_tries}  "
+          f"stand-ins received: {stand_ins.received} (dropped {stand_ins.dropped})")
+    print(f"open ports found: {sum(len(p) for p in found.values())}/{sum(len(p) for p in expected.values())}  "
+          f"missing: {missing}  unexpected: {extra}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+Web 识别引擎的回环基准测试
+
+在独立进程中用 asyncio 启动 HTTP/1.1 替身服务，监听 0.0.0.0 上的若干端口，
+按连接的目的地址(127.0.0.1 ~ 127.0.0.N)与端口把每个 ip:port 当作一个虚拟站点：
+不同站点返回不同标题与指纹，包括相对/绝对跳转、chunked、gzip、无长度(读到关闭)、404，
+以及 20MB 的页面与二进制文件、无限 chunked 流、gzip 炸弹(检验响应体读取上限)等，
+每个响应前等待 --delay 秒模拟网络延迟。分别用线程引擎(CMSScanner)与 async 引擎(AsyncCMSScanner)
+识别全部站点，输出耗时、每秒目标数，并核对两个引擎的识别结果是否一致。
+
+    python benchmarks/bench_web_scan.py --hosts 500 --ports 4 --delay 0.2
+"""
+import argparse
+import asyncio
+import gzip
+import ipaddress
+import multiprocessing
+import os
+import resource
+import sys
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT_DIR)
+
+from lib.utils.net import usable_fds
+from lib.utils.progress import console
+
+COMPARED = ('status_code', 'title', 'server', 'cms', 'technologies', 'content_length')
+HUGE_BYTES = 20 * 1024 * 1024
+# 20MB 的页面与二进制文件、解压后 200MB 的 gzip 数据(页面本身在开头)，在服务进程中生成一次
+LARGE_BODIES = {}
+
+
+def page(title: str, body: str = '') -> bytes:
+    return f"<html><head><title>{title}</title></head><body><h1>{title}</h1>{body}</body></html>".encode()
+
+
+def site(ip: str, port: int, path: str):
+    """虚拟站点的响应：(状态码, 响应头, 响应体, 传输方式)"""
+    index = int(ipaddress.IPv4Address(ip)) + port
+    kind = index % 10
+    name = f"{ip}:{port}"
+    if kind == 0:
+        if path == '/':
+            return 302, {'Location': '/login'}, b'', 'length'
+        return 200, {'Server': 'nginx/1.18.0'}, page(f"Login - {name}", 'jquery.min.js'), 'length'
+    if kind == 1:
+        if path == '/':
+            return 301, {'Location': f"http://{name}/home/"}, b'', 'length'
+        return 200, {'Server': 'Apache/2.4.41'}, page(f"Home {name}", 'bootstrap'), 'length'
+    if kind == 2:
+        return 200, {'Server': 'nginx'}, page(f"Chunked {name}", 'vue' * 100), 'chunked'
+    if kind == 3:
+        return 200, {'Server': 'nginx'}, page(f"Blog {name}", '<link href="/wp-content/style.css">'), 'length'
+    if kind == 4:
+        return 404, {'Server': 'Apache'}, page('404 Not Found'), 'length'
+    if kind == 5:
+        return 200, {'X-Powered-By': 'PHP/7.4'}, page(f"Gzip {name}", 'thinkphp ' * 200), 'gzip'
+    if kind == 6:
+        return 200, {'Server': 'Apache-Coyote/1.1'}, page('Apache Tomcat/9.0.41'), 'length'
+    if kind == 7:
+        return 200, {'Server': 'lighttpd'}, page(f"Close {name}"), 'close'
+    if kind == 8:
+        # 超大页面、无限 chunked 流、gzip 炸弹与二进制文件，检验响应体读取上限
+        variant = (index // 10) % 5
+        if variant == 1:
+            return 200, {'Server': 'IIS'}, LARGE_BODIES['huge'], 'length'
+        if variant == 2:
+            return 200, {'Server': 'IIS'}, page(f"Endless {name}", 'asp.net '), 'endless'
+        if variant == 3:
+            return 200, {'Server': 'IIS'}, LARGE_BODIES['bomb'], 'bomb'
+        if variant == 4:
+            return 200, {'Server': 'IIS', 'Content-Type': 'application/octet-stream'}, LARGE_BODIES['file'], 'length'
+        return 200, {'Server': 'IIS'}, page(f"Large {name}", 'asp.net ' + 'x' * 50000), 'length'
+    return 200, {'X-Powered-By': 'Express'}, page(f"Site {name} | Portal", 'react'), 'length'
+
+
+async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter, delay: float) -> None:
+    ip, port = writer.get_extra_info('sockname')[:2]
+    try:
+        while True:
+            request = await reader.readuntil(b'\r\n\r\n')
+            path = request.split(b' ', 2)[1].decode()
+            await asyncio.sleep(delay)
+            status, headers, body, mode = site(ip, port, path)
+            head = [f"HTTP/1.1 {status} X"]
+            headers.setdefault('Content-Type', 'text/html; charset=utf-8')
+            head.extend(f"{name}: {value}" for name, value in headers.items())
+            if mode == 'endless':
+                head.append('Transfer-Encoding: chunked')
+                writer.write(('\r\n'.join(head) + '\r\n\r\n').encode())
+                chunk = b'%x\r\n%s\r\n' % (len(body), body) + b'%x\r\n%s\r\n' % (65536, b'x' * 65536)
+                while True:
+                    writer.write(chunk)
+                    await writer.drain()
+            if mode == 'bomb':
+                head.extend(['Content-Encoding: gzip', f"Content-Length: {len(body)}"])
+            elif mode == 'chunked':
+                head.append('Transfer-Encoding: chunked')
+                half = len(body) // 2
+                body = b''.join(b'%x\r\n%s\r\n' % (len(part), part) for part in (body[:half], body[half:])) + b'0\r\n\r\n'
+            elif mode == 'gzip':
+                body = gzip.compress(body)
+                head.extend(['Content-Encoding: gzip', f"Content-Length: {len(body)}"])
+            elif mode == 'close':
+                head.append('Connection: close')
+            else:
+                head.append(f"Content-Length: {len(body)}")
+            writer.write(('\r\n'.join(head) + '\r\n\r\n').encode() + body)
+            await writer.drain()
+            if mode == 'close':
+                break
+    except (asyncio.IncompleteReadError, ConnectionError, asyncio.LimitOverrunError):
+        pass
+    finally:
+        writer.close()
+
+
+def serve(ports, delay: float, ready) -> None:
+    usable_fds(20000)
+    LARGE_BODIES['huge'] = page('Huge', 'asp.net ' + 'x' * HUGE_BYTES)
+    LARGE_BODIES['file'] = b'\x7fELF' + b'\0' * HUGE_BYTES
+    LARGE_BODIES['bomb'] = gzip.compress(page('Bomb', 'asp.net ') + b' ' * (200 * 1024 * 1024), 9)
+
+    async def main():
+        for port in ports:
+            await asyncio.start_server(lambda r, w: handle(r, w, delay), '0.0.0.0', port, backlog=4096)
+        ready.set()
+        await asyncio.Event().wait()
+
+    asyncio.run(main())
+
+
+def run_engine(engine: str, targets, max_inflight: int):
+    if engine == 'async':
+        from lib.scanners.async_web_scanner import AsyncCMSScanner
+        scanner = AsyncCMSScanner(max_inflight=max_inflight)
+    else:
+        from lib.scanners.web_scanner import CMSScanner
+        scanner = CMSScanner()
+    start = time.perf_counter()
+    try:
+        results = scanner.scan(targets)
+    finally:
+        scanner.close()
+    return results, time.perf_counter() - start, scanner.congestion.window
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Loopback web detection benchmark')
+    parser.add_argument('--hosts', type=int, default=500, help='Number of loopback hosts')
+    parser.add_argument('--ports', type=int, default=4, help='Listening ports per host')
+    parser.add_argument('--closed', type=int, default=1, help='Extra closed ports per host')
+    parser.add_argument('--delay', type=float, default=0.2, help='Server delay (seconds) before each response')
+    parser.add_argument('--max-inflight', type=int, help='Max in-flight requests for the async engine')
+    parser.add_argument('--engines', default='thread,async', help='Engines to run, comma separated')
+    args = parser.parse_args()
+
+    ports = list(range(18000, 18000 + args.ports))
+    closed = list(range(19000, 19000 + args.closed))
+    hosts = [str(ipaddress.IPv4Address(0x7f000001 + i)) for i in range(args.hosts)]
+    targets = {ip: set(ports + closed) for ip in hosts}
+    total = args.hosts * (args.ports + args.closed)
+
+    ready = multiprocessing.Event()
+    server = multiprocessing.Process(target=serve, args=(ports, args.delay, ready), daemon=True)
+    server.start()
+    ready.wait(10)
+    usable_fds(20000)
+    console.configure(quiet=True)
+    # 指纹库不存在时第一个扫描器才创建它，先创建好，两个引擎使用相同的指纹
+    from lib.scanners.web_scanner import CMSScanner
+    CMSScanner().close()
+
+    print(f"targets: {total} ({args.hosts} hosts x {args.ports} web + {args.closed} closed ports)  "
+          f"delay: {args.delay * 1000:.0f}ms")
+    found = {}
+    try:
+        for engine in args.engines.split(','):
+            results, elapsed, window = run_engine(engine, targets, args.max_inflight)
+            found[engine] = results
+            peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+            print(f"{engine:>6}: {elapsed:6.2f}s  targets/s: {total / elapsed:7.0f}  "
+                  f"identified: {len(results)}  final window: {window}  peak RSS: {peak:.0f}MB")
+    finally:
+        server.terminate()
+
+    if len(found) == 2:
+        (first, a), (second, b) = found.items()
+        mismatched = [key for key in set(a) | set(b)
+                      if key not in a or key not in b
+                      or any(a[key][field] != b[key][field] for field in COMPARED)]
+        print(f"results identical: {not mismatched}  mismatched targets: {len(mismatched)}")
+        for key in sorted(mismatched)[:5]:
+            print(f"  {key}: {first}={ {f: a.get(key, {}).get(f) for f in COMPARED} }")
+            print(f"  {' ' * len(key)}  {second}={ {f: b.get(key, {}).get(f) for f in COMPARED} }")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+多进程分片扫描回环基准测试
+
+对 127.0.0.0/N 回环网段(-Pn)执行端口扫描，依次使用 1、2、4 ... 个工作进程，
+输出每秒探测数与相对单进程的加速比。127.0.0.1 上会打开若干监听端口，
+其余地址的连接立即被拒绝，耗时主要是 Python 侧的探测与结果处理开销，
+因此加速比反映的是绕开 GIL 后的多核扩展能力。
+
+    python benchmarks/bench_workers.py --hosts 4096 --ports 25 --max-workers 8
+"""
+import argparse
+import contextlib
+import io
+import ipaddress
+import os
+import socket
+import sys
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT_DIR)
+
+from mscan import parse_args
+from core.runner import ScanRunner, ShardedRunner
+
+
+def open_listeners(count: int):
+    listeners = []
+    for _ in range(count):
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.bind(('127.0.0.1', 0))
+        sock.listen(1024)
+        listeners.append(sock)
+    return listeners
+
+
+def run(argv, workers: int):
+    args = parse_args(argv)
+    runner = ShardedRunner(args, workers=workers) if workers > 1 else ScanRunner(args)
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        runner.run()
+    elapsed = time.perf_counter() - start
+    return elapsed, sum(len(p) for p in runner.results['ports'].values())
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Loopback multi-process scan benchmark')
+    parser.add_argument('--hosts', type=int, default=4096, help='Number of loopback hosts (power of two)')
+    parser.add_argument('--ports', type=int, default=25, help='Ports per host')
+    parser.add_argument('--open', type=int, default=5, help='Listening ports on 127.0.0.1')
+    parser.add_argument('--threads', type=int, default=200, help='Threads per worker process')
+    parser.add_argument('--engine', choices=['thread', 'async'], default='thread')
+    parser.add_argument('--max-workers', type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    listeners = open_listeners(args.open)
+    open_ports = [sock.getsockname()[1] for sock in listeners]
+    ports = open_ports + list(range(1, args.ports - len(open_ports) + 1))
+    prefix = 32 - (max(args.hosts, 4) - 1).bit_length()
+    network = ipaddress.ip_network(f'127.0.0.0/{prefix}')
+    argv = [
+        '-i', str(network), '-Pn', '-p', ','.join(map(str, ports)),
+        '-t', str(args.threads), '--engine', args.engine, '--seed', '1',
+        '--no-web', '--no-ssh', '--no-ftp', '--no-report', '--no-checkpoint',
+    ]
+    probes = (network.num_addresses - 2) * len(ports)
+
+    try:
+        baseline = None
+        workers = 1
+        while workers <= args.max_workers:
+            elapsed, found = run(argv, workers)
+            baseline = baseline or elapsed
+            print(f"workers={workers:<3} {probes} probes in {elapsed:.2f}s "
+                  f"({probes / elapsed:,.0f} probes/s, x{baseline / elapsed:.2f}), open: {found}")
+            workers *= 2
+    finally:
+        for sock in listeners:
+            sock.close()
+
+
+if __name__ == '__main__':
+    main()
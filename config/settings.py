@@ -5,6 +5,71 @@ THREADS = 500
 TIMEOUT = 3
 MAX_RETRIES = 3
 
+# 端口扫描引擎配置
+SCAN_ENGINES = ['thread', 'async']
+CONNECT_TIMEOUT = 1.0        # connect 探测超时(秒)
+ASYNC_MAX_INFLIGHT = 20000   # async 引擎最大在途探测数
+RTT_MIN_TIMEOUT = 0.1        # 自适应超时下限(秒)
+RTT_MAX_TIMEOUT = 3.0        # 自适应超时上限(秒)
+
+# 自适应并发控制(AIMD)配置
+CONGESTION_INITIAL_WINDOW = 64   # 初始在途任务数，之后按探测结果自动增减
+WEB_MAX_INFLIGHT = 200           # Web识别最大并发请求数
+WEB_INITIAL_INFLIGHT = 20        # Web识别初始并发请求数
+BRUTE_INITIAL_INFLIGHT = 16      # SSH/FTP爆破初始并发尝试数
+
+# Web识别引擎配置
+WEB_ENGINES = ['thread', 'async']
+WEB_TIMEOUT = 1.0                # 建立连接及每次读取响应的超时(秒)
+WEB_ASYNC_MAX_INFLIGHT = 2000    # async 引擎最大在途请求数
+WEB_PER_HOST_CONNECTIONS = 8     # async 引擎对同一主机同时打开的最大连接数
+WEB_ANALYZE_THREADS = 4          # async 引擎解析响应(标题、技术栈、指纹)的线程数
+WEB_MAX_BODY_BYTES = 1048576     # 每个响应最多读取的字节数(压缩时按传输的字节计)，超出部分不再读取
+WEB_MAX_DECODED_BYTES = 4194304  # 响应体解压后最多保留的字节数，防止解压炸弹
+WEB_BINARY_BODY_BYTES = 16384    # 非文本响应(图片、下载文件等)只读取开头的字节数
+WEB_TITLE_SCAN_CHARS = 65536     # 提取标题时逐标签扫描的页面前缀长度(字符)
+WEB_TITLE_FALLBACK_CHARS = 262144  # 前缀中找不到标题时，用 HTML 解析查找 h1 等标题的页面前缀长度(字符)
+CHARSET_SNIFF_BYTES = 4096       # 查找 BOM 与 <meta charset> 的页面开头字节数
+CHARSET_SAMPLE_BYTES = 32768     # 无法确定编码时统计检测的样本字节数
+CHARSET_CACHE_SIZE = 4096        # 按主机缓存页面编码的主机数
+
+# Banner 抓取配置
+BANNER_READ_TIMEOUT = 0.5    # 连接建立后被动等待 banner 的时间(秒)
+BANNER_PROBE_TIMEOUT = 1.0   # 没有 banner 时发送探测后等待响应的时间(秒)
+BANNER_MAX_BYTES = 1024      # 读取的最大字节数
+
+# UDP 扫描配置
+UDP_SOCKETS = 4              # 共享的 UDP socket 数，探测轮流从各 socket 发出
+UDP_MAX_INFLIGHT = 8192      # 最大在途(等待响应)探测数
+UDP_MIN_TRIES = 2            # 每个探测至少发送的次数(含重传)
+UDP_MAX_TRIES = 5            # 发送次数上限，探测在第 N 次才收到响应时后续探测最多发送 N+1 次
+UDP_RECV_BATCH = 256         # socket 可读时连续接收的最大数据报数
+UDP_SOCKET_BUFFER = 4 << 20  # 每个 socket 的收发缓冲区大小(字节)
+
+# 主机存活探测配置
+DISCOVERY_PORTS = [80, 443, 22, 445, 3389, 8080]  # TCP 存活探测端口
+DISCOVERY_TIMEOUT = 1.0      # 每批探测等待响应的时间(秒)
+DISCOVERY_BATCH = 256        # 每批探测的主机数
+
+# 控制台输出配置
+PROGRESS_INTERVAL = 0.5      # 状态栏刷新及结果行批量输出的间隔(秒)
+
+# 流水线配置
+PIPELINE_QUEUE_SIZE = 1024   # 每个阶段排队的开放端口事件上限，队列满时端口扫描等待(背压)
+PIPELINE_BRUTE_WORKERS = 16  # 流水线模式下 SSH/FTP 各自同时爆破的目标数
+PIPELINE_DISPATCH_THREADS = 4  # async 端口扫描引擎记录并分发开放端口的线程数，下游队列满时在这些线程中等待
+
+# 检查点配置
+CHECKPOINT_BATCH = 256       # 日志缓冲的记录数，达到后批量写盘
+CHECKPOINT_INTERVAL = 5.0    # 日志最长写盘间隔(秒)
+
+# 分布式扫描配置
+DIST_PORT = 7700             # 协调节点默认监听端口
+DIST_STEAL_AFTER = 30.0      # 分块运行超过该时间(秒，且超过平均耗时的两倍)后允许空闲节点重复执行
+DIST_MAX_COPIES = 2          # 同一分块最多同时分配给几个工作节点
+DIST_RETRY = 1.0             # 暂无可分配分块时工作节点的等待间隔(秒)
+DIST_MAX_FAILURES = 3        # 分块在工作节点上失败该次数后不再分配，记为失败
+
 # HTTP配置
 USER_AGENT = "VulScanner/1.0"
 DEFAULT_HEADERS = {
@@ -18,12 +83,17 @@ DEFAULT_HEADERS = {
 LOG_LEVEL = "INFO"
 LOG_FILE = "vulscanner.log"
 
-# 默认端口配置
+# 默认端口配置(端口描述语法见 lib/utils/ports.py)
 DEFAULT_PORTS = {
     'common': '21,22,23,25,53,80,110,139,143,443,445,465,993,995,1433,1521,3306,3389,5432,5900,6379,8080,8443,9200,27017',
     'minimal': '80,443,8080',
-    'full': ','.join(map(str, range(1, 65536)))
+    'full': '1-65535',
+    'udp': 'U:53,69,123,137,161,500,623,1434,1900,5353,11211'
 }
+DEFAULT_PORT_MODE = 'common'
+
+# 不打散探测顺序时，每段端口依次扫描所有主机，避免对单个主机连续发起整段端口的连接
+PORT_CHUNK_SIZE = 1024
 
 # 扫描模式说明
 PORT_MODE_DESC = {
@@ -32,86 +102,8 @@ PORT_MODE_DESC = {
     'db': '数据库端口',
     'remote': '远程服务端口',
     'mail': '邮件服务端口',
-    'full': '完整端口扫描(1-65536)'
-}
-
-# 端口服务映射
-PORT_MAP = {
-    20: 'FTP-DATA',
-    21: 'FTP',
-    22: 'SSH',
-    23: 'Telnet',
-    25: 'SMTP',
-    53: 'DNS',
-    80: 'HTTP',
-    81: 'HTTP',
-    88: 'Kerberos',
-    110: 'POP3',
-    111: 'RPC',
-    123: 'NTP',
-    135: 'RPC',
-    139: 'NetBIOS',
-    143: 'IMAP',
-    161: 'SNMP',
-    389: 'LDAP',
-    443: 'HTTPS',
-    445: 'SMB',
-    465: 'SMTPS',
-    500: 'IKE',
-    512: 'rexec',
-    513: 'rlogin',
-    514: 'syslog',
-    515: 'LPD',
-    520: 'RIP',
-    523: 'IBM-DB2',
-    548: 'AFP',
-    623: 'IPMI',
-    626: 'serialnumberd',
-    636: 'LDAPS',
-    873: 'rsync',
-    902: 'VMware',
-    1080: 'SOCKS',
-    1099: 'RMI',
-    1433: 'MSSQL',
-    1434: 'MSSQL-UDP',
-    1521: 'Oracle',
-    1158: 'Oracle-EMCTL',
-    2082: 'cPanel',
-    2083: 'cPanel-SSL',
-    2181: 'ZooKeeper',
-    2222: 'SSH',
-    2375: 'Docker',
-    2601: 'zebra',
-    2604: 'zebra',
-    3128: 'Squid',
-    3306: 'MySQL',
-    3312: 'Kangle',
-    3389: 'RDP',
-    3690: 'SVN',
-    4440: 'Rundeck',
-    4848: 'GlassFish',
-    5432: 'PostgreSQL',
-    5632: 'PCAnywhere',
-    5900: 'VNC',
-    5984: 'CouchDB',
-    6379: 'Redis',
-    7001: 'WebLogic',
-    7002: 'WebLogic',
-    8000: 'HTTP',
-    8080: 'HTTP-Proxy',
-    8089: 'HTTP',
-    8443: 'HTTPS',
-    8888: 'HTTP',
-    9000: 'HTTP',
-    9001: 'HTTP',
-    9090: 'HTTP',
-    9200: 'Elasticsearch',
-    9300: 'Elasticsearch',
-    10000: 'Webmin',
-    11211: 'Memcached',
-    27017: 'MongoDB',
-    27018: 'MongoDB',
-    50000: 'DB2'
+    'full': '完整端口扫描(1-65535)',
+    'udp': '常见 UDP 服务端口'
 }
 
 # 获取项目根目录
@@ -120,6 +112,17 @@ PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 # 数据文件路径
 DATA_DIR = os.path.join(PROJECT_ROOT, 'data')
 
+# 服务识别规则库(端口默认服务、探测与 banner 匹配规则)
+SERVICE_PROBES_FILE = os.path.join(PROJECT_ROOT, 'config', 'service_probes.json')
+
+# Web 技术识别规则(响应头、Cookie、meta、script src、页面内容)
+TECHNOLOGIES_FILE = os.path.join(PROJECT_ROOT, 'config', 'technologies.json')
+
+# 主机缓存配置(--cache)
+HOST_CACHE_FILE = os.path.join(DATA_DIR, 'host_cache.db')  # 默认缓存文件
+HOST_CACHE_TTL = 24.0         # 存活/未响应记录的有效期(小时)，过期后重新探测
+HOST_CACHE_DEAD_SAMPLE = 0.05  # 有效期内未响应的主机仍抽样重新探测的比例
+
 # SSH爆破配置
 SSH_USERS = [
     'root',      # Linux系统root用户
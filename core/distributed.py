@@ -0,0 +1,422 @@
+import hmac
+import ipaddress
+import json
+import logging
+import socket
+import socketserver
+import threading
+import time
+from argparse import Namespace
+from collections import deque
+from typing import Any, Dict, Optional, Set, Tuple
+from colorama import Fore, Style
+from lib.utils.checkpoint import ScanJournal, json_default
+from lib.utils.progress import console
+from lib.utils.targets import TargetSet
+from core.runner import ScanRunner, SCAN_ARGS, merge_results
+from config.settings import (DISCOVERY_BATCH, DIST_PORT, DIST_STEAL_AFTER, DIST_MAX_COPIES, DIST_RETRY,
+                             DIST_MAX_FAILURES)
+
+PROTOCOL_VERSION = 1
+CONNECT_RETRIES = 30
+
+
+def parse_address(value: str, default_host: str) -> Tuple[str, int]:
+    """解析 HOST:PORT、:PORT 或 PORT"""
+    host, _, port = str(value).rpartition(':')
+    return host.strip('[]') or default_host, int(port) if port else DIST_PORT
+
+
+def coordinator_address(args: Namespace) -> Tuple[str, int]:
+    """
+    协调节点的监听地址，未指定主机时只监听 127.0.0.1
+
+    任何能连上协调节点的人都可以读取扫描参数并提交伪造的结果，监听非回环地址时必须设置 --token。
+    """
+    host, port = parse_address(args.coordinator, '127.0.0.1')
+    try:
+        loopback = host == 'localhost' or ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        loopback = False
+    if not loopback and not args.token:
+        raise ValueError(f"listening on {host} requires --token (or bind 127.0.0.1)")
+    return host, port
+
+
+def decode_results(results: Dict) -> Dict:
+    """把 JSON 传输的结果还原为扫描器使用的结构(端口、技术栈为 set)"""
+    for key in ('ports', 'udp'):
+        results[key] = {ip: set(ports) for ip, ports in results.get(key, {}).items()}
+    for result in results.get('web', {}).values():
+        result['technologies'] = set(result.get('technologies') or ())
+    return results
+
+
+class Channel:
+    """按行分隔的 JSON 消息通道"""
+
+    def __init__(self, sock: socket.socket):
+        self.sock = sock
+        self.reader = sock.makefile('rb')
+
+    def send(self, message: Dict[str, Any]) -> None:
+        data = json.dumps(message, ensure_ascii=False, default=json_default).encode('utf-8')
+        self.sock.sendall(data + b'\n')
+
+    def recv(self) -> Dict[str, Any]:
+        line = self.reader.readline()
+        if not line:
+            raise ConnectionError('connection closed')
+        return json.loads(line)
+
+
+class ChunkScheduler:
+    """
+    目标分块调度
+
+    未分配的分块按顺序发给请求任务的工作节点；全部分配完后，
+    运行时间超过 DIST_STEAL_AFTER 秒且超过平均耗时两倍的分块会再分配给空闲节点
+    (工作窃取)，先返回的结果生效。工作节点断开时，只分配给它的分块重新排队。
+    分块执行失败时排到队尾，优先分配给其它节点(刚失败的节点没有其它分块可做时才会再拿到它)，
+    失败 max_failures 次后记为失败并计入已结束的分块，不再分配。
+    """
+
+    def __init__(self, total: int, done: Set[int] = (), max_failures: int = None):
+        self.total = total
+        self.max_failures = max_failures or DIST_MAX_FAILURES
+        self.done = {index for index in done if index < total}
+        self.failed: Set[int] = set()
+        self.pending = deque(index for index in range(total) if index not in self.done)
+        self.running: Dict[int, Dict[str, float]] = {}   # 分块 -> {工作节点: 开始时间}
+        self.failures: Dict[int, int] = {}               # 分块 -> 失败次数
+        self._last_failed: Dict[int, str] = {}           # 分块 -> 最近一次执行失败的工作节点
+        self.finished = threading.Event()
+        self._elapsed = 0.0
+        self._completed = 0
+        self._lock = threading.Lock()
+        if len(self.done) >= total:
+            self.finished.set()
+
+    def next_chunk(self, worker: str) -> Optional[int]:
+        """为工作节点分配一个分块，暂无可分配的分块时返回 None"""
+        with self._lock:
+            retry = None
+            for _ in range(len(self.pending)):
+                index = self.pending.popleft()
+                if index in self.done or index in self.failed:
+                    continue
+                if self._last_failed.get(index) == worker:
+                    # 刚在该节点上失败的分块留给其它节点
+                    self.pending.append(index)
+                    if retry is None:
+                        retry = index
+                    continue
+                return self._assign(worker, index)
+            index = self._steal(worker)
+            if index is None and retry is not None:
+                self.pending.remove(retry)
+                index = self._assign(worker, retry)
+            return index
+
+    def _assign(self, worker: str, index: int) -> int:
+        self.running.setdefault(index, {})[worker] = time.time()
+        return index
+
+    def _steal(self, worker: str) -> Optional[int]:
+        now = time.time()
+        average = self._elapsed / self._completed if self._completed else 0.0
+        threshold = max(DIST_STEAL_AFTER, average * 2)
+        candidates = [
+            (min(starts.values()), index) for index, starts in self.running.items()
+            if worker not in starts and len(starts) < DIST_MAX_COPIES
+            and now - min(starts.values()) >= threshold
+        ]
+        if not candidates:
+            return None
+        _, index = min(candidates)
+        self.running[index][worker] = now
+        return index
+
+    def complete(self, worker: str, index: int) -> bool:
+        """记录分块完成，重复执行的分块只有第一个结果返回 True"""
+        with self._lock:
+            starts = self.running.pop(index, {})
+            if index in self.done:
+                return False
+            # 已记为失败的分块由仍在执行的副本完成时同样采用其结果
+            self.failed.discard(index)
+            self.done.add(index)
+            if worker in starts:
+                self._elapsed += time.time() - starts[worker]
+                self._completed += 1
+            self._check_finished()
+            return True
+
+    def _check_finished(self) -> None:
+        if len(self.done) + len(self.failed) >= self.total:
+            self.finished.set()
+
+    def fail(self, worker: str, index: int) -> bool:
+        """记录分块在工作节点上执行失败，达到失败次数上限时返回 True(分块记为失败，不再分配)"""
+        with self._lock:
+            starts = self.running.get(index)
+            if starts is None or worker not in starts or index in self.done:
+                return False
+            del starts[worker]
+            self.failures[index] = self.failures.get(index, 0) + 1
+            self._last_failed[index] = worker
+            if self.failures[index] >= self.max_failures:
+                self.failed.add(index)
+                if not starts:
+                    del self.running[index]
+                self._check_finished()
+                return True
+            if not starts:
+                del self.running[index]
+                self.pending.append(index)
+            return False
+
+    def abandon(self, worker: str, index: int = None) -> None:
+        """工作节点放弃分块(index 为 None 时为其全部分块)，无其他节点执行的分块重新排队"""
+        with self._lock:
+            for chunk, starts in list(self.running.items()):
+                if (index is not None and chunk != index) or worker not in starts:
+                    continue
+                del starts[worker]
+                if not starts:
+                    del self.running[chunk]
+                    if chunk not in self.done and chunk not in self.failed:
+                        self.pending.appendleft(chunk)
+
+
+class _CoordinatorHandler(socketserver.StreamRequestHandler):
+    """处理一个工作节点连接"""
+
+    def handle(self):
+        coordinator: 'DistributedCoordinator' = self.server.coordinator
+        self.request.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+        channel = Channel(self.request)
+        worker = None
+        try:
+            hello = channel.recv()
+            if hello.get('type') != 'hello' or hello.get('version') != PROTOCOL_VERSION:
+                channel.send({'type': 'error', 'message': 'protocol version mismatch'})
+                return
+            if coordinator.token and not hmac.compare_digest(str(hello.get('token') or '').encode('utf-8'),
+                                                             coordinator.token.encode('utf-8')):
+                channel.send({'type': 'error', 'message': 'invalid token'})
+                return
+            worker = f"{hello.get('name', 'worker')}@{self.client_address[0]}:{self.client_address[1]}"
+            coordinator.worker_joined(worker)
+            channel.send(coordinator.config())
+
+            scheduler = coordinator.scheduler
+            while True:
+                message = channel.recv()
+                kind = message.get('type')
+                if kind == 'request':
+                    if scheduler.finished.is_set():
+                        channel.send({'type': 'done'})
+                        break
+                    index = scheduler.next_chunk(worker)
+                    if index is None:
+                        channel.send({'type': 'wait', 'retry': DIST_RETRY})
+                    else:
+                        channel.send({'type': 'chunk', 'chunk': index})
+                elif kind == 'result':
+                    coordinator.submit(worker, message['chunk'], decode_results(message['results']))
+                elif kind == 'failed':
+                    coordinator.chunk_failed(worker, message['chunk'], message.get('error', ''))
+        except (ConnectionError, OSError, ValueError, KeyError):
+            pass
+        finally:
+            if worker:
+                coordinator.scheduler.abandon(worker)
+                coordinator.worker_left(worker)
+
+
+class _CoordinatorServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class DistributedCoordinator(ScanRunner):
+    """
+    分布式扫描协调节点
+
+    把目标划分为与多进程/检查点相同的分块，通过 TCP 按需分发给工作节点，
+    收集各分块的端口、Web、SSH、FTP 结果并合并为一份报告。
+    已完成的分块写入检查点日志，协调节点中断后可用 --resume 继续。
+    """
+
+    def __init__(self, args: Namespace, journal: ScanJournal = None):
+        super().__init__(args, journal)
+        self.address = coordinator_address(args)
+        self.token = args.token
+        self.scheduler: Optional[ChunkScheduler] = None
+        self.workers: Set[str] = set()
+        self.logger = logging.getLogger("DistributedCoordinator")
+        self._lock = threading.Lock()
+
+    def config(self) -> Dict[str, Any]:
+        """发给工作节点的扫描参数"""
+        return {
+            'type': 'config',
+            'args': {key: getattr(self.args, key) for key in SCAN_ARGS},
+            'chunk_size': DISCOVERY_BATCH,
+        }
+
+    def restore(self) -> Set[int]:
+        """从检查点日志恢复已完成分块的结果"""
+        if not self.journal:
+            return set()
+        for ip, ports in self.journal.open_ports.items():
+            self.results['ports'][ip] = set(ports)
+        for key, result in self.journal.web.items():
+            if result['status_code'] > 0:
+                self.results['web'][key] = result
+        for service in ('ssh', 'ftp'):
+            for ip, entries in self.journal.creds[service].items():
+                self.results[service][ip] = list(entries)
+        return set(self.journal.done_chunks)
+
+    def worker_joined(self, worker: str) -> None:
+        with self._lock:
+            self.workers.add(worker)
+        console.write(f"{Fore.GREEN}[+] Worker connected: {worker} ({len(self.workers)} active){Style.RESET_ALL}")
+
+    def worker_left(self, worker: str) -> None:
+        with self._lock:
+            self.workers.discard(worker)
+        console.write(f"{Fore.YELLOW}[-] Worker disconnected: {worker} ({len(self.workers)} active){Style.RESET_ALL}")
+
+    def submit(self, worker: str, index: int, results: Dict) -> None:
+        """合并一个分块的结果，重复执行的分块只保留第一份"""
+        if not self.scheduler.complete(worker, index):
+            return
+        with self._lock:
+            merge_results(self.results, results)
+            if self.journal:
+                for ip, ports in results['ports'].items():
+                    for port in ports:
+                        self.journal.open_port(ip, port, index)
+                for key, result in results['web'].items():
+                    self.journal.web_result(key, result)
+                for service in ('ssh', 'ftp'):
+                    for ip, entries in results[service].items():
+                        for entry in entries:
+                            self.journal.cred_found(service, ip, entry)
+                self.journal.chunk_done(index)
+        done, total = len(self.scheduler.done), self.scheduler.total
+        open_ports = sum(len(ports) for ports in results['ports'].values())
+        console.write(f"{Fore.BLUE}[*] Chunk {index} done by {worker}: {open_ports} open ports "
+                      f"({done}/{total} chunks){Style.RESET_ALL}")
+
+    def chunk_failed(self, worker: str, index: int, error: str) -> None:
+        """分块在工作节点上执行失败，改派给其它节点，多次失败后放弃"""
+        if self.scheduler.fail(worker, index):
+            self.logger.error(f"Chunk {index} failed {self.scheduler.failures[index]} times, giving up: {error}")
+            console.write(f"{Fore.RED}[!] Chunk {index} failed {self.scheduler.failures[index]} times, "
+                          f"skipped (last error on {worker}: {error}){Style.RESET_ALL}")
+        else:
+            console.write(f"{Fore.YELLOW}[!] Chunk {index} failed on {worker}: {error}{Style.RESET_ALL}")
+
+    def scan_hosts(self) -> None:
+        targets = TargetSet.from_specs(self.args.ip, exclude=self.args.exclude)
+        self.scheduler = ChunkScheduler(targets.chunk_count(DISCOVERY_BATCH), self.restore())
+        if self.scheduler.finished.is_set():
+            console.write(f"\n{Fore.YELLOW}[*] All chunks already completed in checkpoint{Style.RESET_ALL}\n")
+            return
+
+        server = _CoordinatorServer(self.address, _CoordinatorHandler)
+        server.coordinator = self
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        host, port = server.server_address[:2]
+        console.write(f"\n{Fore.YELLOW}[*] Coordinator listening on {host}:{port}, "
+                      f"{len(targets)} targets in {self.scheduler.total} chunks "
+                      f"({len(self.scheduler.pending)} pending){Style.RESET_ALL}\n")
+        try:
+            # 短间隔等待，保证 Ctrl+C 能及时响应
+            while not self.scheduler.finished.wait(0.5):
+                pass
+        finally:
+            server.shutdown()
+            server.server_close()
+        if self.scheduler.failed:
+            console.write(f"{Fore.RED}[!] {len(self.scheduler.failed)} chunks failed on every attempt and were not scanned: "
+                          f"{', '.join(map(str, sorted(self.scheduler.failed)))}{Style.RESET_ALL}")
+        if self.journal:
+            self.journal.stage_done('ports', {'rtt': self.results['rtt']})
+
+
+class DistributedWorker:
+    """
+    分布式扫描工作节点
+
+    连接协调节点获取扫描参数，循环领取目标分块，在本地执行端口扫描、
+    Web识别与爆破，并把每个分块的结果发回协调节点。
+    """
+
+    def __init__(self, args: Namespace):
+        self.args = args
+        self.address = parse_address(args.worker, '127.0.0.1')
+        self.name = args.worker_name or socket.gethostname()
+        self.logger = logging.getLogger("DistributedWorker")
+        self.chunks_done = 0
+
+    def connect(self) -> socket.socket:
+        """连接协调节点，协调节点尚未启动时重试"""
+        for attempt in range(CONNECT_RETRIES):
+            try:
+                sock = socket.create_connection(self.address, timeout=10)
+                sock.settimeout(None)
+                sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+                return sock
+            except OSError:
+                if attempt == CONNECT_RETRIES - 1:
+                    raise
+                time.sleep(1)
+
+    def run(self) -> None:
+        with self.connect() as sock:
+            channel = Channel(sock)
+            channel.send({'type': 'hello', 'version': PROTOCOL_VERSION,
+                          'name': self.name, 'token': self.args.token})
+            config = channel.recv()
+            if config.get('type') != 'config':
+                raise ConnectionError(config.get('message', 'unexpected reply from coordinator'))
+
+            scan_args = Namespace(**vars(self.args))
+            for key, value in config['args'].items():
+                setattr(scan_args, key, value)
+            targets = TargetSet.from_specs(scan_args.ip, exclude=scan_args.exclude)
+            seed = None if scan_args.no_shuffle else scan_args.seed
+            console.write(f"{Fore.YELLOW}[*] Connected to coordinator {self.address[0]}:{self.address[1]} "
+                          f"as {self.name}{Style.RESET_ALL}")
+
+            while True:
+                channel.send({'type': 'request'})
+                message = channel.recv()
+                kind = message.get('type')
+                if kind == 'done':
+                    break
+                if kind == 'wait':
+                    time.sleep(message.get('retry', DIST_RETRY))
+                    continue
+                index = message['chunk']
+                chunk_args = Namespace(**vars(scan_args))
+                chunk_args.ip = targets.chunk(index, config['chunk_size'], seed)
+                runner = ScanRunner(chunk_args)
+                try:
+                    runner.scan_hosts()
+                except KeyboardInterrupt:
+                    # 断开连接后协调节点会把该分块重新分配
+                    raise
+                except Exception as e:
+                    self.logger.error(f"Chunk {index} failed: {str(e)}")
+                    channel.send({'type': 'failed', 'chunk': index, 'error': str(e)})
+                    continue
+                channel.send({'type': 'result', 'chunk': index, 'results': runner.results})
+                self.chunks_done += 1
+
+        console.write(f"{Fore.GREEN}[*] Coordinator reports scan complete, {self.chunks_done} chunks scanned{Style.RESET_ALL}")
@@ -0,0 +1,142 @@
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from typing import Callable, List, Optional, Set, Tuple
+from colorama import Fore, Style
+from lib.utils.progress import ShardedCounter
+from config.settings import PIPELINE_QUEUE_SIZE
+
+
+class Stage:
+    """
+    流水线的一个阶段
+
+    事件先进入有界队列，再由本阶段自己的线程池处理，各阶段的并发数互不影响。
+    队列满时 submit 阻塞调用方(线程引擎的端口扫描线程、async 引擎的分发线程，不会阻塞事件循环)，下游处理不过来时上游自动放慢。
+    handler 返回 Future 时(异步引擎，提交后立即返回)，事件在 Future 完成时才计为完成并释放队列位置。
+    """
+
+    def __init__(self, name: str, handler: Callable[[str, int], Optional[Future]], workers: int,
+                 accept: Callable[[str, int], bool] = None, queue_size: int = None):
+        self.name = name
+        self.handler = handler
+        self.accept = accept
+        self.workers = max(1, workers)
+        self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix=f"stage-{name}")
+        # 处理中与排队中的事件总数上限，即队列容量
+        self._slots = threading.BoundedSemaphore(self.workers + (queue_size or PIPELINE_QUEUE_SIZE))
+        self.submitted = ShardedCounter()
+        self.completed = ShardedCounter()
+        self.closed = threading.Event()
+        self._pending: Set[Future] = set()
+        self._lock = threading.Lock()
+        self.logger = logging.getLogger(f"Stage[{name}]")
+
+    def submit(self, ip: str, port: int) -> bool:
+        """放入一个开放端口事件，返回是否被接受"""
+        if self.accept and not self.accept(ip, port):
+            return False
+        while not self._slots.acquire(timeout=0.2):
+            if self.closed.is_set():
+                return False
+        if self.closed.is_set():
+            self._slots.release()
+            return False
+        try:
+            self.executor.submit(self._run, ip, port)
+        except RuntimeError:
+            # 中断时线程池已关闭
+            self._slots.release()
+            return False
+        self.submitted.add()
+        return True
+
+    def _run(self, ip: str, port: int) -> None:
+        pending = None
+        try:
+            if not self.closed.is_set():
+                pending = self.handler(ip, port)
+        except Exception as e:
+            self.logger.error(f"{ip}:{port} failed: {str(e)}")
+        finally:
+            if isinstance(pending, Future):
+                with self._lock:
+                    self._pending.add(pending)
+                pending.add_done_callback(lambda future: self._done(future, ip, port))
+            else:
+                self._finish()
+
+    def _done(self, future: Future, ip: str, port: int) -> None:
+        with self._lock:
+            self._pending.discard(future)
+        if not future.cancelled() and future.exception() is not None:
+            self.logger.error(f"{ip}:{port} failed: {str(future.exception())}")
+        self._finish()
+
+    def _finish(self) -> None:
+        self.completed.add()
+        self._slots.release()
+
+    def close(self, cancel: bool = False) -> None:
+        """等待本阶段处理完，cancel 时丢弃排队中的事件(关闭后 _run 不再调用 handler)并取消未完成的 Future"""
+        if cancel:
+            self.closed.set()
+        self.executor.shutdown(wait=True)
+        with self._lock:
+            pending = list(self._pending)
+        if cancel:
+            for future in pending:
+                future.cancel()
+        wait(pending)
+
+    def status(self) -> str:
+        return f"{self.name}: {self.completed.value}/{self.submitted.value}"
+
+
+class ScanPipeline:
+    """
+    流式扫描流水线
+
+    端口扫描每发现一个开放端口(IPScanner.on_open)就调用 dispatch，
+    事件按各阶段的过滤条件立即送入 Web 识别、SSH/FTP 爆破等阶段，
+    不必等全部主机扫描完成，端口扫描与后续阶段同时进行。
+    同一个 ip:port 只分发一次，恢复扫描时可以安全地补发检查点中的开放端口。
+    """
+
+    def __init__(self):
+        self.stages: List[Stage] = []
+        self._seen: Set[Tuple[str, int]] = set()
+        self._lock = threading.Lock()
+
+    def add_stage(self, name: str, handler: Callable[[str, int], None], workers: int,
+                  accept: Callable[[str, int], bool] = None, queue_size: int = None) -> Stage:
+        stage = Stage(name, handler, workers, accept, queue_size)
+        self.stages.append(stage)
+        return stage
+
+    def dispatch(self, ip: str, port: int) -> None:
+        """分发一个开放端口事件，下游队列已满时阻塞"""
+        with self._lock:
+            if (ip, port) in self._seen:
+                return
+            self._seen.add((ip, port))
+        for stage in self.stages:
+            stage.submit(ip, port)
+
+    def close(self) -> None:
+        """上游已结束，等待所有阶段处理完排队的事件"""
+        for stage in self.stages:
+            stage.close()
+
+    def abort(self) -> None:
+        """中断：丢弃排队的事件，等待正在处理的事件返回"""
+        for stage in self.stages:
+            stage.closed.set()
+        for stage in self.stages:
+            stage.close(cancel=True)
+
+    def status_line(self) -> Optional[str]:
+        """各阶段 已完成/已接收 的事件数"""
+        if not self.stages:
+            return None
+        return f"{Fore.CYAN}[>] {' '.join(stage.status() for stage in self.stages)}{Style.RESET_ALL}"
@@ -0,0 +1,472 @@
+import logging
+import os
+from argparse import Namespace
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple, TYPE_CHECKING
+from colorama import Fore, Style
+from lib.scanners.port_scanner import IPScanner
+from lib.utils.checkpoint import ScanJournal
+from lib.utils.logger import setup_logger
+from lib.utils.progress import console
+from lib.utils.services import service_of
+from core.pipeline import ScanPipeline
+from lib.utils.intervals import IntervalSet
+from lib.utils.ports import PortSpec
+from lib.utils.targets import TargetSet
+from config.settings import DEFAULT_PORTS, DEFAULT_PORT_MODE, PIPELINE_BRUTE_WORKERS, PIPELINE_QUEUE_SIZE
+
+if TYPE_CHECKING:
+    from lib.utils.diff import Baseline
+
+# 决定扫描内容的参数，恢复扫描或分布式扫描时从检查点日志/协调节点还原
+SCAN_ARGS = [
+    'ip', 'url', 'mode', 'ports', 'exclude_ports', 'exclude', 'discovery', 'no_ping', 'discovery_ports',
+    'no_shuffle', 'seed', 'no_web', 'no_ssh', 'no_ftp',
+    'user_file', 'pass_file', 'ftp_user_file', 'ftp_pass_file',
+]
+
+
+
+def port_spec(args: Namespace) -> PortSpec:
+    """要扫描的端口：-p 优先，否则使用 -m 指定(默认 common)的预定义模式，再扣除 --exclude-ports"""
+    spec = args.ports or DEFAULT_PORTS[args.mode or DEFAULT_PORT_MODE]
+    return PortSpec.parse(spec, exclude=args.exclude_ports, modes=DEFAULT_PORTS)
+
+
+def new_results() -> Dict:
+    """OutputFormatter.save_results 使用的结果结构"""
+    return {
+        'ports': {},
+        'udp': {},
+        'rtt': {},
+        'banners': {},
+        'web': {},
+        'ssh': {},
+        'ftp': {},
+        'vulnerabilities': []
+    }
+
+
+def merge_results(target: Dict, source: Dict) -> Dict:
+    """把一个分片的扫描结果合并到 target"""
+    for key in ('ports', 'udp'):
+        for ip, ports in source.get(key, {}).items():
+            target[key].setdefault(ip, set()).update(ports)
+    for key in ('rtt', 'banners', 'web'):
+        target[key].update(source.get(key, {}))
+    for key in ('ssh', 'ftp'):
+        for ip, creds in source.get(key, {}).items():
+            entries = target[key].setdefault(ip, [])
+            entries.extend(cred for cred in creds if cred not in entries)
+    target['vulnerabilities'].extend(source.get('vulnerabilities', []))
+    return target
+
+
+class ScanRunner:
+    """
+    执行 端口扫描 -> Web识别 -> SSH爆破 -> FTP爆破
+
+    默认以流水线方式运行：端口扫描发现开放端口后立即交给后续阶段，
+    --no-pipeline 时各阶段按顺序执行。结果累积在 self.results 中，被中断时抛出 KeyboardInterrupt，
+    调用方仍可从 self.results 取得已完成部分的结果。
+    """
+
+    def __init__(self, args: Namespace, journal: ScanJournal = None, shard: Tuple[int, int] = None):
+        self.args = args
+        self.journal = journal
+        self.shard = shard
+        self.results = new_results()
+        self._baseline = None
+
+    @property
+    def baseline(self) -> Optional['Baseline']:
+        """--baseline 指定的上一次扫描结果，首次使用时读取"""
+        if self._baseline is None and self.args.baseline:
+            from lib.utils.diff import Baseline
+            self._baseline = Baseline.load(self.args.baseline)
+        return self._baseline
+
+    def get_ports(self) -> PortSpec:
+        return port_spec(self.args)
+
+    def create_port_scanner(self, on_open: Callable[[str, int], None] = None) -> IPScanner:
+        args = self.args
+        discovery_ports = None
+        if args.discovery_ports:
+            discovery_ports = list(PortSpec.parse(args.discovery_ports).tcp)
+
+        scanner_options = {
+            'threads': args.threads,
+            'discovery': 'none' if args.no_ping else args.discovery,
+            'discovery_ports': discovery_ports,
+            'exclude': args.exclude,
+            'shuffle': not args.no_shuffle,
+            'seed': args.seed,
+            'min_rtt_timeout': args.min_rtt_timeout,
+            'max_rtt_timeout': args.max_rtt_timeout,
+            'adaptive': not args.no_adaptive,
+            'journal': self.journal,
+            'shard': self.shard,
+            'on_open': on_open,
+            'banners': None if args.no_banner else self.results['banners'],
+            'cache': self.create_host_cache(),
+        }
+        if args.engine == 'async':
+            from lib.scanners.async_scanner import AsyncIPScanner
+            return AsyncIPScanner(max_inflight=args.max_inflight, **scanner_options)
+        return IPScanner(**scanner_options)
+
+    def create_host_cache(self):
+        """--cache 指定时创建主机缓存(sqlite3 只在此时导入)"""
+        args = self.args
+        if not args.cache:
+            return None
+        if args.no_ping or args.discovery == 'none':
+            console.write(f"{Fore.YELLOW}[!] Host cache ignored: host discovery is disabled{Style.RESET_ALL}")
+            return None
+        from lib.utils.host_cache import HostCache
+        return HostCache(args.cache, ttl=args.cache_ttl)
+
+    # 后续阶段的扫描器在该阶段运行时才导入，只做端口扫描时不加载 requests、bs4、paramiko 等依赖
+
+    def create_web_scanner(self):
+        options = {
+            'adaptive': not self.args.no_adaptive,
+            'journal': self.journal,
+            'banners': self.results['banners'],
+            'max_body': self.args.web_max_body * 1024,
+        }
+        if self.args.web_engine == 'async':
+            from lib.scanners.async_web_scanner import AsyncCMSScanner
+            return AsyncCMSScanner(max_inflight=self.args.web_max_inflight, **options)
+        from lib.scanners.web_scanner import CMSScanner
+        return CMSScanner(**options)
+
+    def create_ssh_scanner(self):
+        from lib.scanners.ssh_scanner import SSHBruteforce
+        return SSHBruteforce(threads=self.args.threads, adaptive=not self.args.no_adaptive,
+                             journal=self.journal, banners=self.results['banners'])
+
+    def create_ftp_scanner(self):
+        from lib.scanners.ftp_scanner import FTPBruteforce
+        return FTPBruteforce(threads=self.args.threads, adaptive=not self.args.no_adaptive,
+                             journal=self.journal, banners=self.results['banners'])
+
+    def service_of(self, ip: str, port: int) -> str:
+        """阶段分发依据：banner 识别出的服务，没有 banner 时按端口默认服务"""
+        return service_of(self.results['banners'], ip, port)
+
+    def ports_for(self, service: str, ip_ports: Dict[str, set]) -> Dict[str, set]:
+        return {ip: {port for port in ports if self.service_of(ip, port) == service}
+                for ip, ports in ip_ports.items()}
+
+    def run(self) -> Dict:
+        if self.args.ip:
+            # 基线在扫描开始前读取，文件有误时不必等到扫描结束才报错
+            baseline = self.baseline
+            self.scan_hosts()
+            if baseline:
+                self.compare_baseline()
+        if self.args.url:
+            self.scan_url()
+        return self.results
+
+    def scan_hosts(self) -> None:
+        if self.args.no_pipeline:
+            self.scan_stages()
+        else:
+            self.stream_hosts()
+
+    def stream_hosts(self) -> None:
+        """流水线模式：每个开放端口事件经有界队列立即送入 Web/SSH/FTP 阶段"""
+        args = self.args
+        pipeline = ScanPipeline()
+        web_scanner = ssh_scanner = ftp_scanner = None
+
+        if not args.no_web:
+            web_scanner = self.create_web_scanner()
+            web_scanner.prepare()
+
+            def _store(ip: str, port: int, result: Optional[Dict]) -> None:
+                if result:
+                    self.results['web'][f"{ip}:{port}"] = result
+
+            if args.web_engine == 'async':
+                # 请求在事件循环中并发进行，一个线程提交即可，排队上限放宽到最大在途请求数之上
+                pipeline.add_stage('Web', lambda ip, port: web_scanner.submit_target(ip, port, _store), 1,
+                                   queue_size=web_scanner.max_inflight + PIPELINE_QUEUE_SIZE)
+            else:
+                pipeline.add_stage('Web', lambda ip, port: _store(ip, port, web_scanner.add_target(ip, port)),
+                                   web_scanner.congestion.maximum)
+
+        brute_workers = min(args.threads, PIPELINE_BRUTE_WORKERS)
+        if not args.no_ssh:
+            ssh_scanner = self.create_ssh_scanner()
+            ssh_scanner.prepare(args.user_file, args.pass_file)
+            pipeline.add_stage('SSH', ssh_scanner.add_target, brute_workers,
+                               accept=lambda ip, port: self.service_of(ip, port) == 'ssh')
+        if not args.no_ftp:
+            ftp_scanner = self.create_ftp_scanner()
+            ftp_scanner.prepare(args.ftp_user_file, args.ftp_pass_file)
+            pipeline.add_stage('FTP', ftp_scanner.add_target, brute_workers,
+                               accept=lambda ip, port: self.service_of(ip, port) == 'ftp')
+
+        dispatch = self.watch_changes(pipeline.dispatch)
+        port_scanner = self.create_port_scanner(on_open=dispatch)
+
+        def _status() -> str:
+            stages = pipeline.status_line()
+            return f"{port_scanner.status_line()} {stages}" if stages else port_scanner.status_line()
+
+        interrupted = False
+        scan_results = {}
+        ports = self.get_ports()
+        console.start(_status)
+        try:
+            scan_results = port_scanner.scan(args.ip, ports.tcp)
+            if port_scanner.interrupted:
+                raise KeyboardInterrupt
+            # 恢复扫描时从检查点载入的开放端口没有触发 on_open，在此补发(已分发的会被忽略)
+            for ip, open_ports in scan_results.items():
+                for port in sorted(open_ports):
+                    dispatch(ip, port)
+            pipeline.close()
+        except KeyboardInterrupt:
+            interrupted = True
+            for scanner in (web_scanner, ssh_scanner, ftp_scanner):
+                if scanner:
+                    scanner.interrupted = True
+            pipeline.abort()
+        finally:
+            console.stop()
+            if web_scanner:
+                web_scanner.close()
+
+        if scan_results:
+            self.results['ports'] = scan_results
+            self.results['rtt'] = port_scanner.rtt_stats()
+            if not self.results['rtt'] and self.journal and self.journal.stage_completed('ports'):
+                self.results['rtt'] = self.journal.stages['ports'].get('rtt', {})
+        if web_scanner and scan_results:
+            web_scanner.report(self.results['web'])
+        if ssh_scanner and ssh_scanner.total_targets:
+            self.results['ssh'].update(ssh_scanner.report())
+        if ftp_scanner and ftp_scanner.total_targets:
+            self.results['ftp'].update(ftp_scanner.report())
+        if interrupted:
+            raise KeyboardInterrupt
+        if ports.udp:
+            self.scan_udp(port_scanner, ports.udp)
+
+    def scan_stages(self) -> None:
+        """各阶段按顺序执行：端口扫描全部完成后再进行Web识别与爆破"""
+        args = self.args
+        port_scanner = self.create_port_scanner(on_open=self.watch_changes())
+        ports = self.get_ports()
+        scan_results = port_scanner.scan(args.ip, ports.tcp)
+        if scan_results:
+            self.results['ports'] = scan_results
+            self.results['rtt'] = port_scanner.rtt_stats()
+            if not self.results['rtt'] and self.journal and self.journal.stage_completed('ports'):
+                self.results['rtt'] = self.journal.stages['ports'].get('rtt', {})
+        if port_scanner.interrupted:
+            raise KeyboardInterrupt
+        if ports.udp:
+            self.scan_udp(port_scanner, ports.udp)
+        if self.baseline and args.changed_only:
+            scan_results = self.baseline.changed(scan_results)
+        if not scan_results:
+            return
+
+        # Web服务识别
+        if not args.no_web:
+            self.scan_web(scan_results)
+
+        # SSH爆破
+        if not args.no_ssh:
+            ssh_ports = self.ports_for('ssh', scan_results)
+            if ssh_ports:
+                ssh_scanner = self.create_ssh_scanner()
+                self.results['ssh'].update(ssh_scanner.scan(
+                    ssh_ports,
+                    userfile=args.user_file,
+                    passfile=args.pass_file
+                ))
+                if ssh_scanner.interrupted:
+                    raise KeyboardInterrupt
+
+        # FTP爆破
+        if not args.no_ftp:
+            ftp_ports = self.ports_for('ftp', scan_results)
+            if ftp_ports:
+                ftp_scanner = self.create_ftp_scanner()
+                self.results['ftp'].update(ftp_scanner.scan(
+                    ftp_ports,
+                    userfile=args.ftp_user_file,
+                    passfile=args.ftp_pass_file
+                ))
+                if ftp_scanner.interrupted:
+                    raise KeyboardInterrupt
+
+    def watch_changes(self, dispatch: Callable[[str, int], None] = None) -> Optional[Callable[[str, int], None]]:
+        """
+        使用基线时包装开放端口回调：基线中没有的端口立即提示，
+        --changed-only 时只有这些端口进入后续阶段
+        """
+        baseline = self.baseline
+        if not baseline:
+            return dispatch
+        changed_only = self.args.changed_only
+
+        def _on_open(ip: str, port: int) -> None:
+            if baseline.is_new(ip, port):
+                console.write(f"{Fore.MAGENTA}[NEW] {ip}:{port} not open in baseline{Style.RESET_ALL}")
+            elif changed_only:
+                return
+            if dispatch:
+                dispatch(ip, port)
+
+        return _on_open
+
+    def compare_baseline(self) -> None:
+        """扫描完成后与基线比较，差异写入 self.results['diff']"""
+        from lib.utils.diff import print_diff
+        args = self.args
+        ports = self.get_ports()
+        targets = TargetSet.from_specs(args.ip, exclude=args.exclude)
+        self.confirm_open(self.baseline.vanished(self.results, ports, targets))
+        if args.changed_only:
+            # 未变化的端口没有重新识别，沿用基线中的 Web 结果与凭据
+            self.baseline.carry_over(self.results)
+        self.results['diff'] = self.baseline.diff(self.results, ports, targets, compare_web=not args.no_web)
+        print_diff(self.results['diff'])
+
+    def confirm_open(self, ip_ports: List[Tuple[str, int]]) -> None:
+        """基线中开放而本次未发现的端口以最长超时再探测一次，避免把丢包误报为端口关闭"""
+        if not ip_ports:
+            return
+        args = self.args
+        console.write(f"\n{Fore.YELLOW}[*] Re-checking {len(ip_ports)} ports that were open in the baseline"
+                      f"{Style.RESET_ALL}")
+        scanner = IPScanner(threads=args.threads, min_rtt_timeout=args.min_rtt_timeout,
+                            max_rtt_timeout=args.max_rtt_timeout, adaptive=not args.no_adaptive)
+
+        def _check(ip: str, port: int) -> Tuple[str, int, bool]:
+            return ip, port, scanner.check_port(ip, port, args.max_rtt_timeout)[0]
+
+        with ThreadPoolExecutor(max_workers=min(args.threads, len(ip_ports))) as executor:
+            for future in scanner.run_bounded(executor, _check, ip_ports, controller=scanner.congestion):
+                ip, port, is_open = future.result()
+                if is_open:
+                    self.results['ports'].setdefault(ip, set()).add(port)
+                    console.write(f"{Fore.GREEN}[+] {ip}:{port} still open{Style.RESET_ALL}")
+
+    def scan_udp(self, port_scanner: IPScanner, ports: IntervalSet) -> None:
+        """对端口扫描阶段得到的存活主机执行 UDP 扫描"""
+        from lib.scanners.udp_scanner import UDPScanner
+        args = self.args
+        stage = 'udp' if self.shard is None else f"udp[{self.shard[0]}/{self.shard[1]}]"
+        if self.journal:
+            for name in ('udp', stage):
+                if self.journal.stage_completed(name):
+                    data = self.journal.stages[name]
+                    self.results['udp'] = {ip: set(open_ports) for ip, open_ports in data.get('ports', {}).items()}
+                    self.results['banners'].update(data.get('banners', {}))
+                    console.write(f"\n{Fore.YELLOW}[*] UDP scan already completed in checkpoint{Style.RESET_ALL}")
+                    return
+
+        banners = {}
+        scanner = UDPScanner(shuffle=not args.no_shuffle, seed=args.seed,
+                             min_rtt_timeout=args.min_rtt_timeout, max_rtt_timeout=args.max_rtt_timeout,
+                             adaptive=not args.no_adaptive, rtt=port_scanner.rtt,
+                             banners=None if args.no_banner else banners)
+        self.results['udp'] = scanner.scan(port_scanner.alive_batches(), ports, port_scanner.alive_count())
+        self.results['banners'].update(banners)
+        if scanner.interrupted:
+            raise KeyboardInterrupt
+        if self.journal:
+            self.journal.stage_done(stage, {'ports': self.results['udp'], 'banners': banners})
+
+    def scan_web(self, ip_ports: Dict[str, set]) -> None:
+        web_scanner = self.create_web_scanner()
+        try:
+            self.results['web'].update(web_scanner.scan(ip_ports))
+        finally:
+            web_scanner.close()
+        if web_scanner.interrupted:
+            raise KeyboardInterrupt
+
+    def scan_url(self) -> None:
+        self.scan_web({self.args.url: {80}})
+
+
+def run_shard(args: Namespace, shard: Tuple[int, int], journal_path: Optional[str]) -> Tuple[Dict, bool]:
+    """工作进程入口：扫描一个分片，返回 (结果, 是否被中断)"""
+    setup_logger(args.verbose)
+    # spawn 方式启动的进程不继承主进程的控制台配置
+    console.configure(quiet=args.quiet)
+    journal = None
+    if journal_path:
+        journal = ScanJournal.load(journal_path)
+        journal.reopen()
+    runner = ScanRunner(args, journal, shard)
+    try:
+        runner.scan_hosts()
+        return runner.results, False
+    except KeyboardInterrupt:
+        return runner.results, True
+    finally:
+        if journal:
+            journal.close()
+
+
+class ShardedRunner(ScanRunner):
+    """
+    多进程扫描
+
+    目标分块按 分块序号 % 进程数 分配给各工作进程，每个进程独立执行端口、Web、
+    SSH、FTP 各阶段，主进程合并结果。分块按伪随机探测顺序划分，各进程负载均衡；
+    所有进程共用同一个检查点日志，恢复时可以使用不同的进程数。
+    """
+
+    def __init__(self, args: Namespace, journal: ScanJournal = None, workers: int = None):
+        super().__init__(args, journal)
+        self.workers = max(1, workers or os.cpu_count() or 1)
+        self.logger = logging.getLogger("ShardedRunner")
+
+    def scan_hosts(self) -> None:
+        # 进程池(multiprocessing)只在多进程扫描时导入
+        from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+        journal_path = None
+        if self.journal:
+            # 主进程的缓冲记录先写盘，工作进程重新载入同一日志
+            self.journal.flush()
+            journal_path = self.journal.path
+
+        console.write(f"\n{Fore.YELLOW}[*] Scanning {self.args.ip} with {self.workers} worker processes{Style.RESET_ALL}\n")
+        interrupted = False
+        with ProcessPoolExecutor(max_workers=self.workers) as executor:
+            pending = {
+                executor.submit(run_shard, self.args, (index, self.workers), journal_path)
+                for index in range(self.workers)
+            }
+            while pending:
+                try:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                except KeyboardInterrupt:
+                    # 工作进程同样收到 SIGINT，等待它们返回已完成部分的结果
+                    interrupted = True
+                    continue
+                for future in done:
+                    try:
+                        results, shard_interrupted = future.result()
+                    except Exception as e:
+                        self.logger.error(f"Worker process failed: {str(e)}")
+                        continue
+                    merge_results(self.results, results)
+                    interrupted = interrupted or shard_interrupted
+
+        if self.journal and not interrupted:
+            self.journal.stage_done('ports', {'rtt': self.results['rtt']})
+        if interrupted:
+            raise KeyboardInterrupt
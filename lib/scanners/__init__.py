@@ -1,5 +1,21 @@
-from .port_scanner import IPScanner
-from .web_scanner import CMSScanner
-from .ssh_scanner import SSHBruteforce
+import importlib
 
-__all__ = ['IPScanner', 'CMSScanner', 'SSHBruteforce'] 
\ No newline at end of file
+# 扫描器按需导入：访问 lib.scanners.CMSScanner 时才加载 web_scanner(requests、bs4)，
+# 只做端口扫描时不必加载各阶段的第三方依赖
+_EXPORTS = {
+    'IPScanner': '.port_scanner',
+    'AsyncIPScanner': '.async_scanner',
+    'CMSScanner': '.web_scanner',
+    'SSHBruteforce': '.ssh_scanner',
+    'FTPBruteforce': '.ftp_scanner',
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    if name in _EXPORTS:
+        value = getattr(importlib.import_module(_EXPORTS[name], __name__), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
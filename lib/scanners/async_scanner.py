@@ -0,0 +1,185 @@
+import asyncio
+import errno
+import socket
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, Iterator, Optional, Sequence, Tuple
+from config.settings import ASYNC_MAX_INFLIGHT, CONGESTION_INITIAL_WINDOW, PIPELINE_DISPATCH_THREADS
+from lib.utils.congestion import AIMDController, AsyncWindow, classify_errno, ERROR, REFUSED, TIMEOUT, CONGESTION_ERRNOS
+from lib.utils.net import usable_fds
+from lib.utils.banner import grab_banner_async, make_record
+from lib.utils.intervals import IntervalSet
+from .host_discovery import REFUSED_ERRNOS
+from .port_scanner import IPScanner
+
+# connect_ex 在非阻塞模式下表示"连接进行中"的返回值
+_IN_PROGRESS = {errno.EINPROGRESS, errno.EWOULDBLOCK, errno.EAGAIN, getattr(errno, 'WSAEWOULDBLOCK', -1)}
+
+
+def _wake(waiter: asyncio.Future, value: bool) -> None:
+    if not waiter.done():
+        waiter.set_result(value)
+
+
+class AsyncIPScanner(IPScanner):
+    """基于 asyncio 事件循环的端口扫描引擎
+
+    主机解析与存活探测沿用 IPScanner，端口扫描阶段改为在单个事件循环中
+    使用非阻塞 socket 发起 connect，在途探测数由 max_inflight 控制，
+    结果格式与 IPScanner.scan 相同（{ip: set(ports)}）。
+    """
+
+    def __init__(self, threads=None, max_inflight: int = None, timeout: float = None, **kwargs):
+        super().__init__(threads=threads, **kwargs)
+        # 在途探测数不能超过进程可用的文件描述符数量
+        self.max_inflight = usable_fds(max_inflight or ASYNC_MAX_INFLIGHT)
+        if timeout:
+            self.rtt.initial_timeout = timeout
+        # 在途探测数在 [1, max_inflight] 内自适应调整
+        adaptive = self.congestion.adaptive
+        self.congestion = AIMDController(
+            initial=min(self.max_inflight, CONGESTION_INITIAL_WINDOW) if adaptive else self.max_inflight,
+            maximum=self.max_inflight,
+            adaptive=adaptive
+        )
+        self.gate = AsyncWindow(self.congestion)
+        self._dispatcher: Optional[ThreadPoolExecutor] = None
+
+    async def check_port_async(self, ip: str, port: int) -> Tuple[bool, float]:
+        """非阻塞 connect 检查端口是否开放，超时根据该主机的RTT估计自适应计算"""
+        loop = asyncio.get_running_loop()
+        family = socket.AF_INET6 if ':' in ip else socket.AF_INET
+        timeout = self.rtt.timeout(ip)
+        start_time = time.time()
+        try:
+            sock = socket.socket(family, socket.SOCK_STREAM)
+        except OSError as e:
+            self.congestion.record(ERROR if e.errno in CONGESTION_ERRNOS else TIMEOUT)
+            return False, 0.0
+        try:
+            sock.setblocking(False)
+            if not isinstance(loop, asyncio.SelectorEventLoop):
+                # Windows Proactor 事件循环不支持 add_writer
+                await asyncio.wait_for(loop.sock_connect(sock, (ip, port)), timeout)
+                result = 0
+            else:
+                result = sock.connect_ex((ip, port))
+                if result in _IN_PROGRESS:
+                    if not await self._wait_writable(loop, sock, timeout):
+                        self.congestion.record(TIMEOUT)
+                        return False, time.time() - start_time
+                    result = sock.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR)
+            response_time = time.time() - start_time
+            # 连接成功或被拒绝(RST)都是一次完整的往返，作为RTT样本
+            if result == 0 or result in REFUSED_ERRNOS:
+                self.rtt.observe(ip, response_time)
+            self.congestion.record(classify_errno(result, response_time, timeout))
+            if result == 0 and self.banners is not None:
+                data, probed = await grab_banner_async(loop, sock)
+                self.banners[f"{ip}:{port}"] = make_record(data, probed, port)
+            return result == 0, response_time
+        except ConnectionRefusedError:
+            response_time = time.time() - start_time
+            self.rtt.observe(ip, response_time)
+            self.congestion.record(REFUSED)
+            return False, response_time
+        except asyncio.TimeoutError:
+            self.congestion.record(TIMEOUT)
+            return False, time.time() - start_time
+        except OSError as e:
+            self.congestion.record(ERROR if e.errno in CONGESTION_ERRNOS else TIMEOUT)
+            return False, time.time() - start_time
+        finally:
+            sock.close()
+
+    async def _wait_writable(self, loop: asyncio.AbstractEventLoop, sock: socket.socket, timeout: float) -> bool:
+        """等待 connect 完成(socket 可写)，超时返回 False，不为每个探测创建 Task"""
+        waiter = loop.create_future()
+        fd = sock.fileno()
+        loop.add_writer(fd, _wake, waiter, True)
+        timer = loop.call_later(timeout, _wake, waiter, False)
+        try:
+            return await waiter
+        finally:
+            timer.cancel()
+            loop.remove_writer(fd)
+
+    async def _worker(self, tasks: Iterator[Optional[Tuple[str, int]]], ready: asyncio.Event) -> None:
+        """从共享的任务迭代器中取出 (ip, port) 并探测"""
+        for item in tasks:
+            if item is None:
+                # 暂无新的存活主机，等待主机探测线程送入
+                await ready.wait()
+                continue
+            ip, port = item
+            await self.gate.acquire()
+            try:
+                is_open, _ = await self.check_port_async(ip, port)
+            finally:
+                self.gate.release()
+            self.completed_tasks.add()
+            if is_open:
+                # record_open 会把事件分发给流水线，下游队列满时阻塞；放到线程中等待，
+                # 只暂停这一个 worker，事件循环中的其它探测不受影响
+                await asyncio.get_running_loop().run_in_executor(self._dispatcher, self.record_open, ip, port)
+            self.task_done(ip)
+
+    async def _port_scan(self, batches: Iterable[Tuple[Optional[int], Sequence[str]]], ports: IntervalSet,
+                         first: Iterable[Tuple[str, int]] = None) -> None:
+        loop = asyncio.get_running_loop()
+        self.gate.reset()
+        self._dispatcher = ThreadPoolExecutor(max_workers=PIPELINE_DISPATCH_THREADS, thread_name_prefix='open-dispatch')
+        pending = deque()
+        ready = asyncio.Event()
+        finished = False
+
+        def _add_batch(batch: Tuple[Optional[int], Sequence[str]]) -> None:
+            pending.append(batch)
+            ready.set()
+
+        def _finish() -> None:
+            nonlocal finished
+            finished = True
+            ready.set()
+
+        def _feed() -> None:
+            # 存活探测流是阻塞的，放在独立线程中消费
+            try:
+                for batch in batches:
+                    loop.call_soon_threadsafe(_add_batch, batch)
+            finally:
+                loop.call_soon_threadsafe(_finish)
+
+        def _tasks() -> Iterator[Optional[Tuple[str, int]]]:
+            # 所有 worker 共享同一个生成器，内存占用只与 max_inflight 有关
+            if first is not None:
+                yield from first
+            while True:
+                if pending:
+                    yield from self.iter_chunk_tasks([pending.popleft()], ports)
+                elif finished:
+                    return
+                else:
+                    ready.clear()
+                    yield None
+
+        threading.Thread(target=_feed, daemon=True).start()
+        tasks = _tasks()
+        workers = [
+            asyncio.ensure_future(self._worker(tasks, ready))
+            for _ in range(self.max_inflight)
+        ]
+        try:
+            await asyncio.gather(*workers)
+        finally:
+            for worker in workers:
+                worker.cancel()
+            # 正常结束时 worker 都已等到分发完成；中断时不等待仍阻塞在下游队列上的分发线程
+            self._dispatcher.shutdown(wait=False)
+
+    def port_scan_batches(self, batches: Iterable[Tuple[Optional[int], Sequence[str]]], ports: IntervalSet,
+                          first: Iterable[Tuple[str, int]] = None) -> None:
+        """在事件循环中逐批对存活主机执行端口扫描，batches 产出 (分块序号, 主机)，结果写入 self.results"""
+        asyncio.run(self._port_scan(batches, ports, first))
@@ -0,0 +1,180 @@
+import asyncio
+import threading
+import concurrent.futures
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Optional
+import requests
+from colorama import Fore, Style
+from config.settings import (WEB_ASYNC_MAX_INFLIGHT, WEB_INITIAL_INFLIGHT, WEB_ANALYZE_THREADS,
+                             PIPELINE_QUEUE_SIZE)
+from lib.utils.async_http import AsyncHTTPClient
+from lib.utils.congestion import AIMDController, AsyncWindow, classify_exception, SUCCESS, REFUSED, TIMEOUT
+from lib.utils.net import usable_fds
+from lib.utils.progress import console
+from .web_scanner import CMSScanner
+
+
+class AsyncCMSScanner(CMSScanner):
+    """基于 asyncio 的 Web 识别引擎
+
+    HTTP 请求在后台线程的事件循环中由 AsyncHTTPClient 发出，在途请求数由拥塞窗口在
+    [1, max_inflight] 内自适应调整，同一主机同时打开的连接数不超过 per_host。
+    响应的解析(标题、技术栈、CMS 指纹)与线程引擎共用 analyze_response，
+    在少量线程中执行以免阻塞事件循环，结果格式与 CMSScanner.scan 相同。
+    """
+
+    def __init__(self, threads=None, max_inflight: int = None, per_host: int = None, timeout: float = None,
+                 **kwargs):
+        super().__init__(threads=threads, **kwargs)
+        # 每个在途请求占用一个 socket
+        self.max_inflight = usable_fds(max_inflight or WEB_ASYNC_MAX_INFLIGHT)
+        adaptive = self.congestion.adaptive
+        self.congestion = AIMDController(
+            initial=min(self.max_inflight, WEB_INITIAL_INFLIGHT) if adaptive else self.max_inflight,
+            maximum=self.max_inflight,
+            adaptive=adaptive
+        )
+        self.gate = AsyncWindow(self.congestion)
+        self.client = AsyncHTTPClient(timeout=timeout, per_host=per_host, max_body=self.max_body)
+        self._analyzer = ThreadPoolExecutor(max_workers=WEB_ANALYZE_THREADS, thread_name_prefix='web-analyze')
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> asyncio.AbstractEventLoop:
+        """启动后台事件循环(只启动一次)"""
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(target=self._loop.run_forever, name='web-async', daemon=True)
+                self._thread.start()
+        return self._loop
+
+    def close(self) -> None:
+        """取消未完成的请求并停止事件循环，可以重复调用"""
+        with self._lock:
+            loop, thread = self._loop, self._thread
+            self._loop = self._thread = None
+        if loop is not None:
+            asyncio.run_coroutine_threadsafe(self._cancel_all(), loop).result()
+            loop.call_soon_threadsafe(loop.stop)
+            thread.join()
+            loop.close()
+        self._analyzer.shutdown(wait=True)
+        super().close()
+
+    @staticmethod
+    async def _cancel_all() -> None:
+        current = asyncio.current_task()
+        tasks = [task for task in asyncio.all_tasks() if task is not current]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def get_response_async(self, url: str, max_redirects: int = 3) -> Optional[requests.Response]:
+        """get_response 的非阻塞版本，请求头与跳转处理相同"""
+        headers = {
+            'User-Agent': self.get_random_ua(),
+            'Accept': '*/*',
+            'Connection': 'keep-alive'
+        }
+        try:
+            response = await self.client.get(url, headers, max_redirects)
+        except asyncio.TimeoutError:
+            self.congestion.record(TIMEOUT)
+            return None
+        except Exception as e:
+            # 连接被重置、TLS 握手失败、响应格式错误等同样说明对端有响应
+            self.congestion.record(classify_exception(e, default=REFUSED))
+            return None
+        self.congestion.record(SUCCESS)
+        return response
+
+    async def scan_target_async(self, ip: str, port: int) -> Optional[Dict]:
+        """scan_target 的非阻塞版本：先等待主机的连接配额，再等待拥塞窗口中的空位"""
+        if not self.is_candidate(ip, port) or self.interrupted:
+            return None
+        url = self.target_url(ip, port)
+        async with self.client.host_slot(ip):
+            await self.gate.acquire()
+            try:
+                response = await self.get_response_async(url)
+            finally:
+                self.gate.release()
+        loop = asyncio.get_running_loop()
+        result = await loop.run_in_executor(self._analyzer, self.analyze_response, url, ip, port, response)
+        if result and self.journal:
+            self.journal.web_result(f"{ip}:{port}", result)
+        return result
+
+    async def add_target_async(self, ip: str, port: int,
+                               on_result: Callable[[str, int, Optional[Dict]], None] = None) -> Optional[Dict]:
+        """add_target 的非阻塞版本"""
+        with self._lock:
+            self.total_urls += 1
+        result = self.journal.web.get(f"{ip}:{port}") if self.journal else None
+        if result is None and not self.interrupted:
+            result = await self.scan_target_async(ip, port)
+        self.scanned_urls.add()
+        result = result if result and result['status_code'] > 0 else None
+        if on_result:
+            on_result(ip, port, result)
+        return result
+
+    def submit_target(self, ip: str, port: int,
+                      on_result: Callable[[str, int, Optional[Dict]], None] = None) -> concurrent.futures.Future:
+        """流水线模式：提交一个目标后立即返回，识别完成时调用 on_result(ip, port, 结果)"""
+        return asyncio.run_coroutine_threadsafe(self.add_target_async(ip, port, on_result), self.start())
+
+    def scan(self, ip_ports: Dict[str, set]) -> Dict[str, Dict]:
+        results = {}
+        self.prepare(sum(len(ports) for ports in ip_ports.values()))
+
+        console.write(f"\n{Fore.YELLOW}[*] Starting web scan for {self.total_urls} targets "
+                      f"(async, up to {self.max_inflight} in flight)...{Style.RESET_ALL}\n")
+
+        done = self.load_done(ip_ports, results)
+        # 已提交未完成的目标数上限(在途 + 排队)，目标很多时不会一次创建全部协程
+        slots = threading.BoundedSemaphore(self.max_inflight + PIPELINE_QUEUE_SIZE)
+        # 只保存未完成的 Future，完成后移除，目标很多时不会留住全部 Future 与结果
+        pending = set()
+        pending_lock = threading.Lock()
+
+        def _done(future: concurrent.futures.Future) -> None:
+            with pending_lock:
+                pending.discard(future)
+            slots.release()
+            self.scanned_urls.add()
+            if future.cancelled() or future.exception() is not None:
+                return
+            result = future.result()
+            if result and result['status_code'] > 0:
+                results[f"{result['ip']}:{result['port']}"] = result
+
+        loop = self.start()
+        console.start(self.status_line)
+        try:
+            for ip, ports in ip_ports.items():
+                for port in ports:
+                    if f"{ip}:{port}" in done:
+                        continue
+                    slots.acquire()
+                    future = asyncio.run_coroutine_threadsafe(self.scan_target_async(ip, port), loop)
+                    with pending_lock:
+                        pending.add(future)
+                    future.add_done_callback(_done)
+            with pending_lock:
+                waiting = list(pending)
+            concurrent.futures.wait(waiting)
+        except KeyboardInterrupt:
+            self.interrupted = True
+            with pending_lock:
+                waiting = list(pending)
+            for future in waiting:
+                future.cancel()
+            self.close()
+            console.write(f"\n{Fore.RED}[!] Web scan interrupted by user{Style.RESET_ALL}")
+        finally:
+            console.stop()
+
+        self.report(results)
+        return results
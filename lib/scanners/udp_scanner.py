@@ -0,0 +1,292 @@
+import heapq
+import logging
+import random
+import selectors
+import socket
+import time
+from collections import deque
+from typing import Deque, Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple
+from colorama import Fore, Style
+from config.settings import (UDP_SOCKETS, UDP_MAX_INFLIGHT, UDP_MIN_TRIES, UDP_MAX_TRIES, UDP_RECV_BATCH,
+                             UDP_SOCKET_BUFFER, CONGESTION_INITIAL_WINDOW, BANNER_MAX_BYTES)
+from lib.utils.banner import banner_text
+from lib.utils.congestion import AIMDController, CONGESTION_ERRNOS, SUCCESS, REFUSED, TIMEOUT, ERROR
+from lib.utils.intervals import IntervalSet
+from lib.utils.ports import chunks
+from lib.utils.progress import console, ShardedCounter
+from lib.utils.result_store import PortResultStore
+from lib.utils.rtt import RTTEstimator, RTTTable
+from lib.utils.services import service_db
+from lib.utils.targets import iter_shuffled_pairs
+
+# 收到响应前等待的最长时间，保证定时器和窗口变化能及时处理
+_POLL_INTERVAL = 0.05
+
+
+class _Probe:
+    __slots__ = ('tries', 'sent')
+
+    def __init__(self):
+        self.tries = 0
+        self.sent = 0.0
+
+
+class UDPScanner:
+    """
+    UDP 端口扫描引擎
+
+    所有探测从少量共享的非阻塞 UDP socket 用 sendto 发出，单线程事件循环用 selectors 等待响应，
+    socket 可读时用 recvfrom 连续取出一批数据报，按来源地址 (ip, port) 匹配在途探测。
+    每个端口发送 service_probes.json 中对应协议的载荷(DNS 查询、NTP 请求、SNMP get 等)，
+    有响应的端口记为开放。
+
+    超时按主机的 RTT 估计计算(还没有样本的主机使用所有响应的整体估计)，未响应的探测重传；
+    发送次数上限跟随实际需要的次数调整(某个探测在第 N 次才收到响应，之后的探测最多发送 N+1 次)。
+    在途探测数由 AIMD 控制：UDP 端口不响应是常态，重传用尽仍无响应不算拥塞，
+    重传后才收到的响应(丢包)和发送缓冲区满才视为拥塞。
+    共享 socket 收不到 ICMP 端口不可达，无响应的端口(open|filtered)不计入结果。
+    """
+
+    def __init__(self, max_inflight: int = None, sockets: int = None, shuffle: bool = True, seed: int = None,
+                 min_rtt_timeout: float = None, max_rtt_timeout: float = None, adaptive: bool = True,
+                 rtt: RTTTable = None, banners: Dict[str, Dict] = None):
+        self.logger = logging.getLogger("UDPScanner")
+        self.max_inflight = max_inflight or UDP_MAX_INFLIGHT
+        self.socket_count = max(1, sockets or UDP_SOCKETS)
+        self.shuffle = shuffle
+        self.seed = random.getrandbits(32) if seed is None else seed
+        # 可以沿用端口扫描阶段的 RTT 表，已有样本的主机直接使用其超时
+        self.rtt = rtt or RTTTable(min_timeout=min_rtt_timeout, max_timeout=max_rtt_timeout)
+        self._global_rtt = RTTEstimator()
+        self.congestion = AIMDController(
+            initial=min(self.max_inflight, CONGESTION_INITIAL_WINDOW) if adaptive else self.max_inflight,
+            maximum=self.max_inflight,
+            adaptive=adaptive
+        )
+        self.max_tries = UDP_MIN_TRIES
+        # 提供时记录响应内容，键为 "ip:port/udp"
+        self.banners = banners
+        self.results = PortResultStore()
+        self.total_tasks = 0
+        self.completed_tasks = ShardedCounter()
+        self.sent = 0
+        self.retransmits = 0
+        self.interrupted = False
+        self._pending: Dict[Tuple[str, int], _Probe] = {}
+        self._selector: Optional[selectors.BaseSelector] = None
+        self._sockets: Dict[int, List[socket.socket]] = {}
+        self._next_socket = 0
+
+    # ------------------------------------------------------------------ socket
+
+    def _socket_for(self, ip: str) -> socket.socket:
+        """按地址族取共享 socket，首次使用时创建，各 socket 轮流使用"""
+        family = socket.AF_INET6 if ':' in ip else socket.AF_INET
+        group = self._sockets.get(family)
+        if group is None:
+            group = self._sockets[family] = []
+            for _ in range(self.socket_count):
+                sock = socket.socket(family, socket.SOCK_DGRAM)
+                sock.setblocking(False)
+                for option in (socket.SO_RCVBUF, socket.SO_SNDBUF):
+                    try:
+                        sock.setsockopt(socket.SOL_SOCKET, option, UDP_SOCKET_BUFFER)
+                    except OSError:
+                        pass
+                self._selector.register(sock, selectors.EVENT_READ)
+                group.append(sock)
+        self._next_socket = (self._next_socket + 1) % len(group)
+        return group[self._next_socket]
+
+    def _close_sockets(self) -> None:
+        for group in self._sockets.values():
+            for sock in group:
+                self._selector.unregister(sock)
+                sock.close()
+        self._sockets.clear()
+        self._selector.close()
+        self._selector = None
+
+    # ------------------------------------------------------------------ 事件循环
+
+    def iter_tasks(self, batches: Iterable[Sequence[str]], ports: IntervalSet) -> Iterator[Tuple[str, int]]:
+        """按批产出 (ip, port) 探测任务，默认在每批主机 x 端口 空间内伪随机打散"""
+        for hosts in batches:
+            if self.shuffle:
+                yield from iter_shuffled_pairs(hosts, ports, self.seed)
+            else:
+                for segment in chunks(ports, UDP_RECV_BATCH):
+                    for ip in hosts:
+                        for port in segment:
+                            yield ip, port
+
+    def _send(self, key: Tuple[str, int], probe: _Probe, timers: list, backlog: Deque) -> bool:
+        """发送(或重传)一个探测，发送缓冲区满时放回 backlog 并返回 False"""
+        ip, port = key
+        _, payload = service_db().udp_probe(port)
+        try:
+            self._socket_for(ip).sendto(payload, key)
+        except OSError as e:
+            if isinstance(e, BlockingIOError) or e.errno in CONGESTION_ERRNOS:
+                self.congestion.record(ERROR)
+                backlog.append(key)
+                return False
+            # 广播地址、不可达网络等无法发送的目标直接结束
+            self.logger.debug(f"sendto {ip}:{port} failed: {str(e)}")
+            self._finish(key)
+            return True
+        now = time.monotonic()
+        if probe.tries:
+            self.retransmits += 1
+        probe.tries += 1
+        probe.sent = now
+        self.sent += 1
+        heapq.heappush(timers, (now + self.timeout(ip), self.sent, key, probe.tries))
+        return True
+
+    def timeout(self, ip: str) -> float:
+        """探测超时：主机自己的 RTT 估计，没有样本时使用所有响应的整体估计"""
+        if self.rtt.stats(ip) is None:
+            rto = self._global_rtt.rto()
+            if rto is not None:
+                return min(self.rtt.max_timeout, max(self.rtt.min_timeout, rto))
+        return self.rtt.timeout(ip)
+
+    def _finish(self, key: Tuple[str, int]) -> None:
+        """探测结束(收到响应、重传用尽或无法发送)"""
+        self._pending.pop(key, None)
+        self.completed_tasks.add()
+
+    def _receive(self, sock: socket.socket) -> None:
+        """连续取出一批数据报，按来源地址匹配在途探测"""
+        for _ in range(UDP_RECV_BATCH):
+            try:
+                data, address = sock.recvfrom(BANNER_MAX_BYTES)
+            except (BlockingIOError, InterruptedError):
+                return
+            except OSError:
+                # Windows 上 ICMP 不可达会使 recvfrom 抛出 WSAECONNRESET，忽略即可
+                continue
+            key = (address[0], address[1])
+            probe = self._pending.get(key)
+            if probe is None:
+                # 迟到的重复响应或无关的数据报
+                continue
+            ip, port = key
+            if probe.tries == 1:
+                # 只用首次发送的响应作为 RTT 样本(Karn 算法)
+                rtt = time.monotonic() - probe.sent
+                self.rtt.observe(ip, rtt)
+                self._global_rtt.observe(rtt)
+                self.congestion.record(SUCCESS)
+            else:
+                # 之前的发送丢失了，说明网络或目标在丢包
+                self.congestion.record(TIMEOUT)
+                self.max_tries = min(UDP_MAX_TRIES, max(self.max_tries, probe.tries + 1))
+            self._finish(key)
+            self.record_open(ip, port, data)
+
+    def _run(self, tasks: Iterator[Tuple[str, int]]) -> None:
+        self._selector = selectors.DefaultSelector()
+        self._pending.clear()
+        timers: list = []
+        backlog: Deque[Tuple[str, int]] = deque()
+        exhausted = False
+        try:
+            while True:
+                # 1. 在拥塞窗口内发送：先补发因缓冲区满而未发出的探测，再取新任务
+                blocked = False
+                while backlog and not blocked:
+                    key = backlog.popleft()
+                    if key in self._pending:
+                        blocked = not self._send(key, self._pending[key], timers, backlog)
+                while not blocked and not exhausted and len(self._pending) < self.congestion.window:
+                    key = next(tasks, None)
+                    if key is None:
+                        exhausted = True
+                        break
+                    probe = self._pending[key] = _Probe()
+                    blocked = not self._send(key, probe, timers, backlog)
+                if exhausted and not self._pending:
+                    return
+
+                # 2. 等待响应，最长等到最早的超时
+                wait = _POLL_INTERVAL
+                if timers:
+                    wait = min(wait, max(0.0, timers[0][0] - time.monotonic()))
+                if blocked:
+                    wait = min(wait, 0.005)
+                for selector_key, _ in self._selector.select(wait):
+                    self._receive(selector_key.fileobj)
+
+                # 3. 超时的探测重传或结束
+                now = time.monotonic()
+                while timers and timers[0][0] <= now:
+                    _, _, key, tries = heapq.heappop(timers)
+                    probe = self._pending.get(key)
+                    if probe is None or probe.tries != tries:
+                        continue
+                    if probe.tries < self.max_tries:
+                        self._send(key, probe, timers, backlog)
+                    else:
+                        # open|filtered：没有丢包的证据，与 TCP 的 RST 一样不影响窗口增长
+                        self.congestion.record(REFUSED)
+                        self._finish(key)
+        finally:
+            self._close_sockets()
+
+    # ------------------------------------------------------------------ 结果与进度
+
+    def record_open(self, ip: str, port: int, data: bytes) -> None:
+        """记录有响应的端口"""
+        if not self.results.add(ip, port):
+            return
+        service, _ = service_db().udp_probe(port)
+        if service is None:
+            match = service_db().identify(data, port)
+            service = match.service if match else service_db().port_service(port)
+        if self.banners is not None:
+            self.banners[f"{ip}:{port}/udp"] = {
+                'banner': banner_text(data),
+                'service': service,
+                'product': None,
+                'probe': 'udp',
+            }
+        console.write(f"{Fore.GREEN}[+] {ip}:{port}/udp ({service_db().label(service)}) "
+                      f"{len(data)} bytes{Style.RESET_ALL}")
+
+    def status_line(self) -> str:
+        progress = (self.completed_tasks.value / self.total_tasks) * 100 if self.total_tasks else 100.0
+        return (f"{Fore.BLUE}[*] UDP: {self.completed_tasks.value}/{self.total_tasks} ({progress:.1f}%) "
+                f"Open: {self.results.total_ports()} Window: {self.congestion.window} "
+                f"Tries: {self.max_tries}{Style.RESET_ALL}")
+
+    def scan(self, batches: Iterable[Sequence[str]], ports: IntervalSet, total_hosts: int = None) -> Dict[str, Set[int]]:
+        """
+        执行 UDP 扫描
+
+        Args:
+            batches: 逐批产出的存活主机
+            ports: UDP 端口
+            total_hosts: 主机总数，用于显示进度
+        """
+        self.results.clear()
+        self.interrupted = False
+        self.total_tasks = (total_hosts or 0) * len(ports)
+        self.completed_tasks.reset()
+        console.write(f"\n{Fore.YELLOW}[*] Starting UDP scan ({len(ports)} ports){Style.RESET_ALL}\n")
+        start_time = time.time()
+        console.start(self.status_line)
+        try:
+            self._run(self.iter_tasks(batches, ports))
+        except KeyboardInterrupt:
+            self.interrupted = True
+            console.write(f"\n{Fore.RED}[!] UDP scan interrupted by user{Style.RESET_ALL}")
+        finally:
+            console.stop()
+
+        elapsed = time.time() - start_time
+        console.write(f"\n{Fore.BLUE}[*] UDP scan completed in {elapsed:.1f}s: "
+                      f"{self.results.total_ports()} responding ports on {len(self.results)} hosts, "
+                      f"{self.sent} datagrams sent ({self.retransmits} retransmits){Style.RESET_ALL}")
+        return self.results.to_dict()
@@ -1,5 +1,4 @@
 import requests
-import re
 import hashlib
 import json
 import sqlite3
@@ -12,22 +11,45 @@ import urllib3
 from bs4 import BeautifulSoup
 import time
 import random
+from urllib.parse import urlsplit
 import sys
 import concurrent.futures
-from lib.utils.http_utils import HTTPClient
-from config.settings import THREADS
+from lib.utils.http_utils import HTTPClient, redirect_target, read_body, ACCEPT_ENCODING
+from config.settings import (THREADS, WEB_MAX_INFLIGHT, WEB_INITIAL_INFLIGHT, WEB_MAX_BODY_BYTES, WEB_TITLE_SCAN_CHARS,
+                             WEB_TITLE_FALLBACK_CHARS)
+from lib.utils.banner import known_service
+from lib.utils.fingerprint import TideMatcher, tide_matcher
+from lib.utils.html_title import head_title
+from lib.utils.charset import CharsetDetector
+from lib.utils.technologies import technology_db, tech_labels
+from lib.utils.services import service_db
+from lib.utils.congestion import AIMDController, classify_exception, SUCCESS, REFUSED, TIMEOUT
+from lib.utils.progress import console, ShardedCounter
 
 # 禁用 SSL 警告
 urllib3.disable_warnings()
 
 class CMSScanner:
-    def __init__(self, threads=None):
+    def __init__(self, threads=None, adaptive: bool = True, journal=None, banners: Dict[str, Dict] = None,
+                 max_body: int = None):
         self.threads = threads or THREADS
-        self.print_lock = threading.Lock()
+        # 每个响应最多读取的字节数，更大的页面只识别开头部分
+        self.max_body = max_body or WEB_MAX_BODY_BYTES
+        self.journal = journal
+        # 端口扫描阶段抓取的 banner，已识别为非 Web 服务的端口不再请求
+        self.banners = banners
+        self.interrupted = False
+        self.congestion = AIMDController(
+            initial=WEB_INITIAL_INFLIGHT,
+            maximum=WEB_MAX_INFLIGHT,
+            adaptive=adaptive
+        )
         self.http_client = HTTPClient()
+        # 按主机缓存的页面编码，跳转后的页面与同一主机的其它端口不再重复检测
+        self.charsets = CharsetDetector()
         self._lock = threading.Lock()
         self.total_urls = 0
-        self.scanned_urls = 0
+        self.scanned_urls = ShardedCounter()
         
         # 优化会话配置
         self.http_client.session.verify = False
@@ -51,17 +73,19 @@ class CMSScanner:
             headers = {
                 'User-Agent': self.get_random_ua(),
                 'Accept': '*/*',
+                'Accept-Encoding': ACCEPT_ENCODING,
                 'Connection': 'keep-alive'
             }
             
-            # 手动处理重定向
-            response = self.http_client.session.get(
+            # 手动处理重定向；响应体流式读取，最多 max_body 字节
+            response = read_body(self.http_client.session.get(
                 url, 
                 headers=headers, 
                 timeout=1,  # 1秒超时
                 verify=False,
-                allow_redirects=False
-            )
+                allow_redirects=False,
+                stream=True
+            ), self.max_body)
             
             # 如果是重定向响应，跟踪跳转
             redirect_count = 0
@@ -71,184 +95,168 @@ class CMSScanner:
                     break
                     
                 # 处理相对URL
-                if redirect_url.startswith('/'):
-                    redirect_url = f"{'/'.join(url.split('/')[:3])}{redirect_url}"
-                elif not redirect_url.startswith(('http://', 'https://')):
-                    redirect_url = f"{url.rstrip('/')}/{redirect_url.lstrip('/')}"
-                
-                response = self.http_client.session.get(
-                    redirect_url,
+                response = read_body(self.http_client.session.get(
+                    redirect_target(url, redirect_url),
                     headers=headers,
                     timeout=1,
                     verify=False,
-                    allow_redirects=False
-                )
+                    allow_redirects=False,
+                    stream=True
+                ), self.max_body)
                 redirect_count += 1
             
+            self.congestion.record(SUCCESS)
             return response
             
-        except (requests.Timeout, requests.RequestException):
+        except (requests.Timeout, requests.RequestException) as e:
+            self.congestion.record(self.classify_exception(e))
+            return None
+
+    @staticmethod
+    def classify_exception(e: Exception) -> str:
+        """把请求异常归类为拥塞控制使用的探测结果"""
+        if isinstance(e, requests.Timeout):
+            return TIMEOUT
+        # 连接被重置等情况同样说明对端有响应
+        return classify_exception(e, default=REFUSED)
+
+    def prepare(self, total_urls: int = 0) -> None:
+        """重置统计，scan 与流水线模式共用"""
+        self.interrupted = False
+        self.total_urls = total_urls
+        self.scanned_urls.reset()
+
+    @staticmethod
+    def target_url(ip: str, port: int) -> str:
+        return f"http://{ip}:{port}" if port != 443 else f"https://{ip}"
+
+    def is_candidate(self, ip: str, port: int) -> bool:
+        """端口扫描阶段已识别为非 Web 服务的端口不再请求"""
+        service = known_service(self.banners, ip, port)
+        return not service or service_db().is_web(service)
+
+    def scan_target(self, ip: str, port: int) -> Optional[Dict]:
+        """识别单个 ip:port 的Web服务，并发请求数由拥塞窗口自适应控制，结果写入检查点"""
+        if not self.is_candidate(ip, port):
             return None
+        url = self.target_url(ip, port)
+        self.congestion.acquire()
+        try:
+            result = self.check_cms(url, ip, port)
+        except Exception:
+            result = None
+        finally:
+            self.congestion.release()
+        if result and self.journal:
+            self.journal.web_result(f"{ip}:{port}", result)
+        return result
+
+    def add_target(self, ip: str, port: int) -> Optional[Dict]:
+        """流水线模式：端口扫描发现开放端口后立即识别，检查点中已有的目标直接返回记录的结果"""
+        with self._lock:
+            self.total_urls += 1
+        result = self.journal.web.get(f"{ip}:{port}") if self.journal else None
+        if result is None and not self.interrupted:
+            result = self.scan_target(ip, port)
+        self.scanned_urls.add()
+        return result if result and result['status_code'] > 0 else None
 
     def scan(self, ip_ports: Dict[str, set]) -> Dict[str, Dict]:
         """优化的扫描流程"""
         results = {}
-        self.total_urls = sum(len(ports) for ports in ip_ports.values())
+        self.prepare(sum(len(ports) for ports in ip_ports.values()))
         
-        print(f"\n{Fore.YELLOW}[*] Starting web scan for {self.total_urls} targets...{Style.RESET_ALL}\n")
+        console.write(f"\n{Fore.YELLOW}[*] Starting web scan for {self.total_urls} targets...{Style.RESET_ALL}\n")
 
-        try:
-            tasks = []
-            for ip, ports in ip_ports.items():
-                for port in ports:
-                    url = f"http://{ip}:{port}" if port != 443 else f"https://{ip}"
-                    tasks.append((url, ip, port))
-
-            # 使用信号量限制并发数
-            semaphore = threading.Semaphore(20)
-            
-            def scan_with_semaphore(task):
-                url, ip, port = task
-                try:
-                    with semaphore:
-                        return self.check_cms(url, ip, port)
-                except Exception:
-                    return None
+        done = self.load_done(ip_ports, results)
 
-            # 使用线程池执行任务
-            with ThreadPoolExecutor(max_workers=50) as executor:
+        console.start(self.status_line)
+        try:
+            # 使用线程池执行任务，并发请求数由拥塞窗口自适应控制
+            with ThreadPoolExecutor(max_workers=self.congestion.maximum) as executor:
                 futures = []
-                for task in tasks:
-                    futures.append(executor.submit(scan_with_semaphore, task))
+                for ip, ports in ip_ports.items():
+                    for port in ports:
+                        if f"{ip}:{port}" not in done:
+                            futures.append(executor.submit(self.scan_target, ip, port))
 
                 # 处理完成的任务
-                for future in concurrent.futures.as_completed(futures):
-                    try:
-                        result = future.result()
-                        if result and result['status_code'] > 0:
-                            key = f"{result['ip']}:{result['port']}"
-                            results[key] = result
-                    except Exception:
-                        pass
+                try:
+                    for future in concurrent.futures.as_completed(futures):
+                        self.scanned_urls.add()
+                        try:
+                            result = future.result()
+                            if result and result['status_code'] > 0:
+                                results[f"{result['ip']}:{result['port']}"] = result
+                        except Exception:
+                            pass
+                except KeyboardInterrupt:
+                    # 取消尚未开始的请求，尽快结束
+                    self.interrupted = True
+                    for future in futures:
+                        future.cancel()
+                    raise
 
         except KeyboardInterrupt:
-            print(f"\n{Fore.RED}[!] Web scan interrupted by user{Style.RESET_ALL}")
+            console.write(f"\n{Fore.RED}[!] Web scan interrupted by user{Style.RESET_ALL}")
+        finally:
+            console.stop()
 
-        print(f"\n{Fore.BLUE}[*] Web scan completed. Scanned {len(results)} targets.{Style.RESET_ALL}\n")
+        self.report(results)
         return results
 
-    def identify_technologies(self, response, content: str) -> Set[str]:
-        """识别网站使用的技术"""
-        technologies = set()
-        headers = response.headers
-        
-        # 服务器类型
-        if 'Server' in headers:
-            server = headers['Server'].lower()
-            if 'nginx' in server:
-                technologies.add('Nginx')
-            if 'apache' in server:
-                technologies.add('Apache')
-            if 'iis' in server:
-                technologies.add('IIS')
-            if 'tomcat' in server:
-                technologies.add('Tomcat')
-            if 'jetty' in server:
-                technologies.add('Jetty')
-
-        # 编程语言
-        if 'X-Powered-By' in headers:
-            powered_by = headers['X-Powered-By'].lower()
-            if 'php' in powered_by:
-                technologies.add('PHP')
-            if 'asp.net' in powered_by:
-                technologies.add('ASP.NET')
-            if 'jsp' in powered_by:
-                technologies.add('JSP')
-            if 'servlet' in powered_by:
-                technologies.add('Java Servlet')
-
-        # 从内容中识别技术
-        content_lower = content.lower()
-        if 'php' in content_lower or '.php' in content_lower:
-            technologies.add('PHP')
-        if 'asp.net' in content_lower or '.aspx' in content_lower:
-            technologies.add('ASP.NET')
-        if 'jsp' in content_lower or '.jsp' in content_lower:
-            technologies.add('JSP')
-        if 'laravel' in content_lower:
-            technologies.add('Laravel')
-        if 'django' in content_lower:
-            technologies.add('Django')
-        if 'spring' in content_lower:
-            technologies.add('Spring')
-        if 'struts' in content_lower:
-            technologies.add('Struts')
-
-        # 前端框架
-        if 'vue' in content_lower:
-            technologies.add('Vue.js')
-        if 'react' in content_lower:
-            technologies.add('React')
-        if 'angular' in content_lower:
-            technologies.add('Angular')
-        if 'jquery' in content_lower:
-            technologies.add('jQuery')
-        if 'bootstrap' in content_lower:
-            technologies.add('Bootstrap')
-
-        # 数据库
-        if 'mysql' in content_lower:
-            technologies.add('MySQL')
-        if 'postgresql' in content_lower:
-            technologies.add('PostgreSQL')
-        if 'oracle' in content_lower:
-            technologies.add('Oracle')
-        if 'mongodb' in content_lower:
-            technologies.add('MongoDB')
-
-        # Web服务器特征
-        if 'phpmyadmin' in content_lower:
-            technologies.add('phpMyAdmin')
-        if 'weblogic' in content_lower:
-            technologies.add('WebLogic')
-        if 'websphere' in content_lower:
-            technologies.add('WebSphere')
-        if 'jboss' in content_lower:
-            technologies.add('JBoss')
-
-        return technologies
-
-    def decode_content(self, response: requests.Response) -> str:
-        """智能解码响应内容"""
-        # 尝试从Content-Type获取编码
-        content_type = response.headers.get('content-type', '').lower()
-        if 'charset=' in content_type:
+    def close(self) -> None:
+        """关闭连接池"""
+        self.http_client.session.close()
+
+    def load_done(self, ip_ports: Dict[str, set], results: Dict[str, Dict]) -> Set[str]:
+        """恢复扫描：载入本次目标中已识别的结果，返回应跳过的目标"""
+        done = set()
+        if self.journal:
+            wanted = {f"{ip}:{port}" for ip, ports in ip_ports.items() for port in ports}
+            for key, result in self.journal.web.items():
+                if key not in wanted:
+                    continue
+                done.add(key)
+                if result['status_code'] > 0:
+                    results[key] = result
+        self.scanned_urls.add(len(done))
+        return done
+
+    def report(self, results: Dict[str, Dict]) -> None:
+        """输出Web识别统计"""
+        console.write(f"\n{Fore.BLUE}[*] Web scan completed. Scanned {len(results)} targets.{Style.RESET_ALL}\n")
+
+    def identify_technologies(self, response, content: str) -> Dict[str, Dict]:
+        """按规则表识别网站使用的技术，返回 {技术: {'version', 'confidence'}}"""
+        return technology_db().identify(response.headers, content)
+
+    @staticmethod
+    def content_length(response: requests.Response) -> int:
+        """响应体长度；只读取了开头部分时取 Content-Length 响应头"""
+        if getattr(response, 'truncated', False):
             try:
-                charset = content_type.split('charset=')[-1].split(';')[0].strip()
-                return response.content.decode(charset, errors='replace')
-            except:
+                return int(response.headers.get('Content-Length', '').split(',')[0])
+            except ValueError:
                 pass
+        return len(response.content)
 
-        # 尝试使用apparent_encoding
-        try:
-            return response.content.decode(response.apparent_encoding, errors='replace')
-        except:
-            pass
-
-        # 尝试常见编码
-        encodings = ['utf-8', 'gbk', 'gb2312', 'big5', 'utf-16', 'ascii']
-        for encoding in encodings:
-            try:
-                return response.content.decode(encoding, errors='replace')
-            except:
-                continue
+    def decode_content(self, response: requests.Response) -> str:
+        """
+        智能解码响应内容
 
-        # 如果都失败了，使用replace错误处理
-        return response.content.decode('utf-8', errors='replace')
+        依次使用响应头的 charset、页面开头的 BOM/<meta charset>、UTF-8 校验、同一主机的检测结果，
+        最后才对一小段样本做统计检测(见 CharsetDetector)。
+        """
+        host = urlsplit(response.url or '').hostname
+        return self.charsets.decode(response.content, response.headers.get('Content-Type', ''), host)
 
     def check_cms(self, url: str, ip: str, port: int) -> Dict:
         """优化的CMS检测，超时快速跳过"""
+        return self.analyze_response(url, ip, port, self.get_response(url))
+
+    def analyze_response(self, url: str, ip: str, port: int, response: Optional[requests.Response]) -> Dict:
+        """从响应中提取标题、服务器、技术栈与 CMS，没有响应时 status_code 为 0"""
         result = {
             'ip': ip,
             'port': port,
@@ -256,6 +264,7 @@ class CMSScanner:
             'cms': 'Unknown',
             'server': 'Unknown',
             'technologies': set(),
+            'technology_details': {},
             'title': '',
             'status_code': 0,
             'content_length': 0,
@@ -263,7 +272,6 @@ class CMSScanner:
         }
 
         try:
-            response = self.get_response(url)
             if not response:
                 return result
 
@@ -272,20 +280,17 @@ class CMSScanner:
 
             # 获取基本信息
             result['status_code'] = response.status_code
-            result['content_length'] = len(response.content)
+            result['content_length'] = self.content_length(response)
             result['server'] = response.headers.get('Server', 'Unknown')
             
             result['title'] = self.extract_title(content)
 
             # 识别技术栈
-            result['technologies'] = self.identify_technologies(response, content)
+            result['technology_details'] = self.identify_technologies(response, content)
+            result['technologies'] = set(result['technology_details'])
 
-            # CMS识别
-            headers = str(response.headers)
-            for cms_name, rule in self.tide_fingers.items():
-                if self.handle_tide_rule(rule, headers, content, result['title']):
-                    result['cms'] = cms_name
-                    break
+            # CMS识别：每个字段只扫描一次，取第一个成立的指纹
+            result['cms'] = self.fingerprints.match(result['title'], content, str(response.headers)) or 'Unknown'
 
             # 构建URL显示
             url_display = f"{'https' if port == 443 else 'http'}://{ip}"
@@ -320,7 +325,7 @@ class CMSScanner:
 
             # 添加技术栈信息
             if result['technologies']:
-                output += f" [{', '.join(result['technologies'])}]"
+                output += f" [{', '.join(tech_labels(result))}]"
 
             # 添加CMS信息
             if result['cms'] != 'Unknown':
@@ -335,21 +340,15 @@ class CMSScanner:
         return result
 
     def load_tide_finger(self):
-        """加载 TideFinger 指纹库"""
-        self.tide_fingers = {}
+        """加载 TideFinger 指纹库并编译为匹配器(进程内只编译一次)"""
+        self.fingerprints = TideMatcher({})
         try:
-            if os.path.exists(self.db_path):
-                with sqlite3.connect(self.db_path) as conn:
-                    cursor = conn.cursor()
-                    cursor.execute('SELECT name, keys FROM tide')
-                    for row in cursor.fetchall():
-                        self.tide_fingers[row[0]] = row[1]
-            else:
-                print(f"{Fore.YELLOW}[!] TideFinger database not found at {self.db_path}, creating...{Style.RESET_ALL}")
+            if not os.path.exists(self.db_path):
+                console.write(f"{Fore.YELLOW}[!] TideFinger database not found at {self.db_path}, creating...{Style.RESET_ALL}")
                 self.create_cms_finger_db()
+            self.fingerprints = tide_matcher(self.db_path)
         except Exception as e:
-            print(f"{Fore.RED}[-] Error loading TideFinger database: {str(e)}{Style.RESET_ALL}")
-            self.tide_fingers = {}
+            console.write(f"{Fore.RED}[-] Error loading TideFinger database: {str(e)}{Style.RESET_ALL}")
 
     def create_cms_finger_db(self):
         """创建 CMS 指纹数据库"""
@@ -406,53 +405,49 @@ class CMSScanner:
         ]
         return random.choice(user_agents)
 
-    def check_rule(self, key: str, header: str, body: str, title: str) -> bool:
-        """TideFinger 规则匹配"""
-        try:
-            if 'title="' in key:
-                if re.findall(r'title="(.*)"', key)[0].lower() in title.lower():
-                    return True
-            elif 'body="' in key:
-                if re.findall(r'body="(.*)"', key)[0] in body:
-                    return True
-            elif 'header="' in key:
-                if re.findall(r'header="(.*)"', key)[0] in header:
-                    return True
-            return False
-        except:
-            return False
-
-    def handle_tide_rule(self, key: str, header: str, body: str, title: str) -> bool:
-        """处理 TideFinger 复杂规则"""
-        if '||' in key and '&&' not in key and '(' not in key:
-            return any(self.check_rule(rule, header, body, title) for rule in key.split('||'))
-        elif '&&' in key and '||' not in key and '(' not in key:
-            return all(self.check_rule(rule, header, body, title) for rule in key.split('&&'))
-        elif '||' not in key and '&&' not in key and '(' not in key:
-            return self.check_rule(key, header, body, title)
-        return False
-
-    def print_status(self, message: str, end='\n'):
-        """线程安全的打印函数"""
-        with self.print_lock:
-            sys.stdout.write('\r' + ' ' * 100 + '\r')  # 清除当前行
-            sys.stdout.write(message + end)
-            sys.stdout.flush()
+    def print_status(self, message: str):
+        """输出一行结果，由控制台渲染线程批量写出"""
+        console.write(message)
+
+    def status_line(self) -> str:
+        """状态栏内容，由控制台渲染线程定时读取"""
+        scanned = self.scanned_urls.value
+        progress = scanned / self.total_urls * 100 if self.total_urls else 100.0
+        return (f"{Fore.BLUE}[*] Web: {scanned}/{self.total_urls} ({progress:.1f}%) "
+                f"Window: {self.congestion.window}{Style.RESET_ALL}")
+
+    @staticmethod
+    def main_title(title: str) -> Optional[str]:
+        """去除空白并按常见分隔符取第一部分作为主标题，空标题返回 None"""
+        title = title.strip()
+        if not title or title.lower() == 'none':
+            return None
+        for separator in [' - ', ' | ', ' :: ', ' » ', ' > ', ' / ']:
+            if separator in title:
+                # 取第一部分作为主标题
+                title = title.split(separator)[0].strip()
+        return title
 
     def extract_title(self, content: str) -> str:
-        """提取页面标题，优先获取主标题"""
+        """
+        提取页面标题，优先获取主标题
+
+        先逐标签扫描页面开头，在 </title> 处停止；只有头部找不到标题(或标题为空、结构复杂)时
+        才用 BeautifulSoup 解析页面(最多 WEB_TITLE_FALLBACK_CHARS 个字符)查找 h1 等标题。
+        """
         try:
-            soup = BeautifulSoup(content, 'html.parser')
+            head = head_title(content, WEB_TITLE_SCAN_CHARS)
+            if head is not None:
+                title = self.main_title(head)
+                if title is not None:
+                    return title
+
+            soup = BeautifulSoup(content[:WEB_TITLE_FALLBACK_CHARS], 'html.parser')
             
             # 1. 首先尝试获取 title 标签内容
-            if soup.title and soup.title.string:
-                title = soup.title.string.strip()
-                if title and title.lower() != 'none':
-                    # 处理常见的标题分隔符
-                    for separator in [' - ', ' | ', ' :: ', ' » ', ' > ', ' / ']:
-                        if separator in title:
-                            # 取第一部分作为主标题
-                            title = title.split(separator)[0].strip()
+            if head is None and soup.title and soup.title.string:
+                title = self.main_title(soup.title.string)
+                if title is not None:
                     return title
             
             # 2. 尝试获取 h1 标签内容
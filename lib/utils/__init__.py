@@ -1,4 +1,12 @@
 from .logger import setup_logger
-from .http_utils import HTTPClient
 
-__all__ = ['setup_logger', 'HTTPClient'] 
\ No newline at end of file
+__all__ = ['setup_logger', 'HTTPClient']
+
+
+def __getattr__(name):
+    # HTTPClient 依赖 requests，用到时才导入
+    if name == 'HTTPClient':
+        from .http_utils import HTTPClient
+        globals()[name] = HTTPClient
+        return HTTPClient
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,249 @@
+import asyncio
+import ssl
+from contextlib import asynccontextmanager
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+import requests
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+from config.settings import WEB_TIMEOUT, WEB_PER_HOST_CONNECTIONS
+from .http_utils import redirect_target, body_limits, CappedBody, ACCEPT_ENCODING, READ_SIZE
+
+# 与 http.client 相同的响应头数量上限
+MAX_HEADERS = 100
+
+
+class HTTPProtocolError(Exception):
+    """响应不是合法的 HTTP/1.x 报文"""
+
+
+class _Connection:
+    """一条 HTTP 连接，key 为 (协议, 主机, 端口)"""
+
+    def __init__(self, key: Tuple[str, str, int], reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.key = key
+        self.reader = reader
+        self.writer = writer
+        self.reusable = False
+
+    def close(self) -> None:
+        self.writer.close()
+
+
+def _split_url(url: str) -> Tuple[Tuple[str, str, int], str, str]:
+    """返回 ((协议, 主机, 端口), 请求路径, Host 头)"""
+    try:
+        parts = urlsplit(url)
+        scheme = parts.scheme.lower()
+        default_port = 443 if scheme == 'https' else 80
+        port = parts.port or default_port
+    except ValueError as e:
+        raise HTTPProtocolError(f"Invalid URL {url}: {str(e)}") from None
+    if scheme not in ('http', 'https') or not parts.hostname:
+        raise HTTPProtocolError(f"Unsupported URL {url}")
+    host = parts.hostname
+    name = f"[{host}]" if ':' in host else host
+    target = parts.path or '/'
+    if parts.query:
+        target += f"?{parts.query}"
+    return (scheme, host, port), target, name if port == default_port else f"{name}:{port}"
+
+
+def build_response(url: str, status: int, reason: str, headers: CaseInsensitiveDict, body: bytes) -> requests.Response:
+    """构造 requests.Response，解析逻辑与线程引擎共用"""
+    response = requests.Response()
+    response.url = url
+    response.status_code = status
+    response.reason = reason
+    response.headers = headers
+    response._content = body
+    response._content_consumed = True
+    response.encoding = get_encoding_from_headers(headers)
+    return response
+
+
+class AsyncHTTPClient:
+    """
+    基于 asyncio 的最小 HTTP/1.1 客户端，供 async Web 识别引擎使用
+
+    只发送 GET，不校验证书；建立连接与每次读取分别受 timeout 限制(与 requests 的 timeout 含义相同)；
+    跳转按 CMSScanner.get_response 的方式手动跟踪，跳转到同一源时复用连接。
+    响应体最多读取 max_body 字节(与线程引擎相同的上限，见 http_utils.body_limits)，被截断的响应 truncated 为 True。
+    调用方用 host_slot 限制同一主机同时打开的连接数。
+    """
+
+    def __init__(self, timeout: float = None, per_host: int = None, max_body: int = None):
+        self.timeout = timeout or WEB_TIMEOUT
+        self.per_host = per_host or WEB_PER_HOST_CONNECTIONS
+        self.max_body = max_body
+        # {主机: [信号量, 使用者数]}，没有使用者时删除，内存只与同时访问的主机数有关
+        self._hosts: Dict[str, List] = {}
+        self._ssl: Optional[ssl.SSLContext] = None
+
+    @asynccontextmanager
+    async def host_slot(self, host: str):
+        """等待主机的连接配额"""
+        entry = self._hosts.get(host)
+        if entry is None:
+            entry = self._hosts[host] = [asyncio.Semaphore(self.per_host), 0]
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                yield
+        finally:
+            entry[1] -= 1
+            if not entry[1]:
+                del self._hosts[host]
+
+    def ssl_context(self) -> ssl.SSLContext:
+        if self._ssl is None:
+            context = ssl.create_default_context()
+            context.check_hostname = False
+            context.verify_mode = ssl.CERT_NONE
+            self._ssl = context
+        return self._ssl
+
+    async def get(self, url: str, headers: Dict[str, str], max_redirects: int = 3) -> requests.Response:
+        """
+        GET url 并跟踪最多 max_redirects 次跳转
+
+        连接失败抛出 OSError，超时抛出 asyncio.TimeoutError，响应格式错误抛出 HTTPProtocolError。
+        """
+        conn = None
+        try:
+            conn, response = await self._request(conn, url, headers)
+            redirect_count = 0
+            while response.is_redirect and redirect_count < max_redirects:
+                location = response.headers.get('Location')
+                if not location:
+                    break
+                conn, response = await self._request(conn, redirect_target(url, location), headers)
+                redirect_count += 1
+            return response
+        finally:
+            if conn:
+                conn.close()
+
+    async def _connect(self, key: Tuple[str, str, int]) -> _Connection:
+        scheme, host, port = key
+        reader, writer = await asyncio.wait_for(
+            asyncio.open_connection(host, port, ssl=self.ssl_context() if scheme == 'https' else None),
+            self.timeout
+        )
+        return _Connection(key, reader, writer)
+
+    async def _request(self, conn: Optional[_Connection], url: str,
+                       headers: Dict[str, str]) -> Tuple[_Connection, requests.Response]:
+        """在 conn 上发送请求(不能复用时重新连接)，返回 (连接, 响应)"""
+        key, target, host = _split_url(url)
+        if conn is not None and (conn.key != key or not conn.reusable):
+            conn.close()
+            conn = None
+        if conn is not None:
+            try:
+                return conn, await self._exchange(conn, url, target, host, headers)
+            except (OSError, HTTPProtocolError):
+                # 对端可能已关闭空闲连接，换新连接重试一次
+                conn.close()
+        conn = await self._connect(key)
+        try:
+            return conn, await self._exchange(conn, url, target, host, headers)
+        except BaseException:
+            conn.close()
+            raise
+
+    async def _exchange(self, conn: _Connection, url: str, target: str, host: str,
+                        headers: Dict[str, str]) -> requests.Response:
+        lines = [f"GET {target} HTTP/1.1", f"Host: {host}", f"Accept-Encoding: {ACCEPT_ENCODING}"]
+        lines.extend(f"{name}: {value}" for name, value in headers.items())
+        conn.reusable = False
+        conn.writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1', errors='replace'))
+        await asyncio.wait_for(conn.writer.drain(), self.timeout)
+        try:
+            version, status, reason, response_headers = await self._read_head(conn.reader)
+            body = CappedBody(response_headers.get('Content-Encoding'), *body_limits(response_headers, self.max_body))
+            complete = await self._read_body(conn.reader, status, response_headers, body)
+        except (EOFError, ValueError) as e:
+            # IncompleteReadError 与超长行(LimitOverrunError 转成的 ValueError)
+            raise HTTPProtocolError(str(e) or type(e).__name__) from None
+        connection = response_headers.get('Connection', '').lower()
+        keep_alive = 'keep-alive' in connection if version == 'HTTP/1.0' else 'close' not in connection
+        conn.reusable = complete and keep_alive
+        response = build_response(url, status, reason, response_headers, body.content())
+        response.truncated = body.truncated
+        return response
+
+    async def _readline(self, reader: asyncio.StreamReader) -> bytes:
+        line = await asyncio.wait_for(reader.readline(), self.timeout)
+        if not line:
+            raise HTTPProtocolError('Connection closed before response')
+        return line
+
+    async def _read_head(self, reader: asyncio.StreamReader) -> Tuple[str, int, str, CaseInsensitiveDict]:
+        """读取状态行与响应头，跳过 1xx 临时响应"""
+        while True:
+            parts = (await self._readline(reader)).decode('latin-1').rstrip('\r\n').split(' ', 2)
+            if len(parts) < 2 or not parts[0].startswith('HTTP/') or not parts[1].isdigit():
+                raise HTTPProtocolError(f"Invalid status line: {' '.join(parts)[:64]!r}")
+            headers = CaseInsensitiveDict()
+            for _ in range(MAX_HEADERS + 1):
+                line = (await self._readline(reader)).decode('latin-1').rstrip('\r\n')
+                if not line:
+                    break
+                name, _, value = line.partition(':')
+                name, value = name.strip(), value.strip()
+                # 重复的响应头与 urllib3 一样以逗号合并
+                headers[name] = f"{headers[name]}, {value}" if name in headers else value
+            else:
+                raise HTTPProtocolError(f"More than {MAX_HEADERS} headers")
+            status = int(parts[1])
+            if not 100 <= status < 200 or status == 101:
+                return parts[0], status, parts[2] if len(parts) == 3 else '', headers
+
+    async def _read_body(self, reader: asyncio.StreamReader, status: int, headers: CaseInsensitiveDict,
+                         body: CappedBody) -> bool:
+        """把响应体交给 body，返回连接上是否已读完整个响应(达到读取上限时为 False)"""
+        if status in (101, 204, 304):
+            return status != 101
+        if 'chunked' in headers.get('Transfer-Encoding', '').lower():
+            return await self._read_chunked(reader, body)
+        length = headers.get('Content-Length')
+        if length is not None:
+            try:
+                remaining = int(length.split(',')[0])
+            except ValueError:
+                raise HTTPProtocolError(f"Invalid Content-Length: {length!r}") from None
+            while remaining > 0:
+                data = await asyncio.wait_for(reader.read(body.want(min(remaining, READ_SIZE))), self.timeout)
+                if not data:
+                    # 与 requests 一样返回已收到的部分
+                    return False
+                remaining -= len(data)
+                if not body.feed(data):
+                    return False
+            return True
+        # 没有长度信息，读到连接关闭
+        while True:
+            data = await asyncio.wait_for(reader.read(body.want()), self.timeout)
+            if not data or not body.feed(data):
+                return False
+
+    async def _read_chunked(self, reader: asyncio.StreamReader, body: CappedBody) -> bool:
+        while True:
+            line = await self._readline(reader)
+            try:
+                size = int(line.split(b';', 1)[0].strip(), 16)
+            except ValueError:
+                raise HTTPProtocolError(f"Invalid chunk size: {line[:32]!r}") from None
+            if size == 0:
+                # 跳过 trailer
+                while (await self._readline(reader)).strip():
+                    pass
+                return True
+            # 大块分段读取，达到上限时不再读取块的剩余部分
+            while size > 0:
+                data = await asyncio.wait_for(reader.readexactly(min(size, body.want())), self.timeout)
+                size -= len(data)
+                if not body.feed(data):
+                    return False
+            await self._readline(reader)
@@ -0,0 +1,83 @@
+import socket
+from typing import Dict, Optional, Tuple, TYPE_CHECKING
+from config.settings import BANNER_READ_TIMEOUT, BANNER_PROBE_TIMEOUT, BANNER_MAX_BYTES
+from lib.utils.services import service_db
+
+if TYPE_CHECKING:
+    import asyncio
+
+
+def banner_text(data: bytes, limit: int = 256) -> str:
+    """banner 的可读形式：取首行，不可打印字符转义"""
+    line = data.split(b'\n', 1)[0].rstrip(b'\r')[:limit]
+    return line.decode('utf-8', errors='backslashreplace')
+
+
+def make_record(data: bytes, probed: bool, port: int = None) -> Dict:
+    """banner 记录：首行文本、识别出的服务与产品版本"""
+    match = service_db().identify(data, port)
+    return {
+        'banner': banner_text(data),
+        'service': match.service if match else None,
+        'product': match.product if match else None,
+        'probe': 'active' if probed else 'passive',
+    }
+
+
+def _recv(sock: socket.socket, timeout: float) -> bytes:
+    sock.settimeout(timeout)
+    try:
+        return sock.recv(BANNER_MAX_BYTES)
+    except (socket.timeout, OSError):
+        return b''
+
+
+def grab_banner(sock: socket.socket, passive_timeout: float = None,
+                probe_timeout: float = None) -> Tuple[bytes, bool]:
+    """
+    在已连接的 socket 上读取 banner
+
+    先被动等待对端主动发送(SSH/FTP/SMTP 等)，没有数据时发送规则库中的主动探测
+    (HTTP HEAD，多数文本协议也会回复错误行)再读取一次。
+    返回 (数据, 是否发送了探测)。
+    """
+    data = _recv(sock, passive_timeout or BANNER_READ_TIMEOUT)
+    if data:
+        return data, False
+    try:
+        sock.sendall(service_db().probe)
+    except OSError:
+        return b'', True
+    return _recv(sock, probe_timeout or BANNER_PROBE_TIMEOUT), True
+
+
+# asyncio 只有 async 引擎用到，在协程内导入(此时已由 async 引擎载入)，线程引擎启动时不必加载
+
+async def _recv_async(loop: 'asyncio.AbstractEventLoop', sock: socket.socket, timeout: float) -> bytes:
+    import asyncio
+    try:
+        return await asyncio.wait_for(loop.sock_recv(sock, BANNER_MAX_BYTES), timeout)
+    except (asyncio.TimeoutError, OSError):
+        return b''
+
+
+async def grab_banner_async(loop: 'asyncio.AbstractEventLoop', sock: socket.socket,
+                            passive_timeout: float = None, probe_timeout: float = None) -> Tuple[bytes, bool]:
+    """grab_banner 的非阻塞版本，sock 须为非阻塞模式"""
+    import asyncio
+    data = await _recv_async(loop, sock, passive_timeout or BANNER_READ_TIMEOUT)
+    if data:
+        return data, False
+    try:
+        await asyncio.wait_for(loop.sock_sendall(sock, service_db().probe), probe_timeout or BANNER_PROBE_TIMEOUT)
+    except (asyncio.TimeoutError, OSError):
+        return b'', True
+    return await _recv_async(loop, sock, probe_timeout or BANNER_PROBE_TIMEOUT), True
+
+
+def known_service(banners: Optional[Dict[str, Dict]], ip: str, port: int) -> Optional[str]:
+    """端口扫描阶段识别出的协议，未抓取或无法识别时返回 None"""
+    if not banners:
+        return None
+    record = banners.get(f"{ip}:{port}")
+    return record.get('service') if record else None
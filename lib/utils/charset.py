@@ -0,0 +1,128 @@
+import codecs
+import re
+import threading
+from collections import OrderedDict
+from typing import Optional, Tuple
+from config.settings import CHARSET_SNIFF_BYTES, CHARSET_SAMPLE_BYTES, CHARSET_CACHE_SIZE
+
+# 按长度从长到短排列，UTF-32 LE 的 BOM 以 UTF-16 LE 的 BOM 开头
+_BOMS = (
+    (codecs.BOM_UTF32_LE, 'utf-32'), (codecs.BOM_UTF32_BE, 'utf-32'),
+    (codecs.BOM_UTF8, 'utf-8-sig'),
+    (codecs.BOM_UTF16_LE, 'utf-16'), (codecs.BOM_UTF16_BE, 'utf-16'),
+)
+# <meta charset="gbk"> 与 <meta http-equiv="Content-Type" content="text/html; charset=gbk">
+_META = re.compile(rb'<meta\b[^>]*?charset\s*=\s*["\']?\s*([\w.:-]+)', re.IGNORECASE)
+_NON_ASCII = re.compile(rb'[\x80-\xff]')
+
+
+def codec_name(label: Optional[str]) -> Optional[str]:
+    """把 charset 标签规范为 Python 编码名，无法识别时返回 None"""
+    if not label:
+        return None
+    try:
+        return codecs.lookup(label.strip().strip('"\'')).name
+    except (LookupError, ValueError):
+        return None
+
+
+def header_charset(content_type: str) -> Optional[str]:
+    """Content-Type 响应头中的 charset 参数"""
+    for param in content_type.split(';')[1:]:
+        name, _, value = param.partition('=')
+        if name.strip().lower() == 'charset':
+            return codec_name(value)
+    return None
+
+
+def sniff_charset(data: bytes) -> Optional[str]:
+    """页面开头的 BOM 或 <meta charset>"""
+    for bom, name in _BOMS:
+        if data.startswith(bom):
+            return name
+    match = _META.search(data, 0, CHARSET_SNIFF_BYTES)
+    if match:
+        return codec_name(match.group(1).decode('ascii', errors='ignore'))
+    return None
+
+
+def is_utf8(data: bytes) -> bool:
+    """data 是合法的 UTF-8；末尾不完整的字符(响应体被截断)不算错误"""
+    try:
+        codecs.getincrementaldecoder('utf-8')().decode(data, final=False)
+        return True
+    except UnicodeDecodeError:
+        return False
+
+
+def detect_sample(data: bytes) -> Optional[str]:
+    """
+    只对第一个非 ASCII 字节开始的一段数据做统计检测
+
+    页面开头通常是纯 ASCII 的标签与脚本，从非 ASCII 内容处采样，样本小而有代表性。
+    """
+    match = _NON_ASCII.search(data)
+    if match is None:
+        return 'utf-8'
+    import chardet
+    start = max(0, match.start() - 64)
+    result = chardet.detect(data[start:start + CHARSET_SAMPLE_BYTES])
+    return codec_name(result.get('encoding'))
+
+
+class CharsetDetector:
+    """
+    分层判断响应编码：
+        1. Content-Type 响应头的 charset
+        2. 页面开头 CHARSET_SNIFF_BYTES 字节内的 BOM 或 <meta charset>
+        3. 整个页面是合法的 UTF-8(C 实现的严格解码，比统计检测快得多)
+        4. 同一主机此前页面得到的编码
+        5. 对最多 CHARSET_SAMPLE_BYTES 字节的样本做统计检测
+    第 2、5 步的结果按主机缓存(最多 cache_size 个主机)，跳转与同一站点的其它页面不再重复检测。
+    """
+
+    def __init__(self, cache_size: int = None):
+        self.cache_size = cache_size or CHARSET_CACHE_SIZE
+        self._cache: 'OrderedDict[str, str]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def cached(self, host: str) -> Optional[str]:
+        with self._lock:
+            charset = self._cache.get(host)
+            if charset:
+                self._cache.move_to_end(host)
+            return charset
+
+    def remember(self, host: str, charset: str) -> None:
+        with self._lock:
+            self._cache[host] = charset
+            self._cache.move_to_end(host)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def detect(self, data: bytes, content_type: str = '', host: str = None) -> Tuple[str, str]:
+        """返回 (编码, 来源)，来源为 header/sniff/utf-8/cache/detect"""
+        charset = header_charset(content_type)
+        if charset:
+            return charset, 'header'
+        charset = sniff_charset(data)
+        if charset:
+            if host:
+                self.remember(host, charset)
+            return charset, 'sniff'
+        if is_utf8(data):
+            return 'utf-8', 'utf-8'
+        charset = self.cached(host) if host else None
+        if charset:
+            return charset, 'cache'
+        charset = detect_sample(data) or 'utf-8'
+        if host:
+            self.remember(host, charset)
+        return charset, 'detect'
+
+    def decode(self, data: bytes, content_type: str = '', host: str = None) -> str:
+        charset, _ = self.detect(data, content_type, host)
+        try:
+            return data.decode(charset, errors='replace')
+        except LookupError:
+            return data.decode('utf-8', errors='replace')
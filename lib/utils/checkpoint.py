@@ -0,0 +1,168 @@
+import json
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Set
+from config.settings import CHECKPOINT_BATCH, CHECKPOINT_INTERVAL
+
+logger = logging.getLogger("ScanJournal")
+
+
+def json_default(value: Any):
+    # 结果中的 set(如 Web 技术栈)按列表保存
+    if isinstance(value, (set, frozenset)):
+        return sorted(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+class ScanJournal:
+    """
+    扫描检查点日志
+
+    以 JSON Lines 格式只追加写入：扫描参数(meta)、已完成的目标分块、开放端口、
+    阶段完成标记、Web 识别结果以及 SSH/FTP 爆破进度。记录先放入内存缓冲区，
+    累计 CHECKPOINT_BATCH 条或距上次写入超过 CHECKPOINT_INTERVAL 秒时批量写盘，
+    不会拖慢扫描热路径。中断后用 --resume 加载同一日志即可跳过已完成的工作，
+    并继续向该日志追加记录。
+
+    每批记录以 O_APPEND 方式一次 write 写入，多个工作进程可以共用同一个日志。
+    """
+
+    VERSION = 1
+
+    def __init__(self, path: str, batch_size: int = None, interval: float = None):
+        self.path = path
+        self.batch_size = batch_size or CHECKPOINT_BATCH
+        self.interval = interval if interval is not None else CHECKPOINT_INTERVAL
+        self.meta: Dict[str, Any] = {}
+        self.done_chunks: Set[int] = set()
+        self.open_ports: Dict[str, Set[int]] = defaultdict(set)
+        self.host_chunks: Dict[str, int] = {}
+        self.stages: Dict[str, Dict[str, Any]] = {}
+        self.web: Dict[str, Dict] = {}
+        self.cred_done: Dict[str, Set[str]] = defaultdict(set)
+        self.creds: Dict[str, Dict[str, List[Dict]]] = defaultdict(dict)
+        self._buffer: List[Dict] = []
+        self._last_flush = time.time()
+        self._lock = threading.Lock()
+        self._fd: Optional[int] = None
+
+    @classmethod
+    def load(cls, path: str, **kwargs) -> 'ScanJournal':
+        """读取已有日志，恢复已完成的工作"""
+        journal = cls(path, **kwargs)
+        with open(path, 'r', encoding='utf-8') as f:
+            for line_no, line in enumerate(f, 1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # 进程被强制结束时最后一行可能不完整
+                    logger.warning(f"Skipping truncated journal record at line {line_no}")
+                    continue
+                journal._apply(record)
+        if journal.meta.get('version') != cls.VERSION:
+            raise ValueError(f"Unsupported journal format: {path}")
+        return journal
+
+    def _apply(self, record: Dict) -> None:
+        kind = record.get('t')
+        if kind == 'meta':
+            self.meta = record
+        elif kind == 'chunk':
+            self.done_chunks.add(record['i'])
+        elif kind == 'open':
+            self.open_ports[record['ip']].add(record['port'])
+            if record.get('c') is not None:
+                self.host_chunks[record['ip']] = record['c']
+        elif kind == 'stage':
+            self.stages[record['name']] = record.get('data') or {}
+        elif kind == 'web':
+            result = record['result']
+            result['technologies'] = set(result.get('technologies') or ())
+            self.web[record['key']] = result
+        elif kind == 'cred_done':
+            self.cred_done[record['service']].add(record['target'])
+        elif kind == 'cred':
+            entries = self.creds[record['service']].setdefault(record['ip'], [])
+            if record['entry'] not in entries:
+                entries.append(record['entry'])
+
+    # ------------------------------------------------------------------ 写入
+
+    def start(self, meta: Dict[str, Any]) -> None:
+        """新建日志并写入扫描参数"""
+        self.meta = dict(meta, t='meta', version=self.VERSION)
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._fd = os.open(self.path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC | os.O_APPEND, 0o644)
+        self._append(self.meta, flush=True)
+
+    def reopen(self) -> None:
+        """恢复扫描(或工作进程)继续向已有日志追加"""
+        self._fd = os.open(self.path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+
+    def _append(self, record: Dict, flush: bool = False) -> None:
+        with self._lock:
+            self._buffer.append(record)
+            if (flush or len(self._buffer) >= self.batch_size
+                    or time.time() - self._last_flush >= self.interval):
+                self._flush()
+
+    def _flush(self) -> None:
+        if not self._buffer or self._fd is None:
+            return
+        lines = [json.dumps(record, ensure_ascii=False, default=json_default) for record in self._buffer]
+        self._buffer = []
+        data = ('\n'.join(lines) + '\n').encode('utf-8')
+        while data:
+            written = os.write(self._fd, data)
+            data = data[written:]
+        self._last_flush = time.time()
+
+    def flush(self) -> None:
+        with self._lock:
+            self._flush()
+
+    def close(self) -> None:
+        with self._lock:
+            self._flush()
+            if self._fd is not None:
+                os.close(self._fd)
+                self._fd = None
+
+    def chunk_done(self, index: int) -> None:
+        """目标分块的所有探测已完成"""
+        self.done_chunks.add(index)
+        self._append({'t': 'chunk', 'i': index})
+
+    def open_port(self, ip: str, port: int, chunk: int = None) -> None:
+        """记录开放端口及主机所属的目标分块"""
+        self._append({'t': 'open', 'ip': ip, 'port': port, 'c': chunk})
+
+    def stage_done(self, name: str, data: Dict[str, Any] = None) -> None:
+        """整个扫描阶段已完成，立即写盘"""
+        self.stages[name] = data or {}
+        self._append({'t': 'stage', 'name': name, 'data': data or {}}, flush=True)
+
+    def stage_completed(self, name: str) -> bool:
+        return name in self.stages
+
+    def web_result(self, key: str, result: Dict) -> None:
+        self.web[key] = result
+        self._append({'t': 'web', 'key': key, 'result': result})
+
+    def cred_target_done(self, service: str, ip: str, port: int) -> None:
+        """某个 SSH/FTP 目标的字典已尝试完毕"""
+        self._append({'t': 'cred_done', 'service': service, 'target': f"{ip}:{port}"})
+
+    def cred_found(self, service: str, ip: str, entry: Dict) -> None:
+        self._append({'t': 'cred', 'service': service, 'ip': ip, 'entry': entry}, flush=True)
+
+    def is_cred_done(self, service: str, ip: str, port: int) -> bool:
+        return f"{ip}:{port}" in self.cred_done[service]
@@ -0,0 +1,200 @@
+import errno
+import socket
+import threading
+import time
+from collections import deque
+from typing import Dict, Optional
+
+# 探测结果分类
+SUCCESS = 'success'   # 有响应(端口开放、HTTP响应、认证失败等)
+REFUSED = 'refused'   # 连接被拒绝(RST)，路径正常
+TIMEOUT = 'timeout'   # 超时无响应
+ERROR = 'error'       # 本地资源或链路拥塞(EAGAIN/ENOBUFS/EMFILE 等)
+
+# 表示本地或链路拥塞的错误码
+CONGESTION_ERRNOS = {
+    errno.EAGAIN, errno.EWOULDBLOCK, errno.ENOBUFS, errno.EMFILE, errno.ENFILE,
+    getattr(errno, 'EADDRNOTAVAIL', -1), getattr(errno, 'WSAENOBUFS', -1),
+}
+
+
+def classify_errno(code: int, elapsed: float, timeout: float) -> str:
+    """根据 connect_ex 的返回码和耗时对探测结果分类"""
+    if code == 0:
+        return SUCCESS
+    if code in (errno.ECONNREFUSED, getattr(errno, 'WSAECONNREFUSED', -1)):
+        return REFUSED
+    # 阻塞 socket 的 connect 超时同样返回 EAGAIN，按耗时区分
+    if elapsed >= timeout * 0.95:
+        return TIMEOUT
+    if code in CONGESTION_ERRNOS:
+        return ERROR
+    return TIMEOUT
+
+
+def classify_exception(e: BaseException, default: str = REFUSED) -> str:
+    """在异常链(包括 urllib3 的 reason)中查找底层 socket 错误并对探测结果分类"""
+    pending, seen = [e], set()
+    while pending:
+        error = pending.pop()
+        if id(error) in seen:
+            continue
+        seen.add(id(error))
+        if isinstance(error, ConnectionRefusedError):
+            return REFUSED
+        if isinstance(error, (socket.timeout, TimeoutError)):
+            return TIMEOUT
+        if isinstance(error, OSError) and error.errno in CONGESTION_ERRNOS:
+            return ERROR
+        candidates = [getattr(error, 'reason', None), error.__cause__, error.__context__]
+        candidates.extend(getattr(error, 'args', ()))
+        pending.extend(c for c in candidates if isinstance(c, BaseException))
+    return default
+
+
+class AIMDController:
+    """
+    AIMD 自适应并发控制
+
+    窗口(允许的在途任务数)在成功或被拒绝时增长：低于 ssthresh 时每个成功 +1(慢启动)，
+    之后每个窗口的成功 +1(加性增)；出现 EAGAIN/ENOBUFS 等本地拥塞错误，
+    或超时率相对基线突增时，窗口乘以 decrease(乘性减)，每个采样周期最多减一次。
+    基线超时率会缓慢跟随实际超时率，因此大量端口本身被过滤时不会误判为拥塞。
+    """
+
+    SPIKE_FACTOR = 1.5      # 超时率超过基线的倍数
+    SPIKE_MARGIN = 0.1      # 超时率超过基线的绝对值
+    MIN_SAMPLES = 20        # 每个采样周期最少样本数
+
+    def __init__(self, initial: int = 32, minimum: int = 1, maximum: int = 1000,
+                 decrease: float = 0.5, interval: float = 0.5, adaptive: bool = True):
+        self.minimum = max(1, minimum)
+        self.maximum = max(self.minimum, maximum)
+        self.adaptive = adaptive
+        # 关闭自适应时窗口固定为 initial
+        self._window = float(min(max(initial, self.minimum), self.maximum))
+        self.ssthresh = float(self.maximum)
+        self.decrease = decrease
+        self.interval = interval
+        self.inflight = 0
+        self.decreases = 0
+        self.baseline: Optional[float] = None
+        self._period_start = time.time()
+        self._period_total = 0
+        self._period_timeouts = 0
+        self._last_decrease = 0.0
+        self._cond = threading.Condition(threading.Lock())
+
+    @property
+    def window(self) -> int:
+        """当前允许的在途任务数"""
+        return int(self._window)
+
+    def record(self, outcome: str) -> None:
+        """记录一次探测结果并调整窗口"""
+        if not self.adaptive:
+            return
+        with self._cond:
+            self._record(outcome)
+
+    def _record(self, outcome: str) -> None:
+        if outcome in (SUCCESS, REFUSED):
+            if self._window < self.ssthresh:
+                self._window += 1
+            else:
+                self._window += 1 / self._window
+            self._window = min(self._window, self.maximum)
+        elif outcome == ERROR:
+            self._decrease()
+
+        self._period_total += 1
+        if outcome == TIMEOUT:
+            self._period_timeouts += 1
+        now = time.time()
+        if now - self._period_start >= self.interval and self._period_total >= self.MIN_SAMPLES:
+            rate = self._period_timeouts / self._period_total
+            if self.baseline is None:
+                self.baseline = rate
+            elif rate > self.baseline * self.SPIKE_FACTOR + self.SPIKE_MARGIN:
+                self._decrease()
+            self.baseline = 0.8 * self.baseline + 0.2 * rate
+            self._period_start = now
+            self._period_total = 0
+            self._period_timeouts = 0
+
+    def _decrease(self) -> None:
+        now = time.time()
+        if now - self._last_decrease < self.interval:
+            return
+        self._last_decrease = now
+        self.ssthresh = max(float(self.minimum), self._window * self.decrease)
+        self._window = self.ssthresh
+        self.decreases += 1
+
+    def acquire(self) -> None:
+        """阻塞直到在途任务数小于窗口"""
+        with self._cond:
+            while self.inflight >= int(self._window):
+                self._cond.wait()
+            self.inflight += 1
+
+    def release(self, outcome: str = None) -> None:
+        """任务结束，记录结果并唤醒等待者"""
+        with self._cond:
+            self.inflight -= 1
+            if outcome and self.adaptive:
+                self._record(outcome)
+            free = int(self._window) - self.inflight
+            if free > 0:
+                self._cond.notify(free)
+
+    def snapshot(self) -> Dict[str, float]:
+        return {
+            'window': self.window,
+            'inflight': self.inflight,
+            'ssthresh': round(self.ssthresh, 1),
+            'baseline_timeout_rate': round(self.baseline or 0.0, 3),
+            'decreases': self.decreases,
+        }
+
+
+class AsyncWindow:
+    """
+    AIMDController 在事件循环中的闸门
+
+    协程通过 acquire 等待拥塞窗口中的空位，release 时按当前窗口(可能已增大或减小)放行等待者。
+    只能在同一个事件循环线程中使用，不需要加锁。
+    """
+
+    def __init__(self, controller: AIMDController):
+        self.controller = controller
+        self.inflight = 0
+        self._waiters = deque()
+
+    def reset(self) -> None:
+        self.inflight = 0
+        self._waiters.clear()
+
+    async def acquire(self) -> None:
+        # asyncio 只有 async 引擎用到，在协程内导入，线程引擎启动时不必加载
+        import asyncio
+        if self.inflight < self.controller.window and not self._waiters:
+            self.inflight += 1
+            return
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await waiter
+        except BaseException:
+            # 被取消时若已获得空位则归还
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            raise
+
+    def release(self) -> None:
+        self.inflight -= 1
+        while self._waiters and self.inflight < self.controller.window:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self.inflight += 1
+                waiter.set_result(None)
@@ -0,0 +1,207 @@
+import json
+from typing import Dict, Iterable, List, Set, Tuple
+from colorama import Fore, Style
+from .checkpoint import ScanJournal
+from .ports import PortSpec
+from .progress import console
+from .services import service_db, service_of
+from .targets import TargetSet
+
+# 比较的 Web 识别字段
+WEB_FIELDS = ('title', 'server', 'cms', 'technologies', 'status_code')
+
+
+def _web_state(result: Dict) -> Dict:
+    state = {field: result.get(field) for field in WEB_FIELDS}
+    state['technologies'] = sorted(state['technologies'] or ())
+    return state
+
+
+class Baseline:
+    """
+    上一次扫描的结果(--baseline)，按主机/端口建立索引，用于只报告变化
+
+    可以是 -o 保存的 JSON 结果，也可以是检查点日志(.journal)。
+    端口为 {ip: set}，Web 结果按 "ip:port" 保存比较字段，凭据为 (服务, ip, 端口, 用户名, 密码) 集合，
+    扫描过程中每个开放端口只需一次字典查找即可判断是否为新端口。
+    """
+
+    def __init__(self, path: str = None):
+        self.path = path
+        self.ports: Dict[str, Set[int]] = {}
+        self.udp: Dict[str, Set[int]] = {}
+        self.web: Dict[str, Dict] = {}
+        self.creds: Dict[str, Dict[str, List[Dict]]] = {'ssh': {}, 'ftp': {}}
+        self._cred_keys: Set[Tuple] = set()
+
+    @classmethod
+    def load(cls, path: str) -> 'Baseline':
+        """读取基线文件，格式错误时抛出 ValueError"""
+        if path.endswith('.journal'):
+            return cls.from_journal(ScanJournal.load(path))
+        with open(path, 'r', encoding='utf-8') as f:
+            try:
+                results = json.load(f)
+            except ValueError as e:
+                raise ValueError(f"Baseline is not a JSON result file: {path} ({str(e)})") from None
+        if not isinstance(results, dict) or 'ports' not in results:
+            raise ValueError(f"Baseline has no port results: {path}")
+        return cls.from_results(results, path)
+
+    @classmethod
+    def from_results(cls, results: Dict, path: str = None) -> 'Baseline':
+        baseline = cls(path)
+        baseline.ports = {ip: set(ports) for ip, ports in results.get('ports', {}).items()}
+        baseline.udp = {ip: set(ports) for ip, ports in results.get('udp', {}).items()}
+        baseline.web = {key: result for key, result in results.get('web', {}).items()
+                        if result.get('status_code', 0) > 0}
+        for service in ('ssh', 'ftp'):
+            for ip, entries in results.get(service, {}).items():
+                for entry in entries:
+                    baseline.add_cred(service, ip, entry)
+        return baseline
+
+    @classmethod
+    def from_journal(cls, journal: ScanJournal) -> 'Baseline':
+        results = {
+            'ports': journal.open_ports,
+            'udp': {},
+            'web': journal.web,
+            'ssh': journal.creds['ssh'],
+            'ftp': journal.creds['ftp'],
+        }
+        for name, data in journal.stages.items():
+            if name == 'udp' or name.startswith('udp['):
+                for ip, ports in data.get('ports', {}).items():
+                    results['udp'].setdefault(ip, []).extend(ports)
+        return cls.from_results(results, journal.path)
+
+    def add_cred(self, service: str, ip: str, entry: Dict) -> None:
+        self.creds[service].setdefault(ip, []).append(entry)
+        self._cred_keys.add(self._cred_key(service, ip, entry))
+
+    @staticmethod
+    def _cred_key(service: str, ip: str, entry: Dict) -> Tuple:
+        return service, ip, entry.get('port'), entry.get('username'), entry.get('password')
+
+    def is_new(self, ip: str, port: int) -> bool:
+        """TCP 端口在基线中是否未开放"""
+        ports = self.ports.get(ip)
+        return ports is None or port not in ports
+
+    def changed(self, ip_ports: Dict[str, Iterable[int]]) -> Dict[str, Set[int]]:
+        """只保留基线中未开放的端口"""
+        result = {}
+        for ip, ports in ip_ports.items():
+            new = {port for port in ports if self.is_new(ip, port)}
+            if new:
+                result[ip] = new
+        return result
+
+    def carry_over(self, results: Dict) -> None:
+        """把仍然开放的端口在基线中的 Web 识别结果与凭据并入 results(这些端口本次未重新识别)"""
+        for key, result in self.web.items():
+            ip, port = key.rsplit(':', 1)
+            if key not in results['web'] and int(port) in results['ports'].get(ip, ()):
+                results['web'][key] = result
+        for service in ('ssh', 'ftp'):
+            for ip, entries in self.creds[service].items():
+                current = results[service].setdefault(ip, [])
+                for entry in entries:
+                    if entry.get('port') in results['ports'].get(ip, ()) and entry not in current:
+                        current.append(entry)
+            results[service] = {ip: entries for ip, entries in results[service].items() if entries}
+
+    def vanished(self, results: Dict, ports: PortSpec, targets: TargetSet) -> List[Tuple[str, int]]:
+        """基线中开放、本次扫描范围内却未发现的 TCP 端口"""
+        gone = []
+        for ip, open_ports in self.ports.items():
+            if ip not in targets:
+                continue
+            current = results['ports'].get(ip, ())
+            gone.extend((ip, port) for port in sorted(open_ports) if port in ports.tcp and port not in current)
+        return gone
+
+    def diff(self, results: Dict, ports: PortSpec, targets: TargetSet, compare_web: bool = True) -> Dict:
+        """
+        本次结果与基线的差异
+
+        只比较本次扫描范围(目标与端口)内的端口；Web 识别只比较两次都识别到的端口，
+        凭据只报告新发现的。
+        """
+        banners = results.get('banners', {})
+        new_ports, closed_ports = [], []
+        for proto, current, previous, scope in (('tcp', results['ports'], self.ports, ports.tcp),
+                                                 ('udp', results.get('udp', {}), self.udp, ports.udp)):
+            for ip in sorted(current):
+                known = previous.get(ip, set())
+                for port in sorted(set(current[ip]) - known):
+                    if proto == 'tcp':
+                        service = service_of(banners, ip, port)
+                    else:
+                        record = banners.get(f"{ip}:{port}/udp") or {}
+                        service = record.get('service') or service_db().udp_probe(port)[0]
+                    new_ports.append({'ip': ip, 'port': port, 'proto': proto,
+                                      'service': service_db().label(service)})
+            for ip in sorted(previous):
+                if ip not in targets:
+                    continue
+                now = current.get(ip, ())
+                closed_ports.extend({'ip': ip, 'port': port, 'proto': proto}
+                                    for port in sorted(previous[ip]) if port in scope and port not in now)
+
+        web = []
+        if compare_web:
+            for key in sorted(results.get('web', {})):
+                state = _web_state(results['web'][key])
+                old = self.web.get(key)
+                if old is None:
+                    web.append({'target': key, 'change': 'new', 'fields': {f: [None, state[f]] for f in WEB_FIELDS}})
+                    continue
+                old = _web_state(old)
+                fields = {f: [old[f], state[f]] for f in WEB_FIELDS if old[f] != state[f]}
+                if fields:
+                    web.append({'target': key, 'change': 'changed', 'fields': fields})
+
+        credentials = []
+        for service in ('ssh', 'ftp'):
+            for ip, entries in sorted(results.get(service, {}).items()):
+                for entry in entries:
+                    if self._cred_key(service, ip, entry) not in self._cred_keys:
+                        credentials.append(dict(entry, service=service, ip=ip))
+
+        return {
+            'baseline': self.path,
+            'new_ports': new_ports,
+            'closed_ports': closed_ports,
+            'web': web,
+            'credentials': credentials,
+        }
+
+
+def diff_lines(diff: Dict) -> List[str]:
+    """差异的控制台输出行"""
+    lines = []
+    for item in diff['new_ports']:
+        suffix = '/udp' if item['proto'] == 'udp' else ''
+        lines.append(f"{Fore.GREEN}    + {item['ip']}:{item['port']}{suffix} ({item['service']}){Style.RESET_ALL}")
+    for item in diff['closed_ports']:
+        suffix = '/udp' if item['proto'] == 'udp' else ''
+        lines.append(f"{Fore.YELLOW}    - {item['ip']}:{item['port']}{suffix}{Style.RESET_ALL}")
+    for item in diff['web']:
+        changes = ', '.join(f"{field}: {old!r} -> {new!r}" for field, (old, new) in item['fields'].items()
+                            if item['change'] == 'changed' or field in ('title', 'cms'))
+        lines.append(f"{Fore.CYAN}    ~ {item['target']} [{item['change']}] {changes}{Style.RESET_ALL}")
+    for item in diff['credentials']:
+        lines.append(f"{Fore.RED}    ! {item['service'].upper()} {item['ip']}:{item['port']} "
+                     f"{item['username']}:{item['password']}{Style.RESET_ALL}")
+    return lines
+
+
+def print_diff(diff: Dict) -> None:
+    console.write(f"\n{Fore.BLUE}[*] Changes since baseline {diff['baseline']}: "
+                  f"{len(diff['new_ports'])} new ports, {len(diff['closed_ports'])} closed ports, "
+                  f"{len(diff['web'])} web changes, {len(diff['credentials'])} new credentials{Style.RESET_ALL}")
+    for line in diff_lines(diff):
+        console.write(line)
+
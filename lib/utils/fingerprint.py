@@ -0,0 +1,265 @@
+import logging
+import os
+import re
+import sqlite3
+import threading
+from typing import Dict, List, Optional, Pattern, Set, Tuple, Union
+
+logger = logging.getLogger("Fingerprint")
+
+# 支持的匹配字段；title 不区分大小写，body 与 header 区分
+FIELDS = ('title', 'body', 'header')
+
+# 规则表达式的语法树：('lit', 字面量编号) / ('and', [子节点]) / ('or', [子节点]) / ('false',)
+Node = Tuple
+
+_TOKEN = re.compile(r'\s*(?:(&&)|(\|\|)|(\()|(\))|([A-Za-z_][\w.]*)\s*(!?=)\s*"((?:[^"\\]|\\.)*)")')
+
+
+class RuleSyntaxError(ValueError):
+    """指纹规则无法解析"""
+
+
+def _tokenize(rule: str) -> List[Tuple[str, Union[str, Tuple[str, str, str]]]]:
+    tokens, pos = [], 0
+    rule = rule.rstrip()
+    while pos < len(rule):
+        m = _TOKEN.match(rule, pos)
+        if not m:
+            raise RuleSyntaxError(f"Unexpected text at {pos}: {rule[pos:pos + 20]!r}")
+        pos = m.end()
+        if m.group(1):
+            tokens.append(('and', '&&'))
+        elif m.group(2):
+            tokens.append(('or', '||'))
+        elif m.group(3):
+            tokens.append(('(', '('))
+        elif m.group(4):
+            tokens.append((')', ')'))
+        else:
+            value = re.sub(r'\\(.)', r'\1', m.group(7))
+            tokens.append(('term', (m.group(5).lower(), m.group(6), value)))
+    return tokens
+
+
+class _Parser:
+    """
+    递归下降解析：
+        expr := and ('||' and)*
+        and  := atom ('&&' atom)*
+        atom := '(' expr ')' | field="literal"
+    && 优先于 ||。未知字段与 != 条件按不匹配处理(与旧的逐条匹配一致)。
+    """
+
+    def __init__(self, rule: str, intern):
+        self.rule = rule
+        self.tokens = _tokenize(rule)
+        self.pos = 0
+        self.intern = intern
+
+    def parse(self) -> Node:
+        if not self.tokens:
+            raise RuleSyntaxError('Empty rule')
+        node = self._expr()
+        if self.pos != len(self.tokens):
+            raise RuleSyntaxError(f"Unexpected {self.tokens[self.pos][1]!r}")
+        return node
+
+    def _peek(self) -> Optional[str]:
+        return self.tokens[self.pos][0] if self.pos < len(self.tokens) else None
+
+    def _expr(self) -> Node:
+        nodes = [self._and()]
+        while self._peek() == 'or':
+            self.pos += 1
+            nodes.append(self._and())
+        return nodes[0] if len(nodes) == 1 else ('or', nodes)
+
+    def _and(self) -> Node:
+        nodes = [self._atom()]
+        while self._peek() == 'and':
+            self.pos += 1
+            nodes.append(self._atom())
+        return nodes[0] if len(nodes) == 1 else ('and', nodes)
+
+    def _atom(self) -> Node:
+        kind = self._peek()
+        if kind == '(':
+            self.pos += 1
+            node = self._expr()
+            if self._peek() != ')':
+                raise RuleSyntaxError('Missing )')
+            self.pos += 1
+            return node
+        if kind != 'term':
+            raise RuleSyntaxError(f"Expected a term, got {self.tokens[self.pos][1] if kind else 'end of rule'!r}")
+        field, operator, value = self.tokens[self.pos][1]
+        self.pos += 1
+        if field not in FIELDS or operator != '=':
+            return ('false',)
+        return ('lit', self.intern(field, value))
+
+
+def _evaluate(node: Node, matched: Set[int]) -> bool:
+    kind = node[0]
+    if kind == 'lit':
+        return node[1] in matched
+    if kind == 'and':
+        return all(_evaluate(child, matched) for child in node[1])
+    if kind == 'or':
+        return any(_evaluate(child, matched) for child in node[1])
+    return False
+
+
+def _literals(node: Node) -> Set[int]:
+    if node[0] == 'lit':
+        return {node[1]}
+    if node[0] in ('and', 'or'):
+        return set().union(*(_literals(child) for child in node[1]))
+    return set()
+
+
+def _trie_pattern(words: List[str]) -> str:
+    """把字面量编译成前缀树形式的正则(单分支链合并)，贪婪匹配得到某位置起最长的字面量"""
+    trie: Dict = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[''] = True
+
+    def _build(node: Dict) -> str:
+        ends = '' in node
+        branches = []
+        for char in sorted(k for k in node if k):
+            child, tail = node[char], char
+            # 没有分支且不是字面量结尾的节点并入当前片段，减少分组嵌套
+            while len(child) == 1 and '' not in child:
+                (char, child), = child.items()
+                tail += char
+            branches.append(re.escape(tail) + _build(child))
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 else f"(?:{'|'.join(branches)})"
+        if ends:
+            return f"(?:{body})?"
+        return body
+
+    return _build(trie)
+
+
+class _FieldIndex:
+    """
+    一个字段的多模式匹配器
+
+    所有字面量合并为一个前缀树正则，以零宽前瞻在每个位置取最长匹配，
+    由最长匹配查表得到该位置出现的全部字面量(都是它的前缀)，一次扫描即可找出文本中出现的所有字面量，
+    耗时与字面量数量基本无关。正则无法编译时退化为逐个子串查找。
+    """
+
+    def __init__(self, literals: Dict[str, int]):
+        self.literals = literals
+        self.always = {index for word, index in literals.items() if not word}
+        words = sorted(word for word in literals if word)
+        self.pattern: Optional[Pattern] = None
+        # 字面量 -> 它的所有前缀中同为字面量者的编号
+        self.prefixes: Dict[str, List[int]] = {}
+        if not words:
+            return
+        for word in words:
+            self.prefixes[word] = [literals[word[:i]] for i in range(1, len(word) + 1) if word[:i] in literals]
+        try:
+            self.pattern = re.compile(f"(?=({_trie_pattern(words)}))", re.DOTALL)
+        except (re.error, RecursionError, OverflowError) as e:
+            logger.warning(f"Falling back to substring search for {len(words)} literals: {str(e)}")
+
+    def scan(self, text: str) -> Set[int]:
+        matched = set(self.always)
+        if self.pattern is not None:
+            prefixes = self.prefixes
+            for word in set(self.pattern.findall(text)):
+                matched.update(prefixes[word])
+        elif self.prefixes:
+            matched.update(self.literals[word] for word in self.prefixes if word in text)
+        return matched
+
+
+class TideMatcher:
+    """
+    编译后的 TideFinger 指纹库
+
+    载入时把每条规则解析为语法树(支持 title=/body=/header= 条件与 &&、|| 及括号)，
+    所有字面量按字段去重编号并建立多模式匹配器。识别一个响应时每个字段只扫描一次，
+    得到出现的字面量集合，再只对包含其中某个字面量的规则求值(规则中没有取反，
+    不含任何已出现字面量的规则不可能成立)，返回按载入顺序第一个成立的规则名。
+    """
+
+    def __init__(self, rules: Dict[str, str]):
+        self._literals: Dict[str, Dict[str, int]] = {field: {} for field in FIELDS}
+        self.names: List[str] = []
+        self.trees: List[Node] = []
+        self.skipped: List[str] = []
+        # 字面量编号 -> 包含它的规则序号
+        self._rules_of: List[List[int]] = []
+        for name, rule in rules.items():
+            try:
+                tree = _Parser(rule or '', self._intern).parse()
+            except RuleSyntaxError as e:
+                logger.debug(f"Skipping fingerprint {name}: {str(e)}")
+                self.skipped.append(name)
+                continue
+            order = len(self.names)
+            self.names.append(name)
+            self.trees.append(tree)
+            for index in _literals(tree):
+                self._rules_of[index].append(order)
+        self._index = {field: _FieldIndex(self._literals[field]) for field in FIELDS}
+
+    def _intern(self, field: str, value: str) -> int:
+        if field == 'title':
+            value = value.lower()
+        literals = self._literals[field]
+        if value not in literals:
+            literals[value] = len(self._rules_of)
+            self._rules_of.append([])
+        return literals[value]
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def match(self, title: str, body: str, header: str) -> Optional[str]:
+        """返回第一个成立的规则名，没有时返回 None"""
+        matched = self._index['title'].scan(title.lower())
+        matched |= self._index['body'].scan(body)
+        matched |= self._index['header'].scan(header)
+        candidates = set()
+        for index in matched:
+            candidates.update(self._rules_of[index])
+        for order in sorted(candidates):
+            if _evaluate(self.trees[order], matched):
+                return self.names[order]
+        return None
+
+
+_matchers: Dict[Tuple[str, int], TideMatcher] = {}
+_lock = threading.Lock()
+
+
+def load_rules(db_path: str) -> Dict[str, str]:
+    """按库中的顺序读取 {指纹名: 规则}"""
+    with sqlite3.connect(db_path) as conn:
+        return dict(conn.execute('SELECT name, keys FROM tide'))
+
+
+def tide_matcher(db_path: str) -> TideMatcher:
+    """编译指纹库，同一文件在进程内只编译一次(文件修改后重新编译)"""
+    key = (db_path, os.stat(db_path).st_mtime_ns)
+    matcher = _matchers.get(key)
+    if matcher is None:
+        with _lock:
+            matcher = _matchers.get(key)
+            if matcher is None:
+                matcher = TideMatcher(load_rules(db_path))
+                _matchers.clear()
+                _matchers[key] = matcher
+    return matcher
@@ -0,0 +1,134 @@
+import logging
+import os
+import random
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from config.settings import HOST_CACHE_FILE, HOST_CACHE_TTL, HOST_CACHE_DEAD_SAMPLE
+from .intervals import IntervalSet
+from .targets import TargetSet
+
+logger = logging.getLogger("HostCache")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS hosts (
+    ip TEXT PRIMARY KEY,
+    alive INTEGER NOT NULL,
+    rtt REAL,
+    checked REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS ports (
+    ip TEXT NOT NULL,
+    port INTEGER NOT NULL,
+    seen REAL NOT NULL,
+    PRIMARY KEY (ip, port)
+);
+"""
+
+
+class HostCache:
+    """
+    跨扫描的主机存活与开放端口缓存(SQLite)
+
+    记录每次存活探测的结果(存活主机的响应时间、未响应的主机)和各主机的开放 TCP 端口，
+    有效期(ttl)内的记录用于规划下一次扫描：
+        - 存活主机不再探测存活，最先进行端口扫描，上次开放的端口最先探测
+        - 未响应的主机跳过，只按 dead_sample 比例抽样重新探测，过期后全部重新探测
+        - 其余主机照常探测
+
+    端口扫描阶段只刷新有开放端口的主机的存活时间，已关机的主机在有效期过后会重新经过存活探测。
+    写入先缓冲在内存中，flush 时在一个事务内写盘；多个进程可以共用同一个缓存文件。
+    """
+
+    def __init__(self, path: str = None, ttl: float = None, dead_sample: float = None):
+        self.path = path or HOST_CACHE_FILE
+        # ttl 以小时为单位
+        self.ttl = (ttl if ttl is not None else HOST_CACHE_TTL) * 3600
+        self.dead_sample = dead_sample if dead_sample is not None else HOST_CACHE_DEAD_SAMPLE
+        # 本次扫描的规划：{存活主机: rtt}、{主机: 上次开放的端口}、跳过的未响应主机
+        self.alive: Dict[str, float] = {}
+        self.ports: Dict[str, Set[int]] = {}
+        self.skip: Set[str] = set()
+        self._hosts: List[Tuple[str, int, Optional[float], float]] = []
+        self._ports: List[Tuple[str, int, float]] = []
+        self._touched: List[Tuple[float, str]] = []
+        self._cleared: List[Tuple[str, int, int]] = []
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.executescript(_SCHEMA)
+        return conn
+
+    def plan(self, targets: TargetSet, seed: int = None) -> None:
+        """读取有效期内的记录，规划本次扫描(只保留属于 targets 的主机)"""
+        self.alive.clear()
+        self.ports.clear()
+        self.skip.clear()
+        sampler = random.Random(seed)
+        cutoff = time.time() - self.ttl
+        conn = self._connect()
+        try:
+            rows = conn.execute('SELECT ip, alive, rtt FROM hosts WHERE checked >= ? ORDER BY ip', (cutoff,))
+            for ip, alive, rtt in rows:
+                if ip not in targets:
+                    continue
+                if alive:
+                    self.alive[ip] = rtt or 0.0
+                elif sampler.random() >= self.dead_sample:
+                    self.skip.add(ip)
+            for ip, port in conn.execute('SELECT ip, port FROM ports WHERE seen >= ?', (cutoff,)):
+                if ip in self.alive:
+                    self.ports.setdefault(ip, set()).add(port)
+        finally:
+            conn.close()
+
+    def record_sweep(self, probed: Iterable[str], alive: Dict[str, float]) -> None:
+        """记录一批主机的存活探测结果"""
+        now = time.time()
+        rows = [(ip, 1, alive[ip], now) if ip in alive else (ip, 0, None, now) for ip in probed]
+        with self._lock:
+            self._hosts.extend(rows)
+
+    def record_ports(self, ip: str, ports: Iterable[int], scanned: IntervalSet = None) -> None:
+        """
+        记录一个主机的端口扫描结果
+
+        Args:
+            ports: 发现的开放端口，非空时同时刷新主机的存活时间
+            scanned: 完整扫描过的端口区间，提供时清除其中不再开放的缓存端口
+        """
+        now = time.time()
+        ports = list(ports)
+        with self._lock:
+            if scanned is not None:
+                self._cleared.extend((ip, start, end) for start, end in scanned.ranges())
+            self._ports.extend((ip, port, now) for port in ports)
+            if ports:
+                self._touched.append((now, ip))
+
+    def flush(self) -> None:
+        """在一个事务内写入缓冲的记录"""
+        with self._lock:
+            hosts, touched, ports, cleared = self._hosts, self._touched, self._ports, self._cleared
+            self._hosts, self._touched, self._ports, self._cleared = [], [], [], []
+        if not (hosts or touched or ports or cleared):
+            return
+        try:
+            conn = self._connect()
+            try:
+                with conn:
+                    conn.executemany('INSERT OR REPLACE INTO hosts (ip, alive, rtt, checked) VALUES (?, ?, ?, ?)',
+                                     hosts)
+                    # 保留存活探测记录的 rtt，只刷新存活时间
+                    conn.executemany('UPDATE hosts SET alive = 1, checked = ? WHERE ip = ?', touched)
+                    conn.executemany('DELETE FROM ports WHERE ip = ? AND port BETWEEN ? AND ?', cleared)
+                    conn.executemany('INSERT OR REPLACE INTO ports (ip, port, seen) VALUES (?, ?, ?)', ports)
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            logger.error(f"Cannot write host cache {self.path}: {str(e)}")
@@ -0,0 +1,68 @@
+from html.parser import HTMLParser
+from typing import List, Optional
+
+
+class _Stop(Exception):
+    """结束扫描"""
+
+
+class _TitleScanner(HTMLParser):
+    """
+    逐标签扫描文档开头，取第一个 <title> 的文本
+
+    遇到 </title> 即停止；遇到 </head> 或 <body> 仍没有标题时也停止，此时 title 为 None。
+    标题中含有子标签或注释时无法得到与 BeautifulSoup 的 .string 相同的结果，complex 置为 True。
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.title: Optional[str] = None
+        self.complex = False
+        self._parts: Optional[List[str]] = None
+
+    def handle_starttag(self, tag, attrs):
+        if self._parts is not None:
+            self.complex = True
+            raise _Stop
+        if tag == 'title':
+            self._parts = []
+        elif tag == 'body':
+            raise _Stop
+
+    def handle_endtag(self, tag):
+        if self._parts is not None:
+            if tag == 'title':
+                self.title = ''.join(self._parts)
+            else:
+                self.complex = True
+            raise _Stop
+        if tag == 'head':
+            raise _Stop
+
+    def handle_data(self, data):
+        if self._parts is not None:
+            self._parts.append(data)
+
+    def handle_comment(self, data):
+        if self._parts is not None:
+            self.complex = True
+            raise _Stop
+
+
+def head_title(content: str, limit: int) -> Optional[str]:
+    """
+    只扫描页面前 limit 个字符，返回第一个 <title> 的文本(已解码实体，未去除空白)
+
+    在前缀中找不到完整标题、标题出现在 </head> 之后或结构复杂时返回 None，由调用方完整解析页面。
+    注释、<script>/<style> 内容按 HTML 规则跳过，结果与 BeautifulSoup(html.parser) 的 soup.title.string 一致。
+    """
+    scanner = _TitleScanner()
+    try:
+        scanner.feed(content[:limit])
+    except _Stop:
+        pass
+    except Exception:
+        return None
+    if scanner.complex:
+        return None
+    return scanner.title
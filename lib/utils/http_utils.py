@@ -1,11 +1,134 @@
 import requests
 import urllib3
-from typing import Optional, Dict, Any
+import zlib
+from typing import Optional, Dict, Any, Tuple
 import logging
+from config.settings import WEB_MAX_BODY_BYTES, WEB_MAX_DECODED_BYTES, WEB_BINARY_BODY_BYTES
 
 # 禁用SSL警告
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
+def redirect_target(url: str, location: str) -> str:
+    """跳转地址：以 / 开头的相对地址拼接到 url 的协议与主机之后，其它相对地址拼接到 url 之后"""
+    if location.startswith('/'):
+        return f"{'/'.join(url.split('/')[:3])}{location}"
+    if not location.startswith(('http://', 'https://')):
+        return f"{url.rstrip('/')}/{location.lstrip('/')}"
+    return location
+
+
+# 请求中声明支持的压缩方式，CappedBody 负责解压
+ACCEPT_ENCODING = 'gzip, deflate'
+READ_SIZE = 65536
+# 按完整内容识别的响应类型，其它类型(图片、压缩包等)只读取开头
+_TEXT_TYPES = ('text/', 'html', 'xml', 'json', 'javascript')
+
+
+def body_limits(headers, max_body: int = None) -> Tuple[int, int]:
+    """按 Content-Type 返回 (最多读取的字节数, 解压后最多保留的字节数)"""
+    max_body = max_body or WEB_MAX_BODY_BYTES
+    content_type = headers.get('Content-Type', '').lower()
+    if content_type and not any(kind in content_type for kind in _TEXT_TYPES):
+        limit = min(max_body, WEB_BINARY_BODY_BYTES)
+        return limit, limit
+    return max_body, max(max_body, WEB_MAX_DECODED_BYTES)
+
+
+class CappedBody:
+    """
+    增量接收响应体：按 Content-Encoding 解压(gzip、deflate，与 ACCEPT_ENCODING 一致，其它编码原样保存)，
+    读取的字节数超过 limit 或解压后超过 decoded_limit 时截断。
+
+    调用方每次最多读取 want() 个字节交给 feed()，feed 返回 False 时停止读取，此时 truncated 为 True。
+    want() 比剩余额度多一个字节，恰好读到 limit 的响应不会被误判为截断。
+    """
+
+    def __init__(self, encoding: Optional[str], limit: int, decoded_limit: int):
+        self.limit = limit
+        self.decoded_limit = decoded_limit
+        self.received = 0
+        self.size = 0
+        self.truncated = False
+        self._chunks = []
+        encoding = (encoding or '').strip().lower()
+        self._deflate = encoding == 'deflate'
+        self._zlib = None
+        if encoding in ('gzip', 'x-gzip'):
+            self._zlib = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        elif self._deflate:
+            self._zlib = zlib.decompressobj()
+
+    def want(self, size: int = READ_SIZE) -> int:
+        return min(size, self.limit - self.received + 1)
+
+    def feed(self, data: bytes) -> bool:
+        self.received += len(data)
+        if self.received > self.limit:
+            data = data[:len(data) - (self.received - self.limit)]
+            self.truncated = True
+        if data:
+            self._append(self._decode(data) if self._zlib else data)
+        return not self.truncated
+
+    def _decode(self, data: bytes) -> bytes:
+        # max_length 为 0 表示不限制，这里至少为 1；多解出一个字节用来判断是否超出上限
+        max_length = self.decoded_limit - self.size + 1
+        try:
+            return self._zlib.decompress(data, max_length)
+        except zlib.error as e:
+            if self._deflate and not self.size:
+                # 部分服务器发送不带 zlib 头的原始 deflate 数据
+                self._deflate = False
+                self._zlib = zlib.decompressobj(-zlib.MAX_WBITS)
+                return self._decode(data)
+            raise requests.exceptions.ContentDecodingError(f"Cannot decode body: {str(e)}") from None
+
+    def _append(self, data: bytes) -> None:
+        if self.size + len(data) > self.decoded_limit:
+            data = data[:self.decoded_limit - self.size]
+            self.truncated = True
+        self.size += len(data)
+        self._chunks.append(data)
+
+    def content(self) -> bytes:
+        return b''.join(self._chunks)
+
+
+def read_body(response: requests.Response, max_body: int = None) -> requests.Response:
+    """
+    读取 stream=True 的 requests 响应体(最多 max_body 字节)，结果写入 response.content
+
+    读完时连接放回连接池，被截断时关闭连接；response.truncated 表示是否截断。
+    读取出错时与 requests 一样抛出 RequestException。
+    """
+    body = CappedBody(response.headers.get('Content-Encoding'), *body_limits(response.headers, max_body))
+    try:
+        # 不让 urllib3 解压，解压后的大小由 CappedBody 限制
+        while True:
+            data = response.raw.read(body.want(), decode_content=False)
+            if not data or not body.feed(data):
+                break
+    except urllib3.exceptions.ReadTimeoutError as e:
+        response.close()
+        raise requests.exceptions.ReadTimeout(e) from None
+    except (urllib3.exceptions.HTTPError, OSError) as e:
+        response.close()
+        raise requests.exceptions.ConnectionError(e) from None
+    except BaseException:
+        response.close()
+        raise
+    if body.truncated:
+        # 没有读完的连接不能复用
+        response.close()
+    response._content = body.content()
+    response._content_consumed = True
+    response.truncated = body.truncated
+    if not body.truncated:
+        # 连接放回连接池
+        response.close()
+    return response
+
+
 class HTTPClient:
     def __init__(self):
         self.session = requests.Session()
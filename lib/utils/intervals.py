@@ -0,0 +1,121 @@
+from array import array
+from bisect import bisect_right
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+
+class IntervalSet:
+    """
+    由有序、互不相交的闭区间组成的整数集合
+
+    区间端点保存在 array 中（IPv6 等超过 64 位的值退化为 list），
+    添加区间时只追加到缓冲区，第一次查询时统一排序合并。
+    基数、下标访问、成员判断的复杂度只与区间个数有关，与元素个数无关。
+    """
+
+    def __init__(self, typecode: Optional[str] = 'Q', ranges: Iterable[Tuple[int, int]] = ()):
+        self.typecode = typecode
+        self._starts = self._new()
+        self._ends = self._new()
+        self._offsets = self._new()   # 每个区间之前的元素总数，用于下标访问
+        self._size = 0
+        self._pending: List[Tuple[int, int]] = []
+        for start, end in ranges:
+            self.add(start, end)
+
+    def _new(self):
+        return array(self.typecode) if self.typecode else []
+
+    def add(self, start: int, end: int = None) -> None:
+        """添加闭区间 [start, end]"""
+        end = start if end is None else end
+        if end < start:
+            start, end = end, start
+        self._pending.append((start, end))
+
+    def _normalize(self) -> None:
+        if not self._pending:
+            return
+        merged = list(zip(self._starts, self._ends)) + self._pending
+        merged.sort()
+        self._pending = []
+        starts, ends = self._new(), self._new()
+        for start, end in merged:
+            if ends and start <= ends[-1] + 1:
+                if end > ends[-1]:
+                    ends[-1] = end
+            else:
+                starts.append(start)
+                ends.append(end)
+        self._starts, self._ends = starts, ends
+        self._reindex()
+
+    def _reindex(self) -> None:
+        offsets = self._new()
+        total = 0
+        for start, end in zip(self._starts, self._ends):
+            offsets.append(total)
+            total += end - start + 1
+        self._offsets = offsets
+        self._size = total
+
+    def subtract(self, other: 'IntervalSet') -> None:
+        """从集合中移除 other 包含的所有元素"""
+        self._normalize()
+        other._normalize()
+        if not other._starts or not self._starts:
+            return
+        starts, ends = self._new(), self._new()
+        j = 0
+        other_starts, other_ends = other._starts, other._ends
+        for start, end in zip(self._starts, self._ends):
+            # 跳过完全位于当前区间左侧的排除区间
+            while j < len(other_starts) and other_ends[j] < start:
+                j += 1
+            k = j
+            cursor = start
+            while k < len(other_starts) and other_starts[k] <= end:
+                if other_starts[k] > cursor:
+                    starts.append(cursor)
+                    ends.append(other_starts[k] - 1)
+                cursor = max(cursor, other_ends[k] + 1)
+                k += 1
+            if cursor <= end:
+                starts.append(cursor)
+                ends.append(end)
+        self._starts, self._ends = starts, ends
+        self._reindex()
+
+    def ranges(self) -> Iterator[Tuple[int, int]]:
+        """按顺序产出所有闭区间"""
+        self._normalize()
+        return zip(self._starts, self._ends)
+
+    def range_count(self) -> int:
+        self._normalize()
+        return len(self._starts)
+
+    def __len__(self) -> int:
+        self._normalize()
+        return self._size
+
+    def __bool__(self) -> bool:
+        return len(self) > 0
+
+    def __getitem__(self, index: int) -> int:
+        """第 index 个元素（按升序），O(log 区间数)"""
+        self._normalize()
+        if index < 0:
+            index += self._size
+        if not 0 <= index < self._size:
+            raise IndexError('IntervalSet index out of range')
+        i = bisect_right(self._offsets, index) - 1
+        return self._starts[i] + (index - self._offsets[i])
+
+    def __contains__(self, value: int) -> bool:
+        self._normalize()
+        i = bisect_right(self._starts, value) - 1
+        return i >= 0 and value <= self._ends[i]
+
+    def __iter__(self) -> Iterator[int]:
+        for start, end in self.ranges():
+            yield from range(start, end + 1)
@@ -0,0 +1,33 @@
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Windows 下 select() 最多支持 512 个 socket
+WINDOWS_SELECT_LIMIT = 500
+
+
+def usable_fds(wanted: int, reserve: int = 256) -> int:
+    """
+    尽量提高进程文件描述符上限，返回可用于并发 socket 的数量
+
+    Args:
+        wanted: 期望同时打开的 socket 数
+        reserve: 为日志、报告等其它文件保留的描述符数
+    """
+    if resource is None:
+        return wanted
+    try:
+        soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+        if soft != resource.RLIM_INFINITY and soft < wanted + reserve:
+            target = wanted + reserve if hard == resource.RLIM_INFINITY else min(hard, wanted + reserve)
+            try:
+                resource.setrlimit(resource.RLIMIT_NOFILE, (target, hard))
+                soft = target
+            except (ValueError, OSError):
+                pass
+        if soft != resource.RLIM_INFINITY:
+            return max(1, min(wanted, soft - reserve))
+    except (ValueError, OSError):
+        pass
+    return wanted
@@ -3,13 +3,17 @@ import os
 from datetime import datetime
 from typing import Dict, List, Any
 from colorama import Fore, Style
+from lib.utils.checkpoint import json_default
+from lib.utils.progress import console
+from lib.utils.services import service_db, service_of
+from lib.utils.technologies import tech_labels
 
 class OutputFormatter:
     @staticmethod
     def to_json(results: Dict, filename: str) -> None:
         """输出JSON格式"""
         with open(filename, 'w', encoding='utf-8') as f:
-            json.dump(results, f, ensure_ascii=False, indent=4)
+            json.dump(results, f, ensure_ascii=False, indent=4, default=json_default)
 
     @staticmethod
     def to_html(scan_results: Dict, filename: str) -> None:
@@ -108,6 +112,7 @@ class OutputFormatter:
                 .bg-danger {{ background-color: var(--apple-danger) !important; }}
                 .bg-warning {{ background-color: var(--apple-warning) !important; }}
                 .bg-info {{ background-color: var(--apple-accent) !important; }}
+                .bg-success {{ background-color: var(--apple-success) !important; }}
                 
                 a {{
                     color: var(--apple-accent);
@@ -175,6 +180,7 @@ class OutputFormatter:
             <div class="container">
                 <h1>Mscan 扫描报告</h1>
                 <p class="text-muted">生成时间: {now}</p>
+                {OutputFormatter._generate_diff_card(scan_results.get('diff'))}
                 
                 <!-- 端口扫描结果 -->
                 <div class="card">
@@ -191,7 +197,31 @@ class OutputFormatter:
                                 </tr>
                             </thead>
                             <tbody>
-                                {OutputFormatter._generate_port_rows(scan_results.get('ports', {}))}
+                                {OutputFormatter._generate_port_rows(scan_results.get('ports', {}), scan_results.get('banners', {}), scan_results.get('udp', {}))}
+                            </tbody>
+                        </table>
+                    </div>
+                </div>
+
+                <!-- 主机响应时间 -->
+                <div class="card">
+                    <div class="card-header">
+                        <h3 class="card-title">主机响应时间</h3>
+                    </div>
+                    <div class="card-body">
+                        <table id="rttTable" class="table table-hover">
+                            <thead>
+                                <tr>
+                                    <th>IP地址</th>
+                                    <th>平滑RTT (ms)</th>
+                                    <th>RTT偏差 (ms)</th>
+                                    <th>最小/最大 (ms)</th>
+                                    <th>探测超时 (ms)</th>
+                                    <th>样本数</th>
+                                </tr>
+                            </thead>
+                            <tbody>
+                                {OutputFormatter._generate_rtt_rows(scan_results.get('rtt', {}))}
                             </tbody>
                         </table>
                     </div>
@@ -298,7 +328,58 @@ class OutputFormatter:
         with open(filename, 'w', encoding='utf-8') as f:
             f.write(html_template)
 
-        print(f"{Fore.GREEN}[+] Report saved to {filename}{Style.RESET_ALL}")
+        console.write(f"{Fore.GREEN}[+] Report saved to {filename}{Style.RESET_ALL}")
+
+    @staticmethod
+    def _generate_diff_card(diff: Dict = None) -> str:
+        """与基线的差异(--baseline)，没有基线时不输出"""
+        if diff is None:
+            return ''
+        rows = []
+        for item in diff['new_ports']:
+            suffix = '/udp' if item['proto'] == 'udp' else ''
+            rows.append(('success', '新开放端口', f"{item['ip']}:{item['port']}{suffix}", item['service']))
+        for item in diff['closed_ports']:
+            suffix = '/udp' if item['proto'] == 'udp' else ''
+            rows.append(('warning', '端口关闭', f"{item['ip']}:{item['port']}{suffix}", ''))
+        for item in diff['web']:
+            label = '新Web服务' if item['change'] == 'new' else 'Web变化'
+            details = '; '.join(f"{field}: {old} → {new}" for field, (old, new) in item['fields'].items()
+                                if item['change'] == 'changed' or new)
+            rows.append(('info', label, item['target'], details))
+        for item in diff['credentials']:
+            rows.append(('danger', f"新{item['service'].upper()}凭据", f"{item['ip']}:{item['port']}",
+                         f"{item['username']}:{item['password']}"))
+        body = '\n'.join(f"""
+                <tr>
+                    <td><span class="badge bg-{badge}">{label}</span></td>
+                    <td>{target}</td>
+                    <td>{details}</td>
+                </tr>
+            """ for badge, label, target, details in rows)
+        return f"""
+                <!-- 与基线的差异 -->
+                <div class="card">
+                    <div class="card-header">
+                        <h3 class="card-title">与基线的差异 ({len(rows)})</h3>
+                        <p class="text-muted mb-0">基线: {diff['baseline']}</p>
+                    </div>
+                    <div class="card-body">
+                        <table id="diffTable" class="table table-hover">
+                            <thead>
+                                <tr>
+                                    <th>变化</th>
+                                    <th>目标</th>
+                                    <th>详情</th>
+                                </tr>
+                            </thead>
+                            <tbody>
+                                {body}
+                            </tbody>
+                        </table>
+                    </div>
+                </div>
+        """
 
     @staticmethod
     def _generate_web_rows(web_results: Dict) -> str:
@@ -307,7 +388,7 @@ class OutputFormatter:
         for key, data in web_results.items():
             ip, port = key.split(':')
             url = f"{'https' if port == '443' else 'http'}://{ip}:{port}"
-            technologies = ', '.join(data.get('technologies', []))
+            technologies = ', '.join(tech_labels(data))
             server = data.get('server', 'Unknown')
             title = data.get('title', 'Unknown')
             status = data.get('status_code', 0)
@@ -367,53 +448,56 @@ class OutputFormatter:
         return '\n'.join(rows)
 
     @staticmethod
-    def _generate_port_rows(port_results: Dict) -> str:
-        """生成端口扫描表格行"""
+    def _generate_port_rows(port_results: Dict, banners: Dict = None, udp_results: Dict = None) -> str:
+        """生成端口扫描表格行，有 banner 时服务名使用 banner 识别出的服务，UDP 端口标记为 端口/udp"""
+        banners = banners or {}
+        udp_results = udp_results or {}
         rows = []
-        for ip, ports in port_results.items():
+        for ip in list(port_results) + [ip for ip in udp_results if ip not in port_results]:
             # 将端口按数字大小排序
-            sorted_ports = sorted(ports)
+            sorted_ports = [str(port) for port in sorted(port_results.get(ip, ()))]
             # 获取每个端口对应的服务
-            services = [f"{port} ({OutputFormatter._get_service_name(port)})" for port in sorted_ports]
-            
+            services = [
+                f"{port} ({service_db().label(service_of(banners, ip, int(port)))})" for port in sorted_ports
+            ]
+            for port in sorted(udp_results.get(ip, ())):
+                record = banners.get(f"{ip}:{port}/udp") or {}
+                service = record.get('service') or service_db().udp_probe(port)[0]
+                sorted_ports.append(f"{port}/udp")
+                services.append(f"{port}/udp ({service_db().label(service)})")
+
             row = f"""
                 <tr>
                     <td>{ip}</td>
-                    <td class="port-open">{', '.join(map(str, sorted_ports))}</td>
+                    <td class="port-open">{', '.join(sorted_ports)}</td>
                     <td class="service">{', '.join(services)}</td>
                 </tr>
             """
             rows.append(row)
         return '\n'.join(rows)
 
+    @staticmethod
+    def _generate_rtt_rows(rtt_results: Dict) -> str:
+        """生成主机响应时间表格行"""
+        rows = []
+        for ip, stats in rtt_results.items():
+            row = f"""
+                <tr>
+                    <td>{ip}</td>
+                    <td>{stats.get('srtt', 0)}</td>
+                    <td>{stats.get('rttvar', 0)}</td>
+                    <td>{stats.get('min', 0)} / {stats.get('max', 0)}</td>
+                    <td>{stats.get('timeout', 0)}</td>
+                    <td>{stats.get('samples', 0)}</td>
+                </tr>
+            """
+            rows.append(row)
+        return '\n'.join(rows)
+
     @staticmethod
     def _get_service_name(port: int) -> str:
         """获取端口对应的服务名称"""
-        common_ports = {
-            20: 'FTP-DATA',
-            21: 'FTP',
-            22: 'SSH',
-            23: 'Telnet',
-            25: 'SMTP',
-            53: 'DNS',
-            80: 'HTTP',
-            110: 'POP3',
-            111: 'RPC',
-            139: 'NetBIOS',
-            143: 'IMAP',
-            443: 'HTTPS',
-            445: 'SMB',
-            1433: 'MSSQL',
-            1521: 'Oracle',
-            3306: 'MySQL',
-            3389: 'RDP',
-            5432: 'PostgreSQL',
-            6379: 'Redis',
-            8080: 'HTTP-Proxy',
-            8443: 'HTTPS-Alt',
-            27017: 'MongoDB'
-        }
-        return common_ports.get(port, 'Unknown')
+        return service_db().port_label(port)
 
     @staticmethod
     def save_results(results: Dict, filename: str) -> None:
@@ -0,0 +1,113 @@
+from typing import Iterable, Iterator, Tuple, Union
+from .intervals import IntervalSet
+
+MIN_PORT = 1
+MAX_PORT = 65535
+PROTOCOLS = ('tcp', 'udp')
+_PREFIXES = {'T': 'tcp', 'U': 'udp'}
+
+
+class PortSpec:
+    """
+    端口描述，如 "1-1024,3306,T:8000-9000,U:53,161"
+
+    - 逗号分隔的单个端口或范围，范围两端可省略("-1024"、"60000-"、"-" 表示全部)
+    - "T:"/"U:" 前缀指定协议，对其后的项一直生效，直到出现另一个前缀(与 nmap 相同)，默认为 TCP
+    - 描述可以引用预定义模式名(如 "common,8000-9000")
+
+    各协议的端口以 IntervalSet 区间保存，1-65535 只占一个区间；
+    长度、下标访问与成员判断不展开端口列表，遍历时按区间惰性产出。
+    """
+
+    def __init__(self):
+        self.tcp = IntervalSet('I')
+        self.udp = IntervalSet('I')
+
+    @classmethod
+    def parse(cls, spec: str, exclude: str = None, modes: dict = None) -> 'PortSpec':
+        """
+        解析端口描述
+
+        Args:
+            spec: 端口描述
+            exclude: 排除的端口描述，语法相同
+            modes: 可在描述中引用的预定义模式 {名称: 端口描述}
+        """
+        ports = cls()
+        ports.add(spec, modes)
+        if exclude:
+            ports.subtract(cls.parse(exclude, modes=modes))
+        return ports
+
+    def add(self, spec: str, modes: dict = None, protocol: str = 'tcp') -> None:
+        """添加端口描述，格式错误时抛出 ValueError"""
+        for item in spec.split(','):
+            item = item.strip()
+            if not item:
+                continue
+            prefix, sep, rest = item.partition(':')
+            if sep:
+                if prefix.upper() not in _PREFIXES:
+                    raise ValueError(f"Unknown protocol prefix in port spec: {item}")
+                protocol = _PREFIXES[prefix.upper()]
+                item = rest.strip()
+                if not item:
+                    continue
+            if modes and item in modes:
+                self.add(modes[item], modes, protocol)
+                continue
+            start, end = self._parse_range(item)
+            getattr(self, protocol).add(start, end)
+
+    @staticmethod
+    def _parse_range(item: str) -> Tuple[int, int]:
+        try:
+            if '-' in item:
+                start, end = item.split('-', 1)
+                start = int(start) if start.strip() else MIN_PORT
+                end = int(end) if end.strip() else MAX_PORT
+            else:
+                start = end = int(item)
+        except ValueError:
+            raise ValueError(f"Invalid port: {item}") from None
+        if not MIN_PORT <= start <= end <= MAX_PORT:
+            raise ValueError(f"Port out of range (1-65535): {item}")
+        return start, end
+
+    def subtract(self, other: 'PortSpec') -> None:
+        self.tcp.subtract(other.tcp)
+        self.udp.subtract(other.udp)
+
+    def __len__(self) -> int:
+        return len(self.tcp) + len(self.udp)
+
+    def __bool__(self) -> bool:
+        return len(self) > 0
+
+    def __str__(self) -> str:
+        """规范化的端口描述，区间已合并"""
+        parts = []
+        for protocol in PROTOCOLS:
+            ranges = [str(start) if start == end else f"{start}-{end}"
+                      for start, end in getattr(self, protocol).ranges()]
+            if ranges:
+                parts.append(f"{protocol[0].upper()}:{','.join(ranges)}")
+        return ','.join(parts)
+
+
+def as_intervals(ports: Union[IntervalSet, Iterable[int]]) -> IntervalSet:
+    """端口列表转换为 IntervalSet，已是 IntervalSet 时原样返回"""
+    if isinstance(ports, IntervalSet):
+        return ports
+    return IntervalSet('I', ((port, port) for port in ports))
+
+
+def chunks(ports: IntervalSet, size: int) -> Iterator[range]:
+    """
+    按升序把端口切分为最多 size 个端口的 range
+
+    range 只保存端点，不跨越区间边界；端口很多时调度器可以逐段提交，不必展开整个端口列表。
+    """
+    for start, end in ports.ranges():
+        for low in range(start, end + 1, size):
+            yield range(low, min(low + size, end + 1))
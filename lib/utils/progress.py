@@ -1,12 +1,214 @@
-class ProgressBar:
+import sys
+import threading
+import time
+from collections import deque
+from typing import Callable, List, Optional, TextIO
+from config.settings import PROGRESS_INTERVAL
+
+
+class ShardedCounter:
+    """
+    分片计数器
+
+    每个线程累加自己的计数单元，热路径上没有锁也没有共享写入；
+    读取时把所有单元求和，只有渲染线程按固定频率读取。
+    """
+
     def __init__(self):
-        self.total = 0
-        self.current = 0
-        
+        self._local = threading.local()
+        self._cells: List[List[int]] = []
+        self._lock = threading.Lock()
+
+    def _cell(self) -> List[int]:
+        try:
+            return self._local.cell
+        except AttributeError:
+            cell = [0]
+            with self._lock:
+                self._cells.append(cell)
+            self._local.cell = cell
+            return cell
+
+    def add(self, n: int = 1) -> None:
+        self._cell()[0] += n
+
+    @property
+    def value(self) -> int:
+        return sum(cell[0] for cell in list(self._cells))
+
+    def reset(self) -> None:
+        """清零，只应在没有线程累加时调用"""
+        with self._lock:
+            for cell in self._cells:
+                cell[0] = 0
+
+    def __int__(self) -> int:
+        return self.value
+
+
+class Console:
+    """
+    控制台输出
+
+    扫描线程只把结果行放入队列，由单个渲染线程按 PROGRESS_INTERVAL 批量写出，
+    并在终端最后一行刷新状态栏(状态由回调函数读取计数器生成)。
+    输出不是终端(重定向到文件/管道)时不绘制状态栏，只按批写出结果行；
+    quiet 模式下不做任何输出。
+    """
+
+    def __init__(self, stream: TextIO = None, interval: float = None, quiet: bool = False):
+        self._stream = stream
+        self.interval = interval or PROGRESS_INTERVAL
+        self.quiet = quiet
+        self._lines = deque()
+        self._status: Optional[Callable[[], str]] = None
+        self._status_width = 0
+        self._thread: Optional[threading.Thread] = None
+        self._depth = 0
+        self._stop = threading.Event()
+        self._write_lock = threading.Lock()
+
+    def configure(self, quiet: bool = None, stream: TextIO = None, interval: float = None) -> None:
+        if quiet is not None:
+            self.quiet = quiet
+        if stream is not None:
+            self._stream = stream
+        if interval is not None:
+            self.interval = interval
+
+    @property
+    def stream(self) -> TextIO:
+        # 未指定时每次取当前的 sys.stdout，以便 contextlib.redirect_stdout 生效
+        return self._stream or sys.stdout
+
+    @property
+    def tty(self) -> bool:
+        try:
+            return self.stream.isatty()
+        except (AttributeError, ValueError):
+            return False
+
+    def write(self, line: str = '') -> None:
+        """输出一行；渲染线程运行时只入队，不阻塞调用线程"""
+        if self.quiet:
+            return
+        with self._write_lock:
+            # 与 stop() 中清除 _thread 互斥，入队的行一定会被最后一次渲染写出
+            if self._thread is not None:
+                self._lines.append(line)
+            else:
+                self.stream.write(line + '\n')
+                self.stream.flush()
+
+    def start(self, status: Callable[[], str] = None) -> None:
+        """
+        启动渲染线程，status 返回当前状态栏内容
+
+        可以嵌套调用：已启动时只增加计数并保留外层的状态栏，
+        例如流水线汇总各阶段的状态，其中的端口扫描不会覆盖它。
+        """
+        self._depth += 1
+        if self._depth > 1:
+            return
+        self._status = status
+        if self.quiet:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='console', daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """停止渲染线程，写出剩余的结果行与最终状态"""
+        self._depth = max(0, self._depth - 1)
+        if self._depth:
+            return
+        thread = self._thread
+        if thread is not None:
+            self._stop.set()
+            thread.join()
+            with self._write_lock:
+                self._thread = None
+                self._emit(self._compose(final=True))
+        self._status = None
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self._render()
+            except Exception:
+                # 输出失败(如管道关闭)不影响扫描
+                pass
+
+    def _render(self) -> None:
+        text = self._compose()
+        if text:
+            with self._write_lock:
+                self._emit(text)
+
+    def _emit(self, text: str) -> None:
+        if text:
+            self.stream.write(text)
+            self.stream.flush()
+
+    def _compose(self, final: bool = False) -> str:
+        """取出队列中的结果行并拼接状态栏，返回待写出的文本"""
+        lines = []
+        while self._lines:
+            lines.append(self._lines.popleft())
+        status = None
+        if self._status is not None and self.tty:
+            try:
+                status = self._status()
+            except Exception:
+                status = None
+
+        parts = []
+        if self._status_width and (lines or status is not None):
+            # 清除上一次绘制的状态栏
+            parts.append('\r' + ' ' * self._status_width + '\r')
+            self._status_width = 0
+        parts.extend(line + '\n' for line in lines)
+        if status is not None:
+            if final:
+                parts.append(status + '\n')
+            else:
+                parts.append(status)
+                self._status_width = len(status)
+        return ''.join(parts)
+
+
+# 全局控制台，mscan.py 根据 --quiet 配置
+console = Console()
+
+
+class ProgressBar:
+    """基于 Console 状态栏的简单进度条"""
+
+    def __init__(self, total: int = 0, description: str = 'Progress'):
+        self.total = total
+        self.description = description
+        self.counter = ShardedCounter()
+        self.start_time = time.time()
+
+    @property
+    def current(self) -> int:
+        return self.counter.value
+
+    def start(self) -> None:
+        self.start_time = time.time()
+        console.start(self.render)
+
     def update(self, n=1):
         """更新进度"""
-        pass
-        
+        self.counter.add(n)
+
+    def render(self) -> str:
+        current = self.current
+        percent = current / self.total * 100 if self.total else 100.0
+        elapsed = time.time() - self.start_time
+        rate = current / elapsed if elapsed > 0 else 0.0
+        return f"[*] {self.description}: {current}/{self.total} ({percent:.1f}%) {rate:.1f}/s"
+
     def finish(self):
         """完成进度"""
-        pass 
\ No newline at end of file
+        console.stop()
@@ -0,0 +1,153 @@
+import threading
+from array import array
+from bisect import bisect_left
+from collections import Counter
+from typing import Dict, Iterable, Iterator, List, Set, Tuple, Union
+
+PORT_SPACE = 65536
+BITMAP_BYTES = PORT_SPACE // 8
+
+# 每个字节值中被置位的比特，用于把位图展开为端口列表
+_BITS = tuple(tuple(bit for bit in range(8) if value >> bit & 1) for value in range(256))
+
+
+def _bitmap_ports(bitmap: bytearray) -> List[int]:
+    return [index * 8 + bit for index, byte in enumerate(bitmap) if byte for bit in _BITS[byte]]
+
+
+class PortResultStore:
+    """
+    紧凑的开放端口结果存储
+
+    每个主机的开放端口默认保存为有序的 uint16 数组(array('H'))，
+    端口数超过 BITMAP_THRESHOLD 时转为 65536 位(8KB)的位图，
+    对每个端口都有响应的蜜罐主机也只占用固定大小的内存。
+    主机按 IP 哈希分到多个分片，每个分片一把锁，避免全局锁竞争。
+    """
+
+    BITMAP_THRESHOLD = BITMAP_BYTES // 2   # 数组与位图占用内存相同的端口数
+    SHARDS = 16
+
+    def __init__(self, shards: int = None):
+        count = shards or self.SHARDS
+        self._mask = count - 1 if count & (count - 1) == 0 else None
+        self._shards: List[Dict[str, Union[array, bytearray]]] = [{} for _ in range(count)]
+        self._locks = [threading.Lock() for _ in range(count)]
+
+    def _index(self, ip: str) -> int:
+        value = hash(ip)
+        return value & self._mask if self._mask is not None else value % len(self._shards)
+
+    # ------------------------------------------------------------------ 写入
+
+    def add(self, ip: str, port: int) -> bool:
+        """记录开放端口，返回是否为新端口"""
+        index = self._index(ip)
+        shard = self._shards[index]
+        with self._locks[index]:
+            ports = shard.get(ip)
+            if ports is None:
+                shard[ip] = array('H', (port,))
+                return True
+            if isinstance(ports, bytearray):
+                byte, bit = port >> 3, 1 << (port & 7)
+                if ports[byte] & bit:
+                    return False
+                ports[byte] |= bit
+                return True
+            position = bisect_left(ports, port)
+            if position < len(ports) and ports[position] == port:
+                return False
+            ports.insert(position, port)
+            if len(ports) > self.BITMAP_THRESHOLD:
+                shard[ip] = self._to_bitmap(ports)
+            return True
+
+    def update(self, ip: str, ports: Iterable[int]) -> None:
+        for port in ports:
+            self.add(ip, port)
+
+    @staticmethod
+    def _to_bitmap(ports: Iterable[int]) -> bytearray:
+        bitmap = bytearray(BITMAP_BYTES)
+        for port in ports:
+            bitmap[port >> 3] |= 1 << (port & 7)
+        return bitmap
+
+    def clear(self) -> None:
+        for index, shard in enumerate(self._shards):
+            with self._locks[index]:
+                shard.clear()
+
+    # ------------------------------------------------------------------ 查询
+
+    def __len__(self) -> int:
+        """有开放端口的主机数"""
+        return sum(len(shard) for shard in self._shards)
+
+    def __bool__(self) -> bool:
+        return any(self._shards)
+
+    def __contains__(self, ip: str) -> bool:
+        return ip in self._shards[self._index(ip)]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.hosts())
+
+    def hosts(self) -> List[str]:
+        return [ip for shard in self._shards for ip in list(shard)]
+
+    def _raw(self, ip: str):
+        return self._shards[self._index(ip)].get(ip)
+
+    def ports(self, ip: str) -> List[int]:
+        """主机的开放端口(升序)"""
+        ports = self._raw(ip)
+        if ports is None:
+            return []
+        if isinstance(ports, bytearray):
+            return _bitmap_ports(ports)
+        return ports.tolist()
+
+    def has_port(self, ip: str, port: int) -> bool:
+        ports = self._raw(ip)
+        if ports is None:
+            return False
+        if isinstance(ports, bytearray):
+            return bool(ports[port >> 3] & (1 << (port & 7)))
+        position = bisect_left(ports, port)
+        return position < len(ports) and ports[position] == port
+
+    def count(self, ip: str) -> int:
+        """主机的开放端口数"""
+        ports = self._raw(ip)
+        if ports is None:
+            return 0
+        if isinstance(ports, bytearray):
+            return bin(int.from_bytes(ports, 'little')).count('1')
+        return len(ports)
+
+    def total_ports(self) -> int:
+        return sum(self.count(ip) for ip in self.hosts())
+
+    def items(self) -> Iterator[Tuple[str, List[int]]]:
+        for ip in self.hosts():
+            yield ip, self.ports(ip)
+
+    def to_dict(self) -> Dict[str, Set[int]]:
+        """转换为下游使用的 {ip: set(ports)} 结构"""
+        return {ip: set(ports) for ip, ports in self.items()}
+
+    # ------------------------------------------------------------------ 聚合
+
+    def port_counts(self) -> Counter:
+        """每个端口开放的主机数，按主机整体批量累加(数组直接交给 Counter)"""
+        counts = Counter()
+        for shard in self._shards:
+            for ports in list(shard.values()):
+                counts.update(_bitmap_ports(ports) if isinstance(ports, bytearray) else ports)
+        return counts
+
+    def top_ports(self, limit: int = 10) -> List[Tuple[int, int]]:
+        """开放主机数最多的端口 [(port, hosts)]"""
+        return self.port_counts().most_common(limit)
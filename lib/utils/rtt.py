@@ -0,0 +1,101 @@
+import threading
+from typing import Dict, Optional
+from config.settings import CONNECT_TIMEOUT, RTT_MIN_TIMEOUT, RTT_MAX_TIMEOUT
+
+
+class RTTEstimator:
+    """
+    单个主机的往返时间估计
+
+    按 TCP 重传定时器(RFC 6298)的方式维护平滑RTT(srtt)与RTT偏差(rttvar)，
+    探测超时取 srtt + 4 * rttvar。
+    """
+
+    ALPHA = 1 / 8
+    BETA = 1 / 4
+    K = 4
+
+    __slots__ = ('srtt', 'rttvar', 'min_rtt', 'max_rtt', 'samples')
+
+    def __init__(self):
+        self.srtt: Optional[float] = None
+        self.rttvar = 0.0
+        self.min_rtt = float('inf')
+        self.max_rtt = 0.0
+        self.samples = 0
+
+    def observe(self, rtt: float) -> None:
+        """加入一个RTT样本(秒)"""
+        if self.srtt is None:
+            self.srtt = rtt
+            self.rttvar = rtt / 2
+        else:
+            self.rttvar = (1 - self.BETA) * self.rttvar + self.BETA * abs(self.srtt - rtt)
+            self.srtt = (1 - self.ALPHA) * self.srtt + self.ALPHA * rtt
+        self.min_rtt = min(self.min_rtt, rtt)
+        self.max_rtt = max(self.max_rtt, rtt)
+        self.samples += 1
+
+    def rto(self) -> Optional[float]:
+        if self.srtt is None:
+            return None
+        return self.srtt + self.K * self.rttvar
+
+
+class RTTTable:
+    """按主机维护RTT估计，为每次探测给出自适应超时"""
+
+    def __init__(self, min_timeout: float = None, max_timeout: float = None,
+                 initial_timeout: float = None):
+        self.min_timeout = min_timeout if min_timeout is not None else RTT_MIN_TIMEOUT
+        self.max_timeout = max_timeout if max_timeout is not None else RTT_MAX_TIMEOUT
+        self.initial_timeout = initial_timeout or CONNECT_TIMEOUT
+        self._hosts: Dict[str, RTTEstimator] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, ip: str, rtt: float) -> None:
+        """记录一次有响应(连接成功或被拒绝)的探测耗时"""
+        with self._lock:
+            estimator = self._hosts.get(ip)
+            if estimator is None:
+                estimator = self._hosts[ip] = RTTEstimator()
+            estimator.observe(rtt)
+
+    # 存活探测得到的RTT作为初始样本
+    seed = observe
+
+    def timeout(self, ip: str) -> float:
+        """根据主机的RTT估计计算下一次探测的超时时间"""
+        estimator = self._hosts.get(ip)
+        rto = estimator.rto() if estimator else None
+        if rto is None:
+            return self.initial_timeout
+        return min(self.max_timeout, max(self.min_timeout, rto))
+
+    def stats(self, ip: str) -> Optional[Dict[str, float]]:
+        estimator = self._hosts.get(ip)
+        if estimator is None or estimator.srtt is None:
+            return None
+        return {
+            'srtt': round(estimator.srtt * 1000, 2),
+            'rttvar': round(estimator.rttvar * 1000, 2),
+            'min': round(estimator.min_rtt * 1000, 2),
+            'max': round(estimator.max_rtt * 1000, 2),
+            'timeout': round(self.timeout(ip) * 1000, 2),
+            'samples': estimator.samples,
+        }
+
+    def to_dict(self) -> Dict[str, Dict[str, float]]:
+        """所有主机的RTT统计(毫秒)"""
+        with self._lock:
+            hosts = list(self._hosts)
+        result = {}
+        for ip in hosts:
+            stats = self.stats(ip)
+            if stats:
+                result[ip] = stats
+        return result
+
+    def clear(self) -> None:
+        with self._lock:
+            self._hosts.clear()
@@ -0,0 +1,180 @@
+import json
+import re
+import threading
+from typing import Dict, List, NamedTuple, Optional, Pattern, Tuple
+from config.settings import SERVICE_PROBES_FILE
+
+PORT_SPACE = 65536
+_SPECIALS = b'.^$*+?{}[]|()\\'
+
+
+class ServiceMatch(NamedTuple):
+    service: str
+    product: Optional[str] = None
+    soft: bool = False
+
+
+class _Rule(NamedTuple):
+    order: int
+    service: str
+    pattern: Pattern
+    product: Optional[str]
+    soft: bool
+
+
+def _first_byte(pattern: bytes) -> Optional[int]:
+    """规则开头的字面字节(锚定在 ^ 之后)，无法确定时返回 None"""
+    if not pattern.startswith(b'^') or len(pattern) < 2:
+        return None
+    head = pattern[1]
+    if head == ord('\\'):
+        escaped = pattern[2:3]
+        if escaped == b'x':
+            try:
+                return int(pattern[3:5], 16)
+            except ValueError:
+                return None
+        if escaped and escaped in _SPECIALS:
+            return escaped[0]
+        return None
+    if head in _SPECIALS:
+        return None
+    # 紧跟量词(如 a?、a*)时开头字节不确定
+    if pattern[2:3] and pattern[2:3] in b'?*{':
+        return None
+    return head
+
+
+def _expand(template: Optional[str], match) -> Optional[str]:
+    """把 $1、$2 替换为匹配到的分组"""
+    if not template:
+        return None
+
+    def _group(m):
+        value = match.group(int(m.group(1)))
+        return value.decode('utf-8', errors='replace').strip() if value else ''
+
+    return re.sub(r'\$(\d)', _group, template).strip() or None
+
+
+class ServiceDB:
+    """
+    服务识别引擎
+
+    一次性载入探测/匹配规则库(config/service_probes.json)：
+    端口默认服务与 UDP 探测载荷展开为 65536 项的数组，按端口号 O(1) 查找；
+    匹配规则全部预编译，并按规则开头的字面字节建立 256 个候选列表，
+    识别 banner 时只遍历首字节对应的一个列表(已合并无法确定开头的规则并保持优先级)。
+    扫描器、报告与流水线的阶段分发都通过它查询服务。
+    """
+
+    def __init__(self, data: Dict):
+        self.services: Dict[str, Dict] = data.get('services', {})
+        probes = data.get('probes', {})
+        self.probe: bytes = probes.get(data.get('active_probe'), '').encode('latin-1')
+
+        self._by_port: List[Optional[str]] = [None] * PORT_SPACE
+        for port, service in data.get('ports', {}).items():
+            self._by_port[int(port)] = service
+
+        rules = [
+            _Rule(order, entry['service'], re.compile(entry['pattern'].encode('latin-1'), re.S),
+                  entry.get('product'), bool(entry.get('soft')))
+            for order, entry in enumerate(data.get('matches', []))
+        ]
+        # UDP 探测载荷按端口展开，没有专用载荷的端口发送空数据报
+        self._udp_by_port: List[Optional[Tuple[str, bytes]]] = [None] * PORT_SPACE
+        for entry in data.get('udp_probes', []):
+            if 'payload_hex' in entry:
+                payload = bytes.fromhex(entry['payload_hex'])
+            else:
+                payload = entry.get('payload', '').encode('latin-1')
+            for port in entry['ports']:
+                self._udp_by_port[int(port)] = (entry['service'], payload)
+
+        generic = [rule for rule in rules if _first_byte(rule.pattern.pattern) is None]
+        specific: Dict[int, List[_Rule]] = {}
+        for rule in rules:
+            head = _first_byte(rule.pattern.pattern)
+            if head is not None:
+                specific.setdefault(head, []).append(rule)
+        generic_only = tuple(generic)
+        self._candidates: Tuple[Tuple[_Rule, ...], ...] = tuple(
+            tuple(sorted(specific[byte] + generic, key=lambda rule: rule.order)) if byte in specific else generic_only
+            for byte in range(256)
+        )
+
+    @classmethod
+    def load(cls, path: str = None) -> 'ServiceDB':
+        with open(path or SERVICE_PROBES_FILE, 'r', encoding='utf-8') as f:
+            return cls(json.load(f))
+
+    # ------------------------------------------------------------------ 端口
+
+    def port_service(self, port: int) -> Optional[str]:
+        """端口的默认服务"""
+        return self._by_port[port] if 0 <= port < PORT_SPACE else None
+
+    def label(self, service: Optional[str]) -> str:
+        """服务的显示名称"""
+        if not service:
+            return 'Unknown'
+        info = self.services.get(service)
+        return info['label'] if info else service.upper()
+
+    def port_label(self, port: int) -> str:
+        return self.label(self.port_service(port))
+
+    def is_web(self, service: Optional[str]) -> bool:
+        info = self.services.get(service)
+        return bool(info and info.get('web'))
+
+    def udp_probe(self, port: int) -> Tuple[Optional[str], bytes]:
+        """UDP 端口的 (服务, 探测载荷)，没有专用载荷时为 (None, b'')"""
+        probe = self._udp_by_port[port] if 0 <= port < PORT_SPACE else None
+        return probe or (None, b'')
+
+    # ------------------------------------------------------------------ banner
+
+    def identify(self, data: bytes, port: int = None) -> Optional[ServiceMatch]:
+        """
+        根据 banner 识别服务
+
+        只遍历首字节对应的候选规则，第一个命中的规则生效；
+        标记为 soft 的宽泛规则(如只有 220 响应码)命中时，端口有默认服务则以端口为准。
+        """
+        if not data:
+            return None
+        for rule in self._candidates[data[0]]:
+            match = rule.pattern.match(data)
+            if match is None:
+                continue
+            if rule.soft and port is not None:
+                default = self.port_service(port)
+                if default:
+                    return ServiceMatch(default, None, True)
+            return ServiceMatch(rule.service, _expand(rule.product, match), rule.soft)
+        return None
+
+
+_db: Optional[ServiceDB] = None
+_db_lock = threading.Lock()
+
+
+def service_db() -> ServiceDB:
+    """全局服务识别引擎，首次使用时载入"""
+    global _db
+    if _db is None:
+        with _db_lock:
+            if _db is None:
+                _db = ServiceDB.load()
+    return _db
+
+
+def service_of(banners: Optional[Dict[str, Dict]], ip: str, port: int) -> Optional[str]:
+    """ip:port 的服务：优先使用 banner 识别结果，否则使用端口默认服务"""
+    if banners:
+        record = banners.get(f"{ip}:{port}")
+        if record and record.get('service'):
+            return record['service']
+    return service_db().port_service(port)
@@ -0,0 +1,217 @@
+import ipaddress
+import logging
+import random
+import socket
+from typing import Iterable, Iterator, List, Sequence, Tuple, Union
+from .intervals import IntervalSet
+
+logger = logging.getLogger("TargetSet")
+
+_MASK64 = (1 << 64) - 1
+
+
+def _mix64(value: int) -> int:
+    """splitmix64 混合函数，用作 Feistel 轮函数"""
+    value = (value + 0x9E3779B97F4A7C15) & _MASK64
+    value = ((value ^ (value >> 30)) * 0xBF58476D1CE4E5B9) & _MASK64
+    value = ((value ^ (value >> 27)) * 0x94D049BB133111EB) & _MASK64
+    return value ^ (value >> 31)
+
+
+class RandomPermutation:
+    """
+    [0, size) 上的伪随机全周期排列
+
+    使用 Feistel 网络在 2 的幂大小的域上构造双射，再通过循环行走(cycle walking)
+    把结果限制在 [0, size) 内，因此每个下标恰好出现一次且无需保存排列本身。
+    """
+
+    ROUNDS = 4
+
+    def __init__(self, size: int, seed: int = None):
+        self.size = size
+        self.seed = random.getrandbits(64) if seed is None else seed
+        bits = max(2, (max(size, 1) - 1).bit_length())
+        self._half = (bits + 1) // 2
+        self._mask = (1 << self._half) - 1
+        self._keys = [_mix64(self.seed + i) for i in range(self.ROUNDS)]
+
+    def _encrypt(self, value: int) -> int:
+        left, right = value >> self._half, value & self._mask
+        for key in self._keys:
+            left, right = right, left ^ (_mix64(right ^ key) & self._mask)
+        return (left << self._half) | right
+
+    def __getitem__(self, index: int) -> int:
+        value = self._encrypt(index)
+        while value >= self.size:
+            value = self._encrypt(value)
+        return value
+
+    def __len__(self) -> int:
+        return self.size
+
+    def __iter__(self) -> Iterator[int]:
+        for index in range(self.size):
+            yield self[index]
+
+
+class TargetSet:
+    """
+    紧凑的扫描目标集合
+
+    IP 地址以整数区间保存（IPv4/IPv6 分开），重叠的 CIDR、范围与 @文件 输入
+    会被合并去重，可扣除排除列表，基数按区间计算。
+    """
+
+    def __init__(self):
+        self.v4 = IntervalSet('Q')
+        self.v6 = IntervalSet(None)
+
+    @classmethod
+    def from_specs(cls, specs: Union[str, Iterable[str]], exclude: Union[str, Iterable[str]] = None) -> 'TargetSet':
+        """从目标描述(IP/CIDR/范围/@文件/主机名，可用逗号分隔)构建目标集合"""
+        targets = cls()
+        targets.add(specs)
+        if exclude:
+            excluded = cls()
+            excluded.add(exclude, hosts_only=False)
+            targets.subtract(excluded)
+        return targets
+
+    def add(self, specs: Union[str, Iterable[str]], hosts_only: bool = True) -> None:
+        """
+        添加目标
+
+        Args:
+            specs: 目标描述
+            hosts_only: CIDR 是否只包含主机地址(与 network.hosts() 一致)，排除列表应为 False
+        """
+        if isinstance(specs, str):
+            specs = [specs]
+        for spec in specs:
+            for item in spec.split(','):
+                item = item.strip()
+                if item:
+                    self._add_one(item, hosts_only)
+
+    def _add_one(self, spec: str, hosts_only: bool) -> None:
+        try:
+            if spec.startswith('@'):
+                with open(spec[1:], 'r') as f:
+                    for line in f:
+                        line = line.strip()
+                        if line and not line.startswith('#'):
+                            self.add(line, hosts_only)
+            elif '/' in spec:
+                network = ipaddress.ip_network(spec, strict=False)
+                start = int(network.network_address)
+                end = int(network.broadcast_address)
+                # 与 network.hosts() 保持一致：排除网络地址和广播地址
+                if hosts_only and network.num_addresses > 2:
+                    start += 1
+                    if network.version == 4:
+                        end -= 1
+                self._intervals(network.version).add(start, end)
+            elif '-' in spec and not self._is_hostname(spec):
+                start_ip, end_ip = spec.split('-')
+                start = ipaddress.ip_address(start_ip.strip())
+                end_ip = end_ip.strip()
+                if '.' not in end_ip and ':' not in end_ip:
+                    # 简写形式：192.168.1.1-254
+                    end = ipaddress.ip_address(start_ip.strip().rsplit('.', 1)[0] + '.' + end_ip)
+                else:
+                    end = ipaddress.ip_address(end_ip)
+                if start.version != end.version:
+                    raise ValueError('address family mismatch')
+                self._intervals(start.version).add(int(start), int(end))
+            else:
+                address = self._resolve(spec)
+                self._intervals(address.version).add(int(address))
+        except Exception as e:
+            logger.error(f"Error parsing IP input {spec}: {str(e)}")
+
+    @staticmethod
+    def _is_hostname(spec: str) -> bool:
+        return any(c.isalpha() for c in spec.replace('::', '').split('-')[0]) and ':' not in spec
+
+    @staticmethod
+    def _resolve(spec: str) -> Union[ipaddress.IPv4Address, ipaddress.IPv6Address]:
+        try:
+            return ipaddress.ip_address(spec)
+        except ValueError:
+            return ipaddress.ip_address(socket.gethostbyname(spec))
+
+    def _intervals(self, version: int) -> IntervalSet:
+        return self.v4 if version == 4 else self.v6
+
+    def subtract(self, other: 'TargetSet') -> None:
+        """扣除另一个目标集合"""
+        self.v4.subtract(other.v4)
+        self.v6.subtract(other.v6)
+
+    def range_count(self) -> int:
+        return self.v4.range_count() + self.v6.range_count()
+
+    def __len__(self) -> int:
+        return len(self.v4) + len(self.v6)
+
+    def __bool__(self) -> bool:
+        return len(self) > 0
+
+    def __getitem__(self, index: int) -> str:
+        """第 index 个地址（IPv4 在前）"""
+        v4_size = len(self.v4)
+        if 0 <= index < v4_size:
+            return str(ipaddress.IPv4Address(self.v4[index]))
+        return str(ipaddress.IPv6Address(self.v6[index - v4_size]))
+
+    def __contains__(self, ip: str) -> bool:
+        try:
+            address = ipaddress.ip_address(ip)
+        except ValueError:
+            return False
+        return int(address) in self._intervals(address.version)
+
+    def __iter__(self) -> Iterator[str]:
+        for value in self.v4:
+            yield str(ipaddress.IPv4Address(value))
+        for value in self.v6:
+            yield str(ipaddress.IPv6Address(value))
+
+    def chunk(self, index: int, size: int, seed: int = None) -> List[str]:
+        """
+        第 index 个分块的地址
+
+        分块按探测顺序(提供 seed 时为伪随机顺序，否则为升序)的下标划分，
+        相同的目标、种子与分块大小在任何进程中都得到相同的分块。
+        """
+        total = len(self)
+        positions = range(index * size, min((index + 1) * size, total))
+        if seed is None:
+            return [self[i] for i in positions]
+        order = RandomPermutation(total, seed)
+        return [self[order[i]] for i in positions]
+
+    def chunk_count(self, size: int) -> int:
+        return (len(self) + size - 1) // size
+
+    def iter_shuffled(self, seed: int = None) -> Iterator[str]:
+        """按伪随机顺序产出所有地址"""
+        for index in RandomPermutation(len(self), seed):
+            yield self[index]
+
+
+def iter_shuffled_pairs(hosts: Sequence[str], ports: Sequence[int], seed: int = None) -> Iterator[Tuple[str, int]]:
+    """
+    按伪随机顺序遍历 主机 x 端口 空间
+
+    对 H x P 个下标做伪随机排列，下标 i 映射为 (hosts[i % H], ports[i // H])，
+    单个主机收到的探测均匀分布在整个扫描过程中，避免触发主机的速率限制。
+    """
+    host_count = len(hosts)
+    if not host_count or not len(ports):
+        return
+    for index in RandomPermutation(host_count * len(ports), seed):
+        port_index, host_index = divmod(index, host_count)
+        yield hosts[host_index], ports[port_index]
@@ -0,0 +1,299 @@
+import json
+import re
+import threading
+from typing import Dict, Iterable, Iterator, List, Mapping, NamedTuple, Optional, Pattern, Tuple
+from config.settings import TECHNOLOGIES_FILE
+
+_SPECIALS = '.^$*+?{}[]|()\\'
+_ATTR = re.compile(r'([\w-]+)\s*=\s*(?:"([^"]*)"|\'([^\']*)\'|([^\s"\'>]+))')
+_COOKIE = re.compile(r'(?:^|[;,])\s*([^=;,\s]+)=([^;,]*)')
+# HTML 页面中 ASCII 字符按出现频率从高到低排列(取自数百个真实页面)，未列出的字符视为最少见
+_CHAR_RANK = ' teasri"locn></d=phm.fu-:gbvy1;23#0&w_4+6k,%)(58x7\\9\'z!q[]`{}j?*|$^@~'
+_TAGS = ('<script', '<meta')
+
+
+class _Pattern(NamedTuple):
+    tech: str
+    regex: Optional[Pattern]     # None 表示纯字面量，只需子串查找
+    anchor: str                  # 必须出现的小写字面量(正则的字面量前缀)，为空时直接执行正则
+    version: Optional[str]
+    confidence: int
+
+
+def _top_level_alternation(pattern: str) -> bool:
+    """正则在分组与字符集之外含有 |，此时开头的字面量只属于第一个分支"""
+    depth, in_class, i = 0, False, 0
+    while i < len(pattern):
+        char = pattern[i]
+        if char == '\\':
+            i += 2
+            continue
+        if in_class:
+            if char == ']':
+                in_class = False
+        elif char == '[':
+            in_class = True
+            # [] 与 [^] 后紧跟的 ] 是字符集中的普通字符
+            if pattern[i + 1:i + 2] == '^':
+                i += 1
+            if pattern[i + 1:i + 2] == ']':
+                i += 1
+        elif char == '(':
+            depth += 1
+        elif char == ')':
+            depth = max(0, depth - 1)
+        elif char == '|' and not depth:
+            return True
+        i += 1
+    return False
+
+
+def _literal_prefix(pattern: str) -> Tuple[str, bool]:
+    """正则开头必须出现的字面量部分，以及整个正则是否就是字面量；顶层有 | 时没有必须出现的字面量"""
+    if _top_level_alternation(pattern):
+        return '', False
+    chars, i = [], 0
+    while i < len(pattern):
+        char = pattern[i]
+        if char == '\\':
+            escaped = pattern[i + 1:i + 2]
+            if not escaped or escaped.isalnum():
+                return ''.join(chars), False
+            char, i = escaped, i + 1
+        elif char in _SPECIALS:
+            # 紧跟量词时最后一个字符不是必须出现的
+            if char in '?*{' and chars:
+                chars.pop()
+            return ''.join(chars), False
+        chars.append(char)
+        i += 1
+    return ''.join(chars), True
+
+
+def _tags(body: str, lowered: str, prefix: str, positions: Iterable[int]) -> Iterator[Dict[str, str]]:
+    """逐个取出指定标签(如 '<script')的属性，positions 为扫描正文时得到的标签位置"""
+    last = -1
+    for pos in positions:
+        if pos < last:
+            # 出现在上一个标签的属性中
+            continue
+        start = pos + len(prefix)
+        end = lowered.find('>', start)
+        if end < 0:
+            return
+        last = end
+        if lowered[start:start + 1] in (' ', '\t', '\r', '\n', '/', '>'):
+            yield {key.lower(): a or b or c for key, a, b, c in _ATTR.findall(body, start, end)}
+
+
+def _rank(char: str) -> int:
+    index = _CHAR_RANK.find(char)
+    return len(_CHAR_RANK) if index < 0 else index
+
+
+class _AnchorIndex:
+    """
+    正文字面量(规则的字面量前缀与 <script、<meta 标签)的多模式匹配器
+
+    Python 的正则按开头字符集逐个位置尝试匹配，字面量大多以常见字母开头，直接合并为一个正则时
+    几乎每个位置都要尝试，比逐个子串查找还慢。这里每个字面量选一个在 HTML 中少见的字符作为枢轴
+    (尽量让多个字面量共用同一个枢轴)，合并后的正则从枢轴字符开始匹配其后的部分，再用后顾确认前面的部分，
+    只有少见字符所在的位置才会尝试匹配。每次匹配只前进一个字符，一次扫描即可找出所有字面量的全部出现位置。
+    """
+
+    def __init__(self, anchors: Iterable[str]):
+        anchors = sorted(set(anchor for anchor in anchors if anchor))
+        pivots = set()
+        for anchor in sorted(anchors, key=lambda word: max(map(_rank, word))):
+            if not pivots.intersection(anchor):
+                pivots.add(max(anchor, key=_rank))
+        # 枢轴字符 -> [(字面量, 枢轴在字面量中的位置)]
+        self._by_pivot: Dict[str, List[Tuple[str, int]]] = {}
+        for anchor in anchors:
+            offset = max((i for i, char in enumerate(anchor) if char in pivots), key=lambda i: _rank(anchor[i]))
+            self._by_pivot.setdefault(anchor[offset], []).append((anchor, offset))
+
+        branches = []
+        # 常见的枢轴字符排在前面，尝试匹配时先比较
+        for pivot in sorted(self._by_pivot, key=_rank):
+            tails: Dict[str, List[str]] = {}
+            for anchor, offset in self._by_pivot[pivot]:
+                tails.setdefault(anchor[offset + 1:], []).append(anchor[:offset + 1])
+            alternatives = []
+            for tail, heads in sorted(tails.items()):
+                if any(len(head) == 1 for head in heads):
+                    alternatives.append(re.escape(tail))
+                else:
+                    behind = '|'.join(f"(?<={re.escape(head + tail)})" for head in heads)
+                    alternatives.append(f"{re.escape(tail)}(?:{behind})")
+            branches.append(re.escape(pivot) + (alternatives[0] if len(alternatives) == 1
+                                                else f"(?:{'|'.join(alternatives)})"))
+        self.pattern: Optional[Pattern] = re.compile('|'.join(branches)) if branches else None
+
+    def scan(self, text: str) -> Dict[str, List[int]]:
+        """{字面量: 按顺序排列的出现位置}，只包含出现的字面量"""
+        found: Dict[str, List[int]] = {}
+        if self.pattern is None:
+            return found
+        search, by_pivot = self.pattern.search, self._by_pivot
+        match = search(text)
+        while match is not None:
+            pos = match.start()
+            # 同一枢轴位置可能有多个字面量匹配，逐个确认
+            for anchor, offset in by_pivot[text[pos]]:
+                if pos >= offset and text.startswith(anchor, pos - offset):
+                    found.setdefault(anchor, []).append(pos - offset)
+            match = search(text, pos + 1)
+        return found
+
+
+def _version(template: str, match) -> Optional[str]:
+    """把版本模板中的 $1、$2 替换为匹配到的分组"""
+    return re.sub(r'\$(\d)', lambda m: match.group(int(m.group(1))) or '', template).strip() or None
+
+
+def _compile(tech: str, spec) -> _Pattern:
+    """规则可以是正则字符串，或 {"pattern", "version", "confidence"}；默认版本取第一个分组"""
+    if isinstance(spec, str):
+        spec = {'pattern': spec}
+    pattern = spec.get('pattern', '')
+    regex = re.compile(pattern, re.IGNORECASE)
+    version = spec.get('version', '$1' if regex.groups else None)
+    prefix, literal = _literal_prefix(pattern)
+    return _Pattern(
+        tech=tech,
+        regex=None if literal else regex,
+        anchor=prefix.lower() if len(prefix) >= 2 or literal else '',
+        version=version,
+        confidence=int(spec.get('confidence', 100)),
+    )
+
+
+class TechnologyDB:
+    """
+    数据驱动的 Web 技术识别
+
+    规则表(config/technologies.json)按技术列出响应头、Cookie、meta 标签(如 generator)、
+    script src 与页面内容的匹配规则，每条规则可以捕获版本并带有置信度(同一技术多条规则命中时累加，最高 100)，
+    implies 列出由它推断出的其它技术。
+
+    规则载入时一次编译，识别一个响应时：响应头与 Cookie 只解析一次并按名称查表，
+    页面内容只转换一次小写，并由 _AnchorIndex 一次扫描找出所有正文规则的字面量前缀与 meta/script 标签的位置；
+    纯字面量规则出现即命中，正则规则只在字面量前缀出现时从其第一次出现的位置开始执行。
+    """
+
+    def __init__(self, data: Dict):
+        self.implies: Dict[str, List[str]] = {}
+        self._headers: Dict[str, List[_Pattern]] = {}
+        self._cookies: Dict[str, List[_Pattern]] = {}
+        self._meta: Dict[str, List[_Pattern]] = {}
+        self._script: List[_Pattern] = []
+        self._body: List[_Pattern] = []
+        for tech, rule in data.get('technologies', {}).items():
+            for field, index in (('headers', self._headers), ('cookies', self._cookies), ('meta', self._meta)):
+                for name, spec in rule.get(field, {}).items():
+                    index.setdefault(name.lower(), []).append(_compile(tech, spec))
+            self._script.extend(_compile(tech, spec) for spec in rule.get('script', []))
+            self._body.extend(_compile(tech, spec) for spec in rule.get('body', []))
+            if rule.get('implies'):
+                self.implies[tech] = list(rule['implies'])
+        tags = [tag for tag, rules in zip(_TAGS, (self._script, self._meta)) if rules]
+        self._index = _AnchorIndex([pattern.anchor for pattern in self._body] + tags)
+
+    @classmethod
+    def load(cls, path: str = None) -> 'TechnologyDB':
+        with open(path or TECHNOLOGIES_FILE, 'r', encoding='utf-8') as f:
+            return cls(json.load(f))
+
+    @staticmethod
+    def _record(found: Dict[str, Dict], pattern: _Pattern, text: str, pos: int = 0) -> None:
+        """字面量前缀已确认出现(第一次出现在 pos)，执行正则(如有)并记录技术、版本与置信度"""
+        match = None
+        if pattern.regex is not None:
+            match = pattern.regex.search(text, pos)
+            if match is None:
+                return
+        entry = found.get(pattern.tech)
+        if entry is None:
+            entry = found[pattern.tech] = {'version': None, 'confidence': 0}
+        entry['confidence'] = min(100, entry['confidence'] + pattern.confidence)
+        if match is not None and pattern.version and not entry['version']:
+            entry['version'] = _version(pattern.version, match)
+
+    def _apply(self, found: Dict[str, Dict], patterns, text: str) -> None:
+        """用一组规则匹配响应头、Cookie、meta 或 script src 等短文本"""
+        lowered = text.lower()
+        for pattern in patterns:
+            if not pattern.anchor or pattern.anchor in lowered:
+                self._record(found, pattern, text)
+
+    def identify(self, headers: Mapping[str, str], body: str) -> Dict[str, Dict]:
+        """识别响应使用的技术，返回 {技术: {'version': 版本或 None, 'confidence': 0~100}}"""
+        found: Dict[str, Dict] = {}
+        for name, value in headers.items():
+            patterns = self._headers.get(name.lower())
+            if patterns:
+                self._apply(found, patterns, value)
+
+        if self._cookies:
+            cookie_header = headers.get('Set-Cookie')
+            if cookie_header:
+                for name, value in _COOKIE.findall(cookie_header):
+                    self._apply(found, self._cookies.get(name.lower(), ()), value)
+
+        lowered = body.lower()
+        positions = self._index.scan(lowered)
+        if self._script:
+            for attrs in _tags(body, lowered, '<script', positions.get('<script', ())):
+                src = attrs.get('src')
+                if src:
+                    self._apply(found, self._script, src)
+        if self._meta:
+            for attrs in _tags(body, lowered, '<meta', positions.get('<meta', ())):
+                if 'name' in attrs and 'content' in attrs:
+                    self._apply(found, self._meta.get(attrs['name'].lower(), ()), attrs['content'])
+
+        # 已确定(置信度 100 且不再需要版本)的技术跳过其正文规则
+        for pattern in self._body:
+            entry = found.get(pattern.tech)
+            if entry and entry['confidence'] >= 100 and (entry['version'] or not pattern.version):
+                continue
+            if not pattern.anchor:
+                self._record(found, pattern, lowered)
+            elif pattern.anchor in positions:
+                self._record(found, pattern, lowered, positions[pattern.anchor][0])
+
+        # implies 推断出的技术沿用推断来源的置信度
+        pending = [tech for tech in found if tech in self.implies]
+        while pending:
+            tech = pending.pop()
+            for implied in self.implies[tech]:
+                if implied not in found:
+                    found[implied] = {'version': None, 'confidence': found[tech]['confidence']}
+                    if implied in self.implies:
+                        pending.append(implied)
+        return found
+
+
+def tech_labels(result: Dict) -> List[str]:
+    """技术列表的显示形式，有版本时附上版本号"""
+    details = result.get('technology_details') or {}
+    labels = []
+    for tech in sorted(result.get('technologies') or ()):
+        version = (details.get(tech) or {}).get('version')
+        labels.append(f"{tech} {version}" if version else tech)
+    return labels
+
+
+_db: Optional[TechnologyDB] = None
+_db_lock = threading.Lock()
+
+
+def technology_db() -> TechnologyDB:
+    """全局技术识别规则库，首次使用时载入"""
+    global _db
+    if _db is None:
+        with _db_lock:
+            if _db is None:
+                _db = TechnologyDB.load()
+    return _db
@@ -3,6 +3,7 @@ import sys
 import os
 import argparse
 import logging
+import random
 from datetime import datetime
 from colorama import init, Fore, Style
 
@@ -13,15 +14,15 @@ init()
 ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
 sys.path.append(ROOT_DIR)
 
-from lib.scanners.port_scanner import IPScanner
-from lib.scanners.web_scanner import CMSScanner
-from lib.scanners.ssh_scanner import SSHBruteforce
-from lib.scanners.ftp_scanner import FTPBruteforce
+from lib.scanners.host_discovery import HostDiscovery
 from lib.utils.logger import setup_logger
 from lib.utils.output import OutputFormatter
+from lib.utils.checkpoint import ScanJournal
+from lib.utils.progress import console
+from core.runner import ScanRunner, ShardedRunner, SCAN_ARGS, port_spec
 from config.settings import *
 
-def parse_args():
+def parse_args(argv=None):
     parser = argparse.ArgumentParser(
         description='Mscan - Multi-purpose Security Scanner',
         formatter_class=argparse.RawTextHelpFormatter
@@ -32,20 +33,56 @@ def parse_args():
     target_group.add_argument('-i', '--ip', help='Target IP/CIDR/Range')
     target_group.add_argument('-u', '--url', help='Target URL')
     target_group.add_argument('-f', '--file', help='Target file')
+    target_group.add_argument('--exclude', help='Exclude IP/CIDR/Range (comma separated or @file)')
     
     # 扫描模式
     mode_group = parser.add_argument_group('Scan Mode')
     mode_group.add_argument('-m', '--mode', 
                            choices=list(DEFAULT_PORTS.keys()),
-                           default='common',
-                           help='Predefined port scan mode')
-    mode_group.add_argument('-p', '--ports', help='Custom ports')
+                           help=f'Predefined port scan mode (default: {DEFAULT_PORT_MODE}, ignored when -p is given)')
+    mode_group.add_argument('-p', '--ports',
+                           help='Custom ports, e.g. 1-1024,3306,T:8000-9000,U:53 (mode names allowed, "-" for all)')
+    mode_group.add_argument('--exclude-ports', help='Ports to exclude, same syntax as -p')
+    mode_group.add_argument('--engine', choices=SCAN_ENGINES, default='thread',
+                           help='Port scan engine (thread: thread pool, async: asyncio event loop)')
+    mode_group.add_argument('--max-inflight', type=int, default=ASYNC_MAX_INFLIGHT,
+                           help='Max in-flight connect probes for the async engine')
+    mode_group.add_argument('--web-engine', choices=WEB_ENGINES, default='thread',
+                           help='Web detection engine (thread: requests thread pool, async: asyncio HTTP client)')
+    mode_group.add_argument('--web-max-inflight', type=int, default=WEB_ASYNC_MAX_INFLIGHT,
+                           help='Max in-flight HTTP requests for the async web engine')
+    mode_group.add_argument('--web-max-body', type=int, default=WEB_MAX_BODY_BYTES // 1024, metavar='KB',
+                           help='Max response body (KB) read per web request; larger pages are identified from their beginning')
+    mode_group.add_argument('--discovery', choices=HostDiscovery.METHODS, default='auto',
+                           help='Host discovery method (auto: ICMP then TCP, icmp, tcp, none)')
+    mode_group.add_argument('-Pn', '--no-ping', action='store_true',
+                           help='Skip host discovery and treat all targets as alive')
+    mode_group.add_argument('--discovery-ports',
+                           help='Comma separated ports for TCP host discovery')
+    mode_group.add_argument('--no-shuffle', action='store_true',
+                           help='Probe hosts and ports in order instead of a randomized permutation')
+    mode_group.add_argument('--seed', type=int, help='Seed for the randomized probe order')
+    mode_group.add_argument('--min-rtt-timeout', type=float, default=RTT_MIN_TIMEOUT,
+                           help='Lower bound (seconds) for adaptive per-host probe timeouts')
+    mode_group.add_argument('--max-rtt-timeout', type=float, default=RTT_MAX_TIMEOUT,
+                           help='Upper bound (seconds) for adaptive per-host probe timeouts')
+    mode_group.add_argument('--no-banner', action='store_true',
+                           help='Do not read banners on open ports (web/SSH/FTP stages then verify with their own connections)')
+    mode_group.add_argument('--no-adaptive', action='store_true',
+                           help='Disable AIMD congestion control and use fixed concurrency')
+    mode_group.add_argument('--cache', nargs='?', const=HOST_CACHE_FILE, metavar='FILE',
+                           help='Cache host liveness and open ports across runs: recently alive hosts are scanned\n'
+                                'first, recently unresponsive hosts are skipped (default file: data/host_cache.db)')
+    mode_group.add_argument('--cache-ttl', type=float, default=HOST_CACHE_TTL, metavar='HOURS',
+                           help='Hours before cached host entries expire and are probed again')
     
     # 模块控制
     module_group = parser.add_argument_group('Modules')
     module_group.add_argument('--no-web', action='store_true', help='Skip web detection')
     module_group.add_argument('--no-ssh', action='store_true', help='Skip SSH bruteforce')
     module_group.add_argument('--no-ftp', action='store_true', help='Skip FTP bruteforce')
+    module_group.add_argument('--no-pipeline', action='store_true',
+                              help='Run web/SSH/FTP stages after the port scan instead of streaming open ports to them')
     
     # 爆破选项
     brute_group = parser.add_argument_group('Brute Force')
@@ -59,108 +96,159 @@ def parse_args():
     output_group.add_argument('-o', '--output', help='Output file path (e.g., report.html or report.json)')
     output_group.add_argument('--no-report', action='store_true', help='Disable HTML report generation')
     output_group.add_argument('--report-dir', default='reports', help='Directory to save reports')
+    output_group.add_argument('--checkpoint', help='Checkpoint journal path (default: <report-dir>/mscan_<target>_<time>.journal)')
+    output_group.add_argument('--no-checkpoint', action='store_true', help='Disable the checkpoint journal')
+    output_group.add_argument('-q', '--quiet', action='store_true', help='Disable console output (progress, findings and summaries)')
+    output_group.add_argument('--resume', metavar='JOURNAL', help='Resume an interrupted scan from its checkpoint journal')
+    output_group.add_argument('--baseline', metavar='FILE',
+                              help='Previous results (JSON report or checkpoint journal) to diff against:\n'
+                                   'report new/closed ports, web changes and new credentials')
+    output_group.add_argument('--changed-only', action='store_true',
+                              help='With --baseline, run web/SSH/FTP stages only on ports not open in the baseline')
+    
+    # 分布式扫描
+    dist_group = parser.add_argument_group('Distributed')
+    dist_group.add_argument('--coordinator', metavar='[HOST:]PORT',
+                           help='Run as coordinator: serve target chunks to workers and merge their results '
+                                '(binds 127.0.0.1 unless HOST is given; non-loopback HOST requires --token)')
+    dist_group.add_argument('--worker', metavar='HOST:PORT',
+                           help='Run as worker: pull target chunks from a coordinator and scan them')
+    dist_group.add_argument('--token', help='Shared secret workers must present to the coordinator')
+    dist_group.add_argument('--worker-name', help='Worker name shown by the coordinator (default: hostname)')
     
     # 其他选项
     parser.add_argument('-t', '--threads', type=int, default=THREADS,
                       help='Number of threads')
+    parser.add_argument('-w', '--workers', type=int, default=1,
+                      help='Number of worker processes, each scanning a shard of the targets (0: CPU count)')
     parser.add_argument('-v', '--verbose', action='store_true',
                       help='Verbose output')
     
-    return parser.parse_args()
+    return parser.parse_args(argv)
+
+def target_label(args) -> str:
+    """用于报告和日志文件名的目标描述"""
+    target_info = args.ip if args.ip else args.url if args.url else "scan"
+    return target_info.replace('/', '_').replace(':', '_')
+
+def open_journal(args, timestamp: str):
+    """新建或恢复检查点日志"""
+    if args.resume:
+        journal = ScanJournal.load(args.resume)
+        for key, value in journal.meta.get('args', {}).items():
+            setattr(args, key, value)
+        if journal.meta.get('chunk_size') != DISCOVERY_BATCH:
+            raise ValueError("DISCOVERY_BATCH changed since the checkpoint was written, cannot resume")
+        journal.reopen()
+        console.write(f"{Fore.YELLOW}[*] Resuming scan from checkpoint: {args.resume}{Style.RESET_ALL}")
+        return journal
+
+    if args.no_checkpoint:
+        return None
+    # 固定随机种子，保证恢复时目标分块与探测顺序完全一致
+    if args.seed is None:
+        args.seed = random.getrandbits(32)
+    path = args.checkpoint or os.path.join(args.report_dir, f"mscan_{target_label(args)}_{timestamp}.journal")
+    journal = ScanJournal(path)
+    journal.start({
+        'args': {key: getattr(args, key) for key in SCAN_ARGS},
+        'chunk_size': DISCOVERY_BATCH,
+        'created': timestamp,
+    })
+    console.write(f"{Fore.YELLOW}[*] Checkpoint journal: {path}{Style.RESET_ALL}")
+    return journal
+
+def save_report(args, all_results, target_info: str, timestamp: str) -> None:
+    """保存扫描报告"""
+    # 创建输出目录
+    os.makedirs(args.report_dir, exist_ok=True)
+
+    # 生成报告文件名
+    if args.output:
+        output_file = os.path.join(args.report_dir, args.output)
+    else:
+        # 使用目标信息和时间戳生成文件名
+        output_file = os.path.join(args.report_dir, f"mscan_{target_info}_{timestamp}.html")
+
+    # 保存报告
+    OutputFormatter.save_results(all_results, output_file)
+    console.write(f"\n{Fore.GREEN}[+] Scan report saved to: {output_file}{Style.RESET_ALL}")
+
+def save_diff(args, all_results, target_info: str, timestamp: str) -> None:
+    """保存与基线的差异(JSON)"""
+    os.makedirs(args.report_dir, exist_ok=True)
+    output_file = os.path.join(args.report_dir, f"mscan_{target_info}_{timestamp}_diff.json")
+    OutputFormatter.to_json(all_results['diff'], output_file)
+    console.write(f"{Fore.GREEN}[+] Baseline diff saved to: {output_file}{Style.RESET_ALL}")
 
 def main():
     args = parse_args()
     logger = setup_logger(args.verbose)
+    console.configure(quiet=args.quiet)
+    if args.worker:
+        # 工作节点的扫描参数、报告与检查点都由协调节点负责
+        from core.distributed import DistributedWorker
+        try:
+            DistributedWorker(args).run()
+        except KeyboardInterrupt:
+            logger.warning("Worker interrupted by user")
+            sys.exit(1)
+        except (OSError, ValueError) as e:
+            logger.error(f"Worker error: {str(e)}")
+            sys.exit(1)
+        return
+    if args.ip and not args.resume:
+        try:
+            port_spec(args)
+        except ValueError as e:
+            logger.error(f"Invalid port specification: {str(e)}")
+            sys.exit(1)
+    if args.ip and args.coordinator:
+        from core.distributed import coordinator_address
+        try:
+            coordinator_address(args)
+        except ValueError as e:
+            logger.error(f"Invalid coordinator address: {str(e)}")
+            sys.exit(1)
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    try:
+        journal = open_journal(args, timestamp)
+    except (OSError, ValueError) as e:
+        logger.error(f"Cannot open checkpoint journal: {str(e)}")
+        sys.exit(1)
+    target_info = target_label(args)
     
-    # 存储所有扫描结果
-    all_results = {
-        'ports': {},
-        'web': {},
-        'ssh': {},
-        'ftp': {},
-        'vulnerabilities': []
-    }
+    if args.ip and args.coordinator:
+        from core.distributed import DistributedCoordinator
+        runner = DistributedCoordinator(args, journal)
+    elif args.ip and args.workers != 1:
+        runner = ShardedRunner(args, journal, args.workers or None)
+    else:
+        runner = ScanRunner(args, journal)
     
     try:
-        # 端口扫描
-        if args.ip:
-            ports_str = DEFAULT_PORTS[args.mode] if args.mode else args.ports
-            ports = [int(p.strip()) for p in ports_str.split(',')]
-            
-            port_scanner = IPScanner(threads=args.threads)
-            scan_results = port_scanner.scan(args.ip, ports)
-            
-            if scan_results:
-                # 保存端口扫描结果
-                all_results['ports'] = scan_results
-                
-                # Web服务识别
-                if not args.no_web:
-                    web_scanner = CMSScanner()
-                    web_results = web_scanner.scan(scan_results)
-                    all_results['web'].update(web_results)
-                
-                # SSH爆破
-                if not args.no_ssh:
-                    ssh_ports = {}
-                    for ip, ports in scan_results.items():
-                        ssh_ports[ip] = {port for port in ports if port in {22, 222, 2222, 22222}}
-                    
-                    if ssh_ports:
-                        ssh_scanner = SSHBruteforce(threads=args.threads)
-                        ssh_results = ssh_scanner.scan(
-                            ssh_ports,
-                            userfile=args.user_file,
-                            passfile=args.pass_file
-                        )
-                        all_results['ssh'].update(ssh_results)
-                
-                # FTP爆破
-                if not args.no_ftp:
-                    ftp_ports = {}
-                    for ip, ports in scan_results.items():
-                        ftp_ports[ip] = {port for port in ports if port in {21, 2121}}
-                    
-                    if ftp_ports:
-                        ftp_scanner = FTPBruteforce(threads=args.threads)
-                        ftp_results = ftp_scanner.scan(
-                            ftp_ports,
-                            userfile=args.ftp_user_file,
-                            passfile=args.ftp_pass_file
-                        )
-                        all_results['ftp'].update(ftp_results)
+        runner.run()
+        if runner.results.get('diff'):
+            save_diff(args, runner.results, target_info, timestamp)
         
-        # URL扫描
-        if args.url:
-            web_scanner = CMSScanner()
-            web_results = web_scanner.scan({args.url: {80}})
-            all_results['web'].update(web_results)
-            
         # 生成报告
         if not args.no_report:
-            # 创建输出目录
-            os.makedirs(args.report_dir, exist_ok=True)
-            
-            # 生成报告文件名
-            if args.output:
-                output_file = os.path.join(args.report_dir, args.output)
-            else:
-                # 使用目标信息和时间戳生成文件名
-                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                target_info = args.ip if args.ip else args.url if args.url else "scan"
-                target_info = target_info.replace('/', '_').replace(':', '_')
-                output_file = os.path.join(args.report_dir, f"mscan_{target_info}_{timestamp}.html")
-            
-            # 保存报告
-            OutputFormatter.save_results(all_results, output_file)
-            print(f"\n{Fore.GREEN}[+] Scan report saved to: {output_file}{Style.RESET_ALL}")
+            save_report(args, runner.results, target_info, timestamp)
             
     except KeyboardInterrupt:
         logger.warning("Scan interrupted by user")
+        # 中断时保存已有结果，检查点日志保留已完成的工作
+        if not args.no_report:
+            save_report(args, runner.results, target_info, timestamp)
+        if journal:
+            console.write(f"{Fore.YELLOW}[*] Resume with: --resume {journal.path}{Style.RESET_ALL}")
         sys.exit(1)
     except Exception as e:
         logger.error(f"Scan error: {str(e)}")
         sys.exit(1)
+    finally:
+        if journal:
+            journal.close()
 
 if __name__ == '__main__':
     main() 
\ No newline at end of file